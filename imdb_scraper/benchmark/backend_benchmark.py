@@ -0,0 +1,116 @@
+"""Compara los backends de parseo HTML (html_backends.py) sobre páginas de chart y de título.
+
+Cada backend instalado se mide en un proceso nuevo, con el camino HTML forzado (sin
+JSON-LD): `parse_top_movies` para los charts y el fallback de `parse_movie_details` para
+los títulos. Reporta el mejor tiempo por página y la memoria de un documento parseado
+(lo que crece el RSS mientras el árbol de una página de título sigue vivo, la mayor de
+todas; solo en Linux). El orden de BACKEND_ORDER, que decide el modo `auto`, sale de
+esta comparación.
+
+Uso:
+    python backend_benchmark.py --pages ../output/cache      # páginas grabadas (chart + tt*.html/.body)
+    python backend_benchmark.py --titles 20 --page-kb 300    # páginas sintéticas de fake_imdb
+"""
+import argparse
+import contextlib
+import gc
+import io
+import multiprocessing
+import os
+import sys
+import time
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCHMARK_DIR, "..", "scraper"))
+
+from fake_imdb import build_site  # noqa: E402
+from html_backends import BACKEND_ORDER, BACKENDS  # noqa: E402
+
+
+def load_pages(args):
+    """(charts, títulos): cuerpos de las páginas grabadas o sintéticas"""
+    site = build_site("https://www.imdb.com", args.pages, args.titles, args.page_kb, args.titles)
+    charts = [body for path, body in site.items() if path.startswith("/chart/")]
+    titles = [body for path, body in site.items()
+              if path.startswith("/title/") and not path.endswith("/fullcredits/")][:args.titles]
+    return charts, titles
+
+
+def best_ms(function, pages, repeat):
+    """Mejor tiempo medio por página (ms) de `repeat` pasadas sobre todas las páginas"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for body in pages:
+            function(body)
+        elapsed = (time.perf_counter() - start) * 1000 / max(len(pages), 1)
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def rss_mb():
+    """RSS actual del proceso (MB), no el máximo histórico; None si no hay /proc"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError):
+        return None
+
+
+def tree_mb(backend, pages):
+    """Lo que más crece el RSS con el documento de una de `pages` vivo (MB)"""
+    # Primer parseo de prueba: la importación de la librería no cuenta como árbol
+    backend.parse("<html><body></body></html>")
+    growth = None
+    for body in pages:
+        gc.collect()
+        before = rss_mb()
+        document = backend.parse(body)
+        after = rss_mb()
+        del document
+        if before is not None:
+            growth = max(growth or 0.0, after - before)
+    return growth
+
+
+def measure(name, charts, titles, repeat):
+    """Se ejecuta en un proceso nuevo: la memoria del árbol se mide antes de que otros parseos la reserven"""
+    import html_backends
+    from extractors import parse_movie_details, parse_top_movies
+
+    html_backends._backend = html_backends.get_backend(name)
+    document_mb = tree_mb(html_backends._backend, titles)
+    with contextlib.redirect_stdout(io.StringIO()):
+        chart_ms = best_ms(lambda body: parse_top_movies(body, fast=False), charts, repeat)
+        title_ms = best_ms(lambda body: parse_movie_details(body, fast=False), titles, repeat)
+    return chart_ms, title_ms, document_mb
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tiempo y memoria de cada backend de parseo HTML")
+    parser.add_argument("--pages", default=None, help="Directorio con páginas grabadas (como fake_imdb.py --pages)")
+    parser.add_argument("--titles", type=int, default=20, help="Páginas de título a medir")
+    parser.add_argument("--page-kb", type=int, default=300, help="Tamaño de las páginas sintéticas")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    charts, titles = load_pages(args)
+    context = multiprocessing.get_context("spawn")
+    print(f"\n{'backend':12} {'chart (ms)':>11} {'título (ms)':>12} {'árbol (MB)':>11}")
+    results = {}
+    for name in BACKEND_ORDER:
+        if not BACKENDS[name].available():
+            print(f"{name:12} {'no instalado':>11}")
+            continue
+        with context.Pool(1) as pool:
+            results[name] = pool.apply(measure, (name, charts, titles, args.repeat))
+        chart_ms, title_ms, document_mb = results[name]
+        memory = f"{document_mb:11.1f}" if document_mb is not None else f"{'n/d':>11}"
+        print(f"{name:12} {chart_ms:11.2f} {title_ms:12.2f} {memory}")
+
+    ranking = sorted(results, key=lambda name: results[name][0] + results[name][1])
+    print(f"\n🏁 Orden medido (más rápido primero): {', '.join(ranking)}")
+
+
+if __name__ == "__main__":
+    main()
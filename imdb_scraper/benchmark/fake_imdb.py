@@ -0,0 +1,360 @@
+"""Servidor HTTP local que imita a IMDb para medir el scraper sin Tor ni red.
+
+Sirve el chart Top 250 y las páginas de título, ya sean grabadas (ficheros `chart.html` y
+`tt*.html`, o los `.body` de la caché del scraper en `output/cache`) o sintéticas con la
+misma estructura (JSON-LD + metascore + HTML de relleno), más el reparto completo
+(`/fullcredits`) y las fichas de persona (`/name/nm...`) con actores que se repiten entre
+películas, y los pósters (`/images/tt*.jpg`, PNG generados; varios títulos comparten imagen). Latencia, jitter, tasa de errores,
+respuestas 429 y peticiones colgadas (como un circuito Tor lento) son configurables. También escribe dumps TSV (`--write-dumps`) con los
+mismos títulos sintéticos para probar la importación desde los ficheros de IMDb.
+
+Uso:
+    python fake_imdb.py --port 8765 --latency 0.3 --jitter 0.1 --error-rate 0.01 --throttle-rate 0.02
+    python fake_imdb.py --latency 0.3 --straggler-rate 0.03 --straggler-delay 8
+    python fake_imdb.py --pages ../output/cache
+    python fake_imdb.py --titles 300 --write-dumps /tmp/dumps
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import random
+import re
+import struct
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+TITLE_FILE_RE = re.compile(r"^(tt\d+)\.(?:html|body)$")
+REAL_BASE_URL = "https://www.imdb.com"
+# Pósters distintos: el título n usa el n % POSTER_VARIANTS (los demás son repetidos)
+POSTER_VARIANTS = 50
+
+
+############################## Paginas sinteticas #########################################################
+def synthetic_title_page(tt_id, index, base_url, size_kb=300, related=()):
+    """Página de título con la forma de la de IMDb: JSON-LD arriba, metascore, "More like this" y mucho HTML"""
+    data = {
+        "@context": "https://schema.org",
+        "@type": "Movie",
+        "url": f"{base_url}/title/{tt_id}/",
+        "name": f"Movie {index}",
+        "image": f"{base_url}/images/{tt_id}.jpg",
+        "description": f"Synthetic description for movie {index}.",
+        "aggregateRating": {"@type": "AggregateRating", "ratingCount": 1000000 - index, "ratingValue": round(9.3 - index * 0.003, 1)},
+        "genre": ["Drama", "Crime"],
+        "datePublished": f"{1950 + index % 70}-0{1 + index % 9}-1{index % 10}",
+        "actor": [{"@type": "Person", "url": f"/name/nm{index * 10 + n:07d}/", "name": f"Actor {index}-{n}"} for n in range(4)],
+        "director": [{"@type": "Person", "url": f"/name/nm{index:07d}/", "name": f"Director {index}"}],
+        "duration": f"PT{1 + index % 3}H{index % 60}M",
+    }
+    filler = "".join(
+        f'<div class="ipc-metadata-list__item sc-{n % 97}"><a href="/title/{tt_id}/?ref_={n}">'
+        f'<span class="ipc-metadata-list-item__label">Item {n}</span></a><ul class="ipc-inline-list">'
+        f'<li>{n}</li><li>Lorem ipsum dolor sit amet</li></ul></div>'
+        for n in range(size_kb * 4)
+    )
+    more_like_this = "".join(
+        f'<div class="ipc-poster-card"><a href="/title/{related_id}/?ref_=tt_sims_tt_i_{n}">More {n}</a></div>'
+        for n, related_id in enumerate(related, start=1)
+    )
+    half = len(filler) // 2
+    return (
+        '<!DOCTYPE html><html lang="en"><head><meta charset="utf-8">'
+        f"<title>Movie {index} - IMDb</title>"
+        f'<script type="application/ld+json">{json.dumps(data)}</script></head><body>'
+        f'<h1 data-testid="hero-title-block__title">Movie {index}</h1>'
+        f"{filler[:half]}"
+        f'<span class="sc-b0901df4-0 metacritic-score-box" style="background-color:#54A72A">{60 + index % 40}</span>'
+        f'<section data-testid="MoreLikeThis">{more_like_this}</section>'
+        f"{filler[half:]}</body></html>"
+    ).encode("utf-8")
+
+
+# Actores secundarios compartidos: cada persona sale en varias películas (para medir el memo de personas)
+CAST_POOL = 400
+CREDITS_EXTRA = 12
+
+
+def credits_people(index):
+    """(id nm, nombre) del reparto completo: los 4 del JSON-LD y secundarios del conjunto compartido"""
+    people = [(f"nm{index * 10 + n:07d}", f"Actor {index}-{n}") for n in range(4)]
+    people += [(f"nm{9000000 + (index * 5 + n) % CAST_POOL:07d}", f"Supporting {(index * 5 + n) % CAST_POOL}")
+               for n in range(CREDITS_EXTRA)]
+    return people
+
+
+def synthetic_credits_page(tt_id, index):
+    """/title/tt.../fullcredits con el diseño actual (sección de reparto con data-testid)"""
+    rows = "".join(
+        f'<li class="ipc-metadata-list-summary-item"><a class="ipc-lockup-overlay" href="/name/{nm_id}/?ref_=ttfc_cst_{n}"></a>'
+        f'<a class="name-credits--title-text name-credits--title-text-big" href="/name/{nm_id}/?ref_=ttfc_cst_{n}">{name}</a>'
+        f'<ul class="ipc-inline-list"><li>Role {n}</li></ul></li>'
+        for n, (nm_id, name) in enumerate(credits_people(index))
+    )
+    return (
+        '<!DOCTYPE html><html lang="en"><head><meta charset="utf-8">'
+        f"<title>Movie {index} (Full cast) - IMDb</title></head><body>"
+        f'<h2>Movie {index}</h2><section><div data-testid="sub-section-cast"><ul>{rows}</ul></div></section>'
+        "</body></html>"
+    ).encode("utf-8")
+
+
+def synthetic_name_page(nm_id, name, titles):
+    """/name/nm... con JSON-LD Person y el bloque "Known for" en HTML"""
+    number = int(nm_id[2:])
+    data = {
+        "@context": "https://schema.org",
+        "@type": "Person",
+        "url": f"/name/{nm_id}/",
+        "name": name,
+        "birthDate": f"{1920 + number % 80}-0{1 + number % 9}-1{number % 10}",
+    }
+    known_for = "".join(
+        f'<div class="ipc-primary-image-list-card"><a class="ipc-primary-image-list-card__title" '
+        f'href="/title/{tt_id}/?ref_=nm_knf_t_{n}">{title}</a></div>'
+        for n, (tt_id, title) in enumerate(titles[:4], start=1)
+    )
+    return (
+        '<!DOCTYPE html><html lang="en"><head><meta charset="utf-8">'
+        f"<title>{name} - IMDb</title>"
+        f'<script type="application/ld+json">{json.dumps(data)}</script></head><body>'
+        f'<h1 data-testid="hero__pageTitle"><span>{name}</span></h1>'
+        f'<div data-testid="nm_flmg_kwn_for">{known_for}</div></body></html>'
+    ).encode("utf-8")
+
+
+def synthetic_poster(variant, width=200, height=300):
+    """PNG RGB con ruido (no comprime: ~180 KB como un póster real) distinto para cada `variant`"""
+    rng = random.Random(variant)
+    rows = b"".join(b"\x00" + rng.randbytes(width * 3) for _ in range(height))
+
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(rows, 1)) + chunk(b"IEND", b"")
+
+
+def synthetic_chart_page(titles, base_url):
+    items = []
+    links = []
+    for index, tt_id in enumerate(titles, start=1):
+        items.append({
+            "@type": "ListItem",
+            "item": {
+                "@type": "Movie",
+                "url": f"{base_url}/title/{tt_id}/",
+                "name": f"Movie {index}",
+                "description": f"Synthetic description for movie {index}.",
+                "image": f"{base_url}/images/{tt_id}.jpg",
+                "aggregateRating": {"@type": "AggregateRating", "ratingCount": 1000000 - index, "ratingValue": round(9.3 - index * 0.003, 1)},
+                "contentRating": "R",
+                "genre": "Drama",
+                "duration": f"PT{1 + index % 3}H{index % 60}M",
+            },
+        })
+        links.append(f'<h3 class="ipc-title__text"><a href="/title/{tt_id}/?ref_=chttp_t_{index}">{index}. Movie {index}</a></h3>')
+    return (
+        '<!DOCTYPE html><html><head>'
+        f'<script type="application/ld+json">{json.dumps({"@type": "ItemList", "itemListElement": items})}</script>'
+        f'</head><body>{"".join(links)}</body></html>'
+    ).encode("utf-8")
+############################## Paginas sinteticas #########################################################
+
+
+def build_site(base_url, pages_dir=None, titles=250, page_kb=300, chart_size=250):
+    """Diccionario ruta -> cuerpo con el chart y las páginas de título"""
+    site = {}
+    if pages_dir:
+        for name in sorted(os.listdir(pages_dir)):
+            path = os.path.join(pages_dir, name)
+            if not os.path.isfile(path) or not name.endswith((".html", ".body")):
+                continue
+            with open(path, "rb") as f:
+                body = f.read().replace(REAL_BASE_URL.encode(), base_url.encode())
+            match = TITLE_FILE_RE.match(name)
+            if match:
+                site[f"/title/{match.group(1)}/"] = body
+            elif name == "chart.html" or b'"itemListElement"' in body:
+                site["/chart/top/"] = body
+        print(f"📼 {len(site)} páginas grabadas cargadas desde {pages_dir}")
+        return site
+
+    # El chart lista los primeros `chart_size`; el resto solo se alcanza siguiendo enlaces
+    title_ids = [f"tt{index:07d}" for index in range(1, titles + 1)]
+    site["/chart/top/"] = synthetic_chart_page(title_ids[:chart_size], base_url)
+    for index, tt_id in enumerate(title_ids, start=1):
+        related = [title_ids[(index * 7 + n) % titles] for n in range(6)]
+        site[f"/title/{tt_id}/"] = synthetic_title_page(tt_id, index, base_url, page_kb, related)
+        site[f"/title/{tt_id}/fullcredits/"] = synthetic_credits_page(tt_id, index)
+    posters = [synthetic_poster(variant) for variant in range(POSTER_VARIANTS)]
+    for index, tt_id in enumerate(title_ids, start=1):
+        site[f"/images/{tt_id}.jpg/"] = posters[index % POSTER_VARIANTS]
+    filmographies = {}
+    for index, tt_id in enumerate(title_ids, start=1):
+        for nm_id, name in credits_people(index):
+            filmographies.setdefault((nm_id, name), []).append((tt_id, f"Movie {index}"))
+    for (nm_id, name), titles_of in filmographies.items():
+        site[f"/name/{nm_id}/"] = synthetic_name_page(nm_id, name, titles_of)
+    print(f"🧪 {len(site)} páginas sintéticas (~{page_kb} KB por título, {min(chart_size, titles)} en el chart, "
+          f"{len(filmographies)} personas)")
+    return site
+
+
+def write_dumps(output_dir, titles=250):
+    """title.basics/ratings/principals y name.basics (.tsv.gz) con los títulos sintéticos.
+
+    Los datos coinciden con los de las páginas sintéticas (salvo la fecha, que en los dumps
+    es solo el año) y hay episodios de serie intercalados para probar el filtro por tipo.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    files = {
+        "title.basics.tsv.gz": ["tconst\ttitleType\tprimaryTitle\toriginalTitle\tisAdult\tstartYear\tendYear\truntimeMinutes\tgenres"],
+        "title.ratings.tsv.gz": ["tconst\taverageRating\tnumVotes"],
+        "title.principals.tsv.gz": ["tconst\tordering\tnconst\tcategory\tjob\tcharacters"],
+        "name.basics.tsv.gz": ["nconst\tprimaryName\tbirthYear\tdeathYear\tprimaryProfession\tknownForTitles"],
+    }
+    names = []
+    for index in range(1, titles + 1):
+        tt_id = f"tt{index:07d}"
+        runtime = (1 + index % 3) * 60 + index % 60
+        files["title.basics.tsv.gz"].append(f"{tt_id}\tmovie\tMovie {index}\tMovie {index}\t0\t{1950 + index % 70}\t\\N\t{runtime}\tDrama,Crime")
+        files["title.basics.tsv.gz"].append(f"tt{titles + index:07d}\ttvEpisode\tEpisode {index}\tEpisode {index}\t0\t2020\t\\N\t30\tComedy")
+        files["title.ratings.tsv.gz"].append(f"{tt_id}\t{round(9.3 - index * 0.003, 1)}\t{1000000 - index}")
+        files["title.principals.tsv.gz"].append(f"{tt_id}\t1\tnm{5000000 + index:07d}\tdirector\t\\N\t\\N")
+        for n in range(4):
+            files["title.principals.tsv.gz"].append(f"{tt_id}\t{n + 2}\tnm{index * 10 + n:07d}\t{'actor' if n % 2 == 0 else 'actress'}\t\\N\t[\"Role {n}\"]")
+            names.append((index * 10 + n, f"Actor {index}-{n}"))
+        names.append((5000000 + index, f"Director {index}"))
+    files["name.basics.tsv.gz"] += [f"nm{nm:07d}\t{name}\t\\N\t\\N\tactor\t\\N" for nm, name in sorted(set(names))]
+
+    for filename, lines in files.items():
+        with gzip.open(os.path.join(output_dir, filename), "wt", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+    print(f"🗜️ Dumps TSV de {titles} títulos escritos en {output_dir}")
+
+
+class FakeImdbHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, como IMDb
+    site = {}
+    latency = 0.0
+    jitter = 0.0
+    error_rate = 0.0
+    throttle_rate = 0.0
+    retry_after = 1
+    straggler_rate = 0.0
+    straggler_delay = 0.0
+    stats = {"requests": 0, "ok": 0, "not_found": 0, "errors": 0, "throttled": 0, "bytes": 0}
+    stats_lock = threading.Lock()
+
+    def _count(self, key, nbytes=0):
+        with self.stats_lock:
+            self.stats["requests"] += 1
+            self.stats[key] += 1
+            self.stats["bytes"] += nbytes
+
+    def _send(self, status, body=b"", headers=None, content_type="text/html; charset=utf-8"):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        path = urlsplit(self.path).path
+        if path == "/__stats":
+            self._send(200, json.dumps(self.stats).encode())
+            return
+        if not path.endswith("/"):
+            path += "/"
+
+        delay = random.gauss(self.latency, self.jitter) if self.jitter else self.latency
+        if random.random() < self.straggler_rate:
+            delay += self.straggler_delay
+        if delay > 0:
+            time.sleep(delay)
+
+        roll = random.random()
+        if roll < self.throttle_rate:
+            self._count("throttled")
+            self._send(429, b"Too Many Requests", {"Retry-After": str(self.retry_after)})
+            return
+        if roll < self.throttle_rate + self.error_rate:
+            self._count("errors")
+            self._send(500, b"Internal Server Error")
+            return
+
+        body = self.site.get(path)
+        if body is None:
+            self._count("not_found")
+            self._send(404, b"Not Found")
+            return
+        etag = '"' + hashlib.md5(body).hexdigest() + '"'
+        if self.headers.get("If-None-Match") == etag:
+            self._count("ok")
+            self._send(304, b"", {"ETag": etag})
+            return
+        self._count("ok", len(body))
+        self._send(200, body, {"ETag": etag}, "image/png" if path.startswith("/images/") else "text/html; charset=utf-8")
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_server(host="127.0.0.1", port=8765, pages_dir=None, titles=250, page_kb=300, latency=0.0, jitter=0.0,
+                error_rate=0.0, throttle_rate=0.0, retry_after=1, chart_size=250, straggler_rate=0.0,
+                straggler_delay=0.0):
+    server = ThreadingHTTPServer((host, port), FakeImdbHandler)
+    server.daemon_threads = True
+    base_url = f"http://{host}:{server.server_address[1]}"
+    FakeImdbHandler.site = build_site(base_url, pages_dir, titles, page_kb, chart_size)
+    FakeImdbHandler.latency = latency
+    FakeImdbHandler.jitter = jitter
+    FakeImdbHandler.error_rate = error_rate
+    FakeImdbHandler.throttle_rate = throttle_rate
+    FakeImdbHandler.retry_after = retry_after
+    FakeImdbHandler.straggler_rate = straggler_rate
+    FakeImdbHandler.straggler_delay = straggler_delay
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="IMDb falso para benchmarks del scraper")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--pages", default=None, help="Directorio con páginas grabadas (chart.html, tt*.html o .body de la caché)")
+    parser.add_argument("--titles", type=int, default=250, help="Títulos sintéticos si no hay páginas grabadas")
+    parser.add_argument("--chart-size", type=int, default=250, help="Títulos que aparecen en el chart sintético")
+    parser.add_argument("--page-kb", type=int, default=300, help="Tamaño aproximado de cada página sintética")
+    parser.add_argument("--latency", type=float, default=0.0, help="Latencia media por petición (s)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Desviación típica de la latencia (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fracción de respuestas 500")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fracción de respuestas 429 con Retry-After")
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--straggler-rate", type=float, default=0.0, help="Fracción de peticiones que se quedan colgadas")
+    parser.add_argument("--straggler-delay", type=float, default=8.0, help="Segundos extra de una petición colgada")
+    parser.add_argument("--write-dumps", default=None, help="Escribir dumps TSV de los títulos sintéticos en este directorio y salir")
+    args = parser.parse_args()
+
+    if args.write_dumps:
+        write_dumps(args.write_dumps, args.titles)
+        return
+
+    server = make_server(args.host, args.port, args.pages, args.titles, args.page_kb, args.latency, args.jitter,
+                         args.error_rate, args.throttle_rate, args.retry_after, args.chart_size,
+                         args.straggler_rate, args.straggler_delay)
+    print(f"🎭 IMDb falso en http://{args.host}:{server.server_address[1]}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
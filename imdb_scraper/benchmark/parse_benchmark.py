@@ -0,0 +1,55 @@
+"""Micro-benchmark del parseo de páginas guardadas: fallback HTML (TITLE_RULES) vs camino rápido JSON-LD.
+
+Uso:
+    python parse_benchmark.py ruta/a/paginas/*.html [--repeat 5]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scraper"))
+
+from extractors import parse_movie_details  # noqa: E402
+
+
+def time_parse(raw, fast, repeat):
+    """Mejor tiempo (en ms) de `repeat` parseos de la misma página"""
+    best = None
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            parse_movie_details(raw, fast=fast)
+            elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara el fallback HTML con el camino rápido JSON-LD")
+    parser.add_argument("pages", nargs="+", help="Páginas de título guardadas (.html)")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    total_dom = 0.0
+    total_fast = 0.0
+    print(f"{'página':40} {'KB':>8} {'fallback (ms)':>13} {'rápido (ms)':>12} {'reducción':>10}")
+    for path in args.pages:
+        with open(path, "rb") as f:
+            raw = f.read()
+        dom_ms = time_parse(raw, fast=False, repeat=args.repeat)
+        fast_ms = time_parse(raw, fast=True, repeat=args.repeat)
+        total_dom += dom_ms
+        total_fast += fast_ms
+        reduction = (1 - fast_ms / dom_ms) * 100 if dom_ms else 0
+        print(f"{path[-40:]:40} {len(raw) / 1024:8.1f} {dom_ms:13.2f} {fast_ms:12.2f} {reduction:9.1f}%")
+
+    count = len(args.pages)
+    print(f"\n📊 Media por página: fallback {total_dom / count:.2f} ms, rápido {total_fast / count:.2f} ms "
+          f"({(1 - total_fast / total_dom) * 100 if total_dom else 0:.1f}% menos)")
+
+
+if __name__ == "__main__":
+    main()
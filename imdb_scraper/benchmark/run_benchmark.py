@@ -0,0 +1,208 @@
+"""Benchmark de extremo a extremo del scraper contra el IMDb falso local (fake_imdb.py).
+
+Arranca el servidor falso en un subproceso, ejecuta el crawl completo (chart + detalles +
+exportación JSON/CSV/NDJSON) sin Tor ni caché y mide páginas/s, latencia p50/p95/p99 de cada
+descarga (copias del hedging incluidas: lo que espera el crawl), tiempo de CPU por página y memoria máxima. Guarda el resultado en `results/<fecha>-<commit>.json`
+y, con `--compare`, lo contrasta con una ejecución anterior.
+
+Uso:
+    python run_benchmark.py --titles 100 --latency 0.2 --jitter 0.05 --concurrency 10
+    python run_benchmark.py --compare results/20260101-120000-abc1234.json
+    python run_benchmark.py --straggler-rate 0.03 --no-hedge   # cola de latencias sin hedging, para comparar
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+SCRAPER_DIR = os.path.join(BENCHMARK_DIR, "..", "scraper")
+RESULTS_DIR = os.path.join(BENCHMARK_DIR, "results")
+
+# Métricas comparables entre ejecuciones y si un valor mayor es mejor
+METRICS = {
+    "pages_per_second": True,
+    "latency_p50_ms": False,
+    "latency_p95_ms": False,
+    "latency_p99_ms": False,
+    "cpu_ms_per_page": False,
+    "peak_rss_mb": False,
+    "wall_seconds": False,
+}
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def cpu_seconds():
+    """CPU del proceso más la de los hijos ya terminados (los procesos de parseo)"""
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=BENCHMARK_DIR,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def start_fake_imdb(args):
+    """Lanza fake_imdb.py en un puerto libre y devuelve (proceso, url base)"""
+    command = [sys.executable, os.path.join(BENCHMARK_DIR, "fake_imdb.py"), "--port", "0",
+               "--titles", str(args.titles), "--page-kb", str(args.page_kb),
+               "--latency", str(args.latency), "--jitter", str(args.jitter),
+               "--error-rate", str(args.error_rate), "--throttle-rate", str(args.throttle_rate),
+               "--straggler-rate", str(args.straggler_rate), "--straggler-delay", str(args.straggler_delay)]
+    if args.pages:
+        command += ["--pages", args.pages]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    for line in process.stdout:
+        if "http://" in line:
+            return process, "http://" + line.split("http://", 1)[1].strip()
+    process.wait()
+    raise RuntimeError("El IMDb falso no arrancó")
+
+
+def run(args, base_url, output_dir):
+    # La configuración se lee al importar: el entorno tiene que estar listo antes
+    os.environ.update({"USE_TOR": "0", "IMDB_BASE_URL": base_url, "OUTPUT_DIR": output_dir})
+    if args.parse_workers is not None:
+        os.environ["PARSE_WORKERS"] = str(args.parse_workers)
+    sys.path.insert(0, SCRAPER_DIR)
+    from crawler import io_threads, run_crawl
+    from fetch_policy import FetchPolicy
+    from http_client import ImdbClient
+    from sinks import open_sinks
+
+    latencies = []
+
+    class TimedClient(ImdbClient):
+        """ImdbClient que anota la latencia de cada petición de red"""
+
+        def _request(self, url, timeout, circuit=None, **kwargs):
+            start = time.perf_counter()
+            try:
+                return super()._request(url, timeout, circuit, **kwargs)
+            finally:
+                latencies.append(time.perf_counter() - start)
+
+    hedge = not args.no_hedge
+    policy = FetchPolicy(hedging=hedge)
+    client = TimedClient(proxies=None, pool_size=io_threads(args.concurrency, hedge), policy=policy)
+    log = io.StringIO()
+    cpu_start = cpu_seconds()
+    wall_start = time.perf_counter()
+    with contextlib.redirect_stdout(sys.stdout if args.verbose else log):
+        sink = open_sinks(["json", "csv", "ndjson"], output_dir)
+        movies, written = asyncio.run(
+            run_crawl(limit=args.limit, concurrency=args.concurrency, rate=args.rate, burst=args.concurrency,
+                      max_rate=args.rate, use_cache=False, stream=args.stream, client=client, sink=sink, hedge=hedge)
+        )
+        exported = sink.close()
+    wall = time.perf_counter() - wall_start
+    cpu = cpu_seconds() - cpu_start
+
+    pages = len(latencies)
+    # Latencia de cada descarga tal como la vio el crawl (la primera copia que respondió)
+    fetches = [seconds for kind_latencies in policy.latencies.values() for seconds in kind_latencies]
+    # ru_maxrss está en KB en Linux
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return {
+        "movies": written,
+        "requests": pages,
+        "exported": exported,
+        "wall_seconds": round(wall, 3),
+        "pages_per_second": round(pages / wall, 2) if wall else None,
+        "latency_p50_ms": round(percentile(fetches, 0.50) * 1000, 1) if fetches else None,
+        "latency_p95_ms": round(percentile(fetches, 0.95) * 1000, 1) if fetches else None,
+        "latency_p99_ms": round(percentile(fetches, 0.99) * 1000, 1) if fetches else None,
+        "hedged": policy.stats["hedged"],
+        "cpu_ms_per_page": round(cpu * 1000 / pages, 2) if pages else None,
+        "peak_rss_mb": round(peak_rss_mb, 1),
+    }
+
+
+def compare(result, previous_path):
+    with open(previous_path, encoding="utf-8") as f:
+        previous = json.load(f)["metrics"]
+    print(f"\n{'métrica':20} {'anterior':>12} {'actual':>12} {'cambio':>9}")
+    for name, higher_is_better in METRICS.items():
+        old, new = previous.get(name), result.get(name)
+        if not old or new is None:
+            continue
+        change = (new - old) / old * 100
+        better = change > 0 if higher_is_better else change < 0
+        mark = "✅" if better else ("➖" if change == 0 else "⚠️")
+        print(f"{name:20} {old:>12} {new:>12} {change:>+8.1f}% {mark}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del scraper contra un IMDb falso local")
+    parser.add_argument("--titles", type=int, default=100, help="Títulos sintéticos que sirve el IMDb falso")
+    parser.add_argument("--page-kb", type=int, default=300)
+    parser.add_argument("--pages", default=None, help="Servir páginas grabadas en lugar de sintéticas")
+    parser.add_argument("--latency", type=float, default=0.2, help="Latencia media simulada por petición (s)")
+    parser.add_argument("--jitter", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--straggler-rate", type=float, default=0.0, help="Fracción de peticiones que se quedan colgadas")
+    parser.add_argument("--straggler-delay", type=float, default=8.0)
+    parser.add_argument("--no-hedge", action="store_true", help="Sin copias de las peticiones lentas")
+    parser.add_argument("--limit", type=int, default=100, help="Películas a procesar")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--rate", type=float, default=100.0, help="Ritmo máximo de peticiones/s del scraper")
+    parser.add_argument("--parse-workers", type=int, default=None, help="Procesos de parseo (por defecto PARSE_WORKERS)")
+    parser.add_argument("--stream", action="store_true")
+    parser.add_argument("--compare", default=None, help="Resultado anterior (.json) con el que comparar")
+    parser.add_argument("--output", default=None, help="Fichero de resultados (por defecto results/<fecha>-<commit>.json)")
+    parser.add_argument("--verbose", action="store_true", help="Mostrar la salida del scraper")
+    args = parser.parse_args()
+
+    server, base_url = start_fake_imdb(args)
+    try:
+        with tempfile.TemporaryDirectory() as output_dir:
+            metrics = run(args, base_url, output_dir)
+    finally:
+        server.terminate()
+        server.wait()
+
+    revision = git_revision()
+    result = {
+        "revision": revision,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "params": {key: value for key, value in vars(args).items() if key not in ("compare", "output", "verbose")},
+        "metrics": metrics,
+    }
+    print(f"⏱️ {metrics['movies']} películas, {metrics['requests']} peticiones en {metrics['wall_seconds']} s "
+          f"({metrics['pages_per_second']} páginas/s)")
+    print(f"   Latencia p50/p95/p99: {metrics['latency_p50_ms']} / {metrics['latency_p95_ms']} / {metrics['latency_p99_ms']} ms "
+          f"({metrics['hedged']} copias)")
+    print(f"   CPU por página: {metrics['cpu_ms_per_page']} ms - Memoria máxima: {metrics['peak_rss_mb']} MB")
+
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{revision}.json")
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print(f"💾 Resultado guardado en '{output}'")
+
+    if args.compare:
+        compare(metrics, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Proxy SOCKS5 mínimo para probar el pool de circuitos sin Tor.
+
+Escucha en varios puertos (uno por "circuito"), acepta CONNECT sin autenticación y puede
+añadir latencia artificial por conexión para simular el coste de un circuito Tor.
+
+Uso:
+    python socks_standin.py --ports 1080 1081 1082 --latency 0.2
+    TOR_SOCKS_ENDPOINTS=socks5h://127.0.0.1:1080,socks5h://127.0.0.1:1081,socks5h://127.0.0.1:1082 \\
+        TOR_CONTROL_ADDRESS= python ../scraper/scraper.py
+"""
+import argparse
+import asyncio
+import socket
+import struct
+
+
+async def pipe(reader, writer):
+    try:
+        while True:
+            data = await reader.read(65536)
+            if not data:
+                break
+            writer.write(data)
+            await writer.drain()
+    except (ConnectionError, asyncio.CancelledError):
+        pass
+    finally:
+        writer.close()
+
+
+async def handle(reader, writer, latency):
+    try:
+        version, nmethods = await reader.readexactly(2)
+        await reader.readexactly(nmethods)
+        if version != 5:
+            writer.close()
+            return
+        writer.write(b"\x05\x00")  # sin autenticación
+
+        _, command, _, address_type = await reader.readexactly(4)
+        if address_type == 1:
+            host = socket.inet_ntoa(await reader.readexactly(4))
+        elif address_type == 3:
+            length = (await reader.readexactly(1))[0]
+            host = (await reader.readexactly(length)).decode()
+        elif address_type == 4:
+            host = socket.inet_ntop(socket.AF_INET6, await reader.readexactly(16))
+        else:
+            writer.close()
+            return
+        port = struct.unpack("!H", await reader.readexactly(2))[0]
+        if command != 1:  # solo CONNECT
+            writer.write(b"\x05\x07\x00\x01" + b"\x00" * 6)
+            writer.close()
+            return
+
+        if latency:
+            await asyncio.sleep(latency)
+        try:
+            upstream_reader, upstream_writer = await asyncio.open_connection(host, port)
+        except OSError:
+            writer.write(b"\x05\x05\x00\x01" + b"\x00" * 6)
+            writer.close()
+            return
+        writer.write(b"\x05\x00\x00\x01" + b"\x00" * 6)
+        await writer.drain()
+        await asyncio.gather(pipe(reader, upstream_writer), pipe(upstream_reader, writer))
+    except (asyncio.IncompleteReadError, ConnectionError):
+        writer.close()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Proxy SOCKS5 local que hace de circuito Tor")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--ports", type=int, nargs="+", default=[1080])
+    parser.add_argument("--latency", type=float, default=0.0, help="Segundos añadidos a cada conexión")
+    args = parser.parse_args()
+
+    servers = [
+        await asyncio.start_server(lambda r, w: handle(r, w, args.latency), args.host, port)
+        for port in args.ports
+    ]
+    print(f"🧦 SOCKS5 escuchando en {', '.join(f'{args.host}:{port}' for port in args.ports)}")
+    await asyncio.gather(*(server.serve_forever() for server in servers))
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,166 @@
+import gzip
+import os
+import socket
+import threading
+import time
+import uuid
+import zlib
+from http.client import responses as HTTP_REASONS
+
+from config import ARCHIVE_DIR, ARCHIVE_COMPRESSION, ARCHIVE_SEGMENT_BYTES
+
+INDEX_NAME = "index.tsv"
+SEGMENT_EXTENSIONS = {"gzip": ".warc.gz", "zstd": ".warc.zst"}
+# Cabeceras que describen el cuerpo tal como viajó: aquí se guarda ya descomprimido
+SKIPPED_HEADERS = {"content-encoding", "transfer-encoding", "content-length"}
+
+
+def _compress(data, compression):
+    if compression == "zstd":
+        import zstandard
+
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    return gzip.compress(data, compresslevel=6)
+
+
+def _decompress(data, compression):
+    if compression == "zstd":
+        import zstandard
+
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompressobj(16 + zlib.MAX_WBITS).decompress(data)
+
+
+def build_record(url, status, headers, body, truncated=False, date=None):
+    """Registro WARC/1.0 de tipo `response` (cabeceras WARC + bloque HTTP con el cuerpo)"""
+    http_lines = [f"HTTP/1.1 {status} {HTTP_REASONS.get(status, '')}".rstrip()]
+    http_lines += [f"{name}: {value}" for name, value in headers.items() if name.lower() not in SKIPPED_HEADERS]
+    http_lines.append(f"Content-Length: {len(body)}")
+    block = ("\r\n".join(http_lines) + "\r\n\r\n").encode("utf-8") + body
+
+    warc_lines = [
+        "WARC/1.0",
+        "WARC-Type: response",
+        f"WARC-Record-ID: <urn:uuid:{uuid.uuid4()}>",
+        f"WARC-Date: {time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(date))}",
+        f"WARC-Target-URI: {url}",
+        "Content-Type: application/http; msgtype=response",
+    ]
+    if truncated:
+        # Descarga cortada a propósito (--stream): el cuerpo llega hasta donde hacía falta
+        warc_lines.append("WARC-Truncated: length")
+    warc_lines.append(f"Content-Length: {len(block)}")
+    return ("\r\n".join(warc_lines) + "\r\n\r\n").encode("utf-8") + block + b"\r\n\r\n"
+
+
+def parse_record(record):
+    """Registro WARC -> (url, código, cabeceras HTTP, cuerpo)"""
+    warc_head, _, rest = record.partition(b"\r\n\r\n")
+    warc_headers = dict(line.split(": ", 1) for line in warc_head.decode("utf-8").split("\r\n")[1:])
+    block = rest[:int(warc_headers["Content-Length"])]
+    http_head, _, body = block.partition(b"\r\n\r\n")
+    status_line, *header_lines = http_head.decode("utf-8", errors="replace").split("\r\n")
+    headers = dict(line.split(": ", 1) for line in header_lines if ": " in line)
+    return warc_headers["WARC-Target-URI"], int(status_line.split(" ")[1]), headers, body
+
+
+def read_record(directory, segment, offset, length):
+    """Lee y descomprime un registro suelto a partir de su entrada del índice"""
+    compression = "zstd" if segment.endswith(SEGMENT_EXTENSIONS["zstd"]) else "gzip"
+    with open(os.path.join(directory, segment), "rb") as f:
+        f.seek(offset)
+        return parse_record(_decompress(f.read(length), compression))
+
+
+class PageArchive:
+    """Archivo append-only de todas las páginas descargadas, en formato WARC.
+
+    Cada registro se comprime por separado (un miembro gzip o un frame zstd) y se añade
+    al segmento del proceso; al pasar de `segment_bytes` se abre otro. `index.tsv` anota por
+    cada registro URL, segmento, offset, longitud, código y fecha, así una página se lee
+    con un `seek` sin descomprimir nada más. Los segmentos .warc.gz son WARC estándar.
+
+    Con este archivo, re-extraer los datos tras un cambio de selectores no necesita
+    volver a pedir nada a IMDb (ver reextract.py).
+    """
+
+    def __init__(self, directory=ARCHIVE_DIR, compression=ARCHIVE_COMPRESSION, segment_bytes=ARCHIVE_SEGMENT_BYTES):
+        if compression == "zstd":
+            try:
+                import zstandard  # noqa: F401
+            except ImportError:
+                print("⚠️ zstandard no está instalado: el archivo de páginas usa gzip")
+                compression = "gzip"
+        self.directory = directory
+        self.compression = compression
+        self.segment_bytes = segment_bytes
+        self.records = 0
+        self._lock = threading.Lock()
+        self._segment = None
+        self._segments = 0
+        self._file = None
+        self._index = None
+        os.makedirs(directory, exist_ok=True)
+
+    def _open_segment(self):
+        # Un segmento propio por proceso: varios workers pueden escribir en el mismo directorio
+        self._segments += 1
+        stamp = time.strftime("%Y%m%d%H%M%S", time.gmtime())
+        self._segment = (f"pages-{stamp}-{socket.gethostname()}-{os.getpid()}-{self._segments:03d}"
+                         f"{SEGMENT_EXTENSIONS[self.compression]}")
+        self._file = open(os.path.join(self.directory, self._segment), "ab")
+        if self._index is None:
+            # Cada línea se escribe de una vez en modo append: las de varios procesos no se mezclan
+            self._index = open(os.path.join(self.directory, INDEX_NAME), "a", encoding="utf-8")
+
+    def append(self, url, status, headers, body, truncated=False):
+        """Añade una página al archivo. Devuelve (segmento, offset, longitud)"""
+        now = time.time()
+        data = _compress(build_record(url, status, headers, body, truncated, now), self.compression)
+        with self._lock:
+            if self._file is None or self._file.tell() >= self.segment_bytes:
+                if self._file is not None:
+                    self._file.close()
+                self._open_segment()
+            offset = self._file.tell()
+            self._file.write(data)
+            self._file.flush()
+            # El índice se escribe después del registro: una línea nunca apunta a datos a medias
+            self._index.write(f"{url}\t{self._segment}\t{offset}\t{len(data)}\t{status}\t{now:.3f}\n")
+            self._index.flush()
+            self.records += 1
+        return self._segment, offset, len(data)
+
+    def append_response(self, url, response):
+        self.append(url, response.status_code, response.headers, response.content, getattr(response, "truncated", False))
+
+    def entries(self):
+        """URL -> (segmento, offset, longitud, código, fecha) de la última copia de cada página"""
+        latest = {}
+        try:
+            with open(os.path.join(self.directory, INDEX_NAME), encoding="utf-8") as f:
+                for line in f:
+                    fields = line.rstrip("\n").split("\t")
+                    # Una última línea cortada por una caída se ignora
+                    if len(fields) != 6:
+                        continue
+                    url, segment, offset, length, status, date = fields
+                    latest[url] = (segment, int(offset), int(length), int(status), float(date))
+        except FileNotFoundError:
+            pass
+        return latest
+
+    def read(self, url):
+        entry = self.entries().get(url)
+        if entry is None:
+            return None
+        return read_record(self.directory, *entry[:3])
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            if self._index is not None:
+                self._index.close()
+                self._index = None
@@ -0,0 +1,195 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from urllib.parse import urlsplit, urlunsplit
+
+from config import CACHE_DIR, CACHE_MAX_BYTES, CACHE_TTLS
+from extractors import NAME_ID_RE, TITLE_ID_RE
+
+
+class CacheMiss(Exception):
+    """La URL no está en caché y no se puede ir a la red (modo offline)"""
+
+
+def normalize_url(url):
+    """Host en minúsculas, sin query ni fragmento y con '/' final en la ruta"""
+    parts = urlsplit(url)
+    path = parts.path or "/"
+    if not path.endswith("/"):
+        path += "/"
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, "", ""))
+
+
+def resource_type(url):
+    path = urlsplit(url).path
+    if "/chart/" in path:
+        return "chart"
+    # El reparto completo cuelga de /title/tt.../: no puede compartir clave con la página del título
+    if "/fullcredits" in path:
+        return "credits"
+    if TITLE_ID_RE.search(path):
+        return "title"
+    if NAME_ID_RE.search(path):
+        return "name"
+    return "other"
+
+
+def cache_key(url):
+    """Las páginas de título se indexan por su id `tt`; el resto por URL normalizada"""
+    match = TITLE_ID_RE.search(urlsplit(url).path)
+    if match and resource_type(url) == "title":
+        return match.group(1)
+    return hashlib.sha1(normalize_url(url).encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Caché persistente de respuestas HTTP en disco.
+
+    Cada entrada son dos ficheros: `<clave>.body` con el cuerpo y `<clave>.json` con los
+    validadores (ETag/Last-Modified), la fecha de descarga, el último acceso y, si se
+    guardó, el resultado ya parseado. El tamaño total se limita expulsando por LRU.
+    """
+
+    def __init__(self, directory=CACHE_DIR, max_bytes=CACHE_MAX_BYTES, ttls=None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttls = dict(CACHE_TTLS, **(ttls or {}))
+        self._lock = threading.Lock()
+        self._total_bytes = None  # se calcula al primer put y luego se lleva la cuenta
+        os.makedirs(directory, exist_ok=True)
+
+    def _paths(self, url):
+        base = os.path.join(self.directory, cache_key(url))
+        return base + ".body", base + ".json"
+
+    def _write_meta(self, meta_path, meta):
+        tmp_path = meta_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(tmp_path, meta_path)
+
+    def peek(self, url):
+        """Metadatos de la entrada sin leer el cuerpo ni marcarla como usada"""
+        _, meta_path = self._paths(url)
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def get(self, url):
+        """Devuelve la entrada (metadatos + 'body') o None si no existe"""
+        body_path, meta_path = self._paths(url)
+        with self._lock:
+            try:
+                with open(meta_path, encoding="utf-8") as f:
+                    meta = json.load(f)
+                with open(body_path, "rb") as f:
+                    meta["body"] = f.read()
+            except (OSError, ValueError):
+                return None
+            meta["accessed"] = time.time()
+            self._write_meta(meta_path, {k: v for k, v in meta.items() if k != "body"})
+        return meta
+
+    def is_fresh(self, entry):
+        # Cuerpos cortados por --stream que guardaron versiones anteriores: nunca valen como página completa
+        if entry.get("partial"):
+            return False
+        ttl = self.ttls.get(entry.get("resource", "other"), self.ttls["other"])
+        return time.time() - entry.get("fetched_at", 0) < ttl
+
+    def put(self, url, response):
+        """Guarda el cuerpo y los validadores de una respuesta 200 completa (no una cortada por --stream)"""
+        body_path, meta_path = self._paths(url)
+        body = response.content
+        meta = {
+            "url": normalize_url(url),
+            "resource": resource_type(url),
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "encoding": response.encoding or "utf-8",
+            "fetched_at": time.time(),
+            "accessed": time.time(),
+            "size": len(body),
+            "parsed": {},
+        }
+        with self._lock:
+            with open(body_path + ".tmp", "wb") as f:
+                f.write(body)
+            os.replace(body_path + ".tmp", body_path)
+            previous = self.peek(url)
+            self._write_meta(meta_path, meta)
+            if self._total_bytes is None:
+                self._evict()
+            else:
+                self._total_bytes += len(body) - (previous or {}).get("size", 0)
+                if self._total_bytes > self.max_bytes:
+                    self._evict()
+
+    def revalidated(self, url, entry):
+        """Tras un 304 la entrada vuelve a estar fresca sin descargar nada"""
+        _, meta_path = self._paths(url)
+        entry["fetched_at"] = time.time()
+        with self._lock:
+            self._write_meta(meta_path, {k: v for k, v in entry.items() if k != "body"})
+
+    def store_parsed(self, url, name, parsed):
+        """Guarda el resultado de un parser para no repetirlo mientras la página no cambie"""
+        _, meta_path = self._paths(url)
+        with self._lock:
+            try:
+                with open(meta_path, encoding="utf-8") as f:
+                    meta = json.load(f)
+            except (OSError, ValueError):
+                return
+            meta.setdefault("parsed", {})[name] = parsed
+            self._write_meta(meta_path, meta)
+
+    def _evict(self):
+        """Expulsa las entradas menos usadas hasta quedar por debajo de max_bytes"""
+        entries = []
+        total = 0
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            meta_path = os.path.join(self.directory, name)
+            try:
+                with open(meta_path, encoding="utf-8") as f:
+                    meta = json.load(f)
+            except (OSError, ValueError):
+                continue
+            entries.append((meta.get("accessed", 0), meta.get("size", 0), meta_path))
+            total += meta.get("size", 0)
+
+        entries.sort()
+        for _, size, meta_path in entries:
+            if total <= self.max_bytes:
+                break
+            for path in (meta_path, meta_path[:-len(".json")] + ".body"):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            total -= size
+        self._total_bytes = total
+
+
+class CachedResponse:
+    """Respuesta servida desde la caché con la misma interfaz mínima que requests.Response"""
+
+    def __init__(self, url, entry, not_modified=False):
+        self.url = url
+        self.entry = entry
+        self.status_code = 200
+        self.content = entry["body"]
+        self.encoding = entry.get("encoding") or "utf-8"
+        self.headers = {}
+        self.from_cache = True
+        self.not_modified = not_modified
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding, errors="replace")
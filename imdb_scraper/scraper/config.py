@@ -0,0 +1,147 @@
+import os
+
+############################## Configuración general #########################################################
+IMDB_BASE_URL = os.environ.get("IMDB_BASE_URL", "https://www.imdb.com")
+IMDB_TOP_URL = IMDB_BASE_URL + "/chart/top/"
+# Charts que alimentan la frontera de crawl (rutas relativas a IMDB_BASE_URL, separadas por comas)
+IMDB_CHART_URLS = [IMDB_BASE_URL + path for path in os.environ.get("IMDB_CHARTS", "/chart/top/").split(",") if path]
+PROXIES = {
+     "http": "socks5h://tor:9050",
+     "https": "socks5h://tor:9050"
+ }
+#PROXIES = None  # Desactivar proxy para pruebas
+if os.environ.get("USE_TOR", "1") == "0":
+    PROXIES = None  # Desactivar proxy sin tocar el código (pruebas locales)
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0.0.0 Safari/537.36"
+}
+
+OUTPUT_DIR = os.environ.get("OUTPUT_DIR", "/app/output")
+
+# Motor asíncrono: peticiones simultáneas y presupuesto de cortesía por host
+MAX_CONCURRENCY = int(os.environ.get("MAX_CONCURRENCY", "5"))
+RATE_LIMIT = float(os.environ.get("RATE_LIMIT", "1.0"))  # peticiones por segundo y host
+RATE_BURST = int(os.environ.get("RATE_BURST", "2"))
+
+# Control AIMD del ritmo: RATE_LIMIT es el punto de partida y RATE_MAX el techo
+RATE_MAX = float(os.environ.get("RATE_MAX", "5.0"))
+AIMD_MIN_RATE = float(os.environ.get("AIMD_MIN_RATE", "0.2"))
+AIMD_INCREASE = float(os.environ.get("AIMD_INCREASE", "0.5"))  # peticiones/s ganadas por segundo sano
+AIMD_DECREASE = float(os.environ.get("AIMD_DECREASE", "0.5"))  # factor aplicado en cada recorte
+AIMD_LATENCY_SPIKE = float(os.environ.get("AIMD_LATENCY_SPIKE", "3.0"))  # veces la latencia habitual
+
+# Caché de respuestas en disco (TTL en segundos por tipo de recurso)
+CACHE_DIR = os.environ.get("CACHE_DIR", os.path.join(OUTPUT_DIR, "cache"))
+CACHE_MAX_BYTES = int(os.environ.get("CACHE_MAX_BYTES", str(500 * 1024 * 1024)))
+CACHE_TTLS = {
+    "chart": 6 * 3600,
+    "title": 24 * 3600,
+    "credits": 24 * 3600,
+    "name": 7 * 24 * 3600,
+    "other": 24 * 3600,
+}
+
+# Diario de reanudación: una línea por película completada, fsync cada N registros
+JOURNAL_PATH = os.environ.get("JOURNAL_PATH", os.path.join(OUTPUT_DIR, "crawl_journal.ndjson"))
+JOURNAL_FSYNC_EVERY = int(os.environ.get("JOURNAL_FSYNC_EVERY", "10"))
+
+# Descarga en streaming: tamaño de cada trozo leído antes de comprobar si ya basta
+STREAM_CHUNK_SIZE = int(os.environ.get("STREAM_CHUNK_SIZE", str(16 * 1024)))
+
+# Pool de circuitos Tor: un endpoint SOCKS por SocksPort (o por contenedor tor)
+TOR_SOCKS_ENDPOINTS = [endpoint for endpoint in os.environ.get(
+    "TOR_SOCKS_ENDPOINTS",
+    "socks5h://tor:9050,socks5h://tor:9052,socks5h://tor:9053,socks5h://tor:9054",
+).split(",") if endpoint]
+TOR_CONTROL_ADDRESS = os.environ.get("TOR_CONTROL_ADDRESS", "tor:9051")
+TOR_CONTROL_PASSWORD = os.environ.get("TOR_CONTROL_PASSWORD", "")
+NEWNYM_MIN_INTERVAL = float(os.environ.get("NEWNYM_MIN_INTERVAL", "10"))
+# Segundos que se espera a que Tor termine el bootstrap antes de la primera petición (0 = no comprobarlo)
+TOR_BOOTSTRAP_TIMEOUT = float(os.environ.get("TOR_BOOTSTRAP_TIMEOUT", "300"))
+
+# Métricas por etapa en formato Prometheus: endpoint HTTP (0 = desactivado) y/o fichero
+METRICS_PORT = int(os.environ.get("METRICS_PORT", "0"))
+METRICS_TEXTFILE = os.environ.get("METRICS_TEXTFILE", os.path.join(OUTPUT_DIR, "metrics.prom"))
+METRICS_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Salida en streaming: formatos escritos a medida que termina cada película y tamaño del lote
+OUTPUT_FORMATS = [fmt for fmt in os.environ.get("OUTPUT_FORMATS", "json,csv,ndjson,sqlite").split(",") if fmt]
+SINK_BATCH_SIZE = int(os.environ.get("SINK_BATCH_SIZE", "20"))
+
+# Base de datos SQLite (movies, people, movie_cast) que se actualiza en cada crawl
+SQLITE_PATH = os.environ.get("SQLITE_PATH", os.path.join(OUTPUT_DIR, "movies.db"))
+
+# Frontera de crawl: deduplicación exacta (set) o aproximada (bloom) y profundidad de enlaces a seguir
+FRONTIER_DEDUPE = os.environ.get("FRONTIER_DEDUPE", "set")
+FRONTIER_BLOOM_CAPACITY = int(os.environ.get("FRONTIER_BLOOM_CAPACITY", "1000000"))
+FRONTIER_BLOOM_ERROR = float(os.environ.get("FRONTIER_BLOOM_ERROR", "0.001"))
+FOLLOW_DEPTH = int(os.environ.get("FOLLOW_DEPTH", "0"))  # 0 = solo los títulos de los charts
+
+# Parseo en procesos aparte: workers del pool (0 = en el propio proceso) y páginas descargadas en espera como máximo.
+# Con un solo núcleo el pool solo añade copias entre procesos, así que por defecto se parsea en el principal
+PARSE_WORKERS = int(os.environ.get("PARSE_WORKERS", str(os.cpu_count() if (os.cpu_count() or 1) > 1 else 0)))
+PARSE_QUEUE_SIZE = int(os.environ.get("PARSE_QUEUE_SIZE", "10"))
+
+# Dumps TSV de IMDb (title.basics, title.ratings, title.principals, name.basics .tsv.gz) y tipos de título a importar
+IMDB_DUMPS_DIR = os.environ.get("IMDB_DUMPS_DIR", "")
+DUMP_TITLE_TYPES = [kind for kind in os.environ.get("DUMP_TITLE_TYPES", "movie").split(",") if kind]
+
+# Modo coordinador/workers: papel de este proceso y cola compartida (SQLite en el volumen de salida)
+SCRAPER_ROLE = os.environ.get("SCRAPER_ROLE", "standalone")  # standalone, coordinator o worker
+QUEUE_PATH = os.environ.get("QUEUE_PATH", os.path.join(OUTPUT_DIR, "work_queue.db"))
+QUEUE_MAX_ATTEMPTS = int(os.environ.get("QUEUE_MAX_ATTEMPTS", "3"))
+LEASE_SECONDS = float(os.environ.get("LEASE_SECONDS", "120"))  # más que el timeout de una página por Tor
+QUEUE_POLL_SECONDS = float(os.environ.get("QUEUE_POLL_SECONDS", "2"))
+
+# Archivo WARC de páginas descargadas (para re-extraer sin red): activado, compresión (gzip o zstd) y tamaño de segmento
+ARCHIVE_PAGES = os.environ.get("ARCHIVE_PAGES", "1") == "1"
+ARCHIVE_DIR = os.environ.get("ARCHIVE_DIR", os.path.join(OUTPUT_DIR, "archive"))
+ARCHIVE_COMPRESSION = os.environ.get("ARCHIVE_COMPRESSION", "gzip")
+ARCHIVE_SEGMENT_BYTES = int(os.environ.get("ARCHIVE_SEGMENT_BYTES", str(256 * 1024 * 1024)))
+
+# Parser HTML del fallback: auto (el más rápido instalado), selectolax, lxml o html.parser (puro Python)
+HTML_BACKEND = os.environ.get("HTML_BACKEND", "auto")
+
+# Reparto completo (/fullcredits) y fichas de persona (/name/nm...): activado, fichas por película
+# (0 = todo el reparto) y memo persistente por id `nm` con su TTL (s) y tamaño máximo
+CAST_ENRICH = os.environ.get("CAST_ENRICH", "0") == "1"
+CAST_PEOPLE_LIMIT = int(os.environ.get("CAST_PEOPLE_LIMIT", "10"))
+PERSON_CACHE_PATH = os.environ.get("PERSON_CACHE_PATH", os.path.join(OUTPUT_DIR, "person_cache.db"))
+PERSON_CACHE_TTL = float(os.environ.get("PERSON_CACHE_TTL", str(30 * 24 * 3600)))
+PERSON_CACHE_MAX_ENTRIES = int(os.environ.get("PERSON_CACHE_MAX_ENTRIES", "200000"))
+
+# Plazos de descarga: por petición con sus copias (s; 0 = solo los timeouts de cada socket) y
+# presupuesto total del crawl (s; 0 = sin límite)
+FETCH_DEADLINE = float(os.environ.get("FETCH_DEADLINE", "45"))
+RUN_BUDGET = float(os.environ.get("RUN_BUDGET", "0"))
+
+# Hedging: si una petición pasa el percentil HEDGE_QUANTILE de las últimas HEDGE_WINDOW de su tipo
+# (tras HEDGE_MIN_SAMPLES), sale una copia por otro circuito; como mucho HEDGE_MAX_RATIO copias por petición
+HEDGE_ENABLED = os.environ.get("HEDGE_ENABLED", "1") == "1"
+HEDGE_QUANTILE = float(os.environ.get("HEDGE_QUANTILE", "0.95"))
+HEDGE_WINDOW = int(os.environ.get("HEDGE_WINDOW", "200"))
+HEDGE_MIN_SAMPLES = int(os.environ.get("HEDGE_MIN_SAMPLES", "20"))
+HEDGE_MAX_RATIO = float(os.environ.get("HEDGE_MAX_RATIO", "0.1"))
+HEDGE_MIN_DELAY = float(os.environ.get("HEDGE_MIN_DELAY", "0.05"))
+
+# Pósters (`image` del chart): descarga activada, directorio direccionado por contenido, descargas a la
+# vez, tamaño máximo (bytes), lados de las miniaturas (px separados por comas; vacío = ninguna) y procesos
+POSTERS_ENABLED = os.environ.get("POSTERS_ENABLED", "0") == "1"
+POSTERS_DIR = os.environ.get("POSTERS_DIR", os.path.join(OUTPUT_DIR, "posters"))
+POSTER_CONCURRENCY = int(os.environ.get("POSTER_CONCURRENCY", "4"))
+POSTER_MAX_BYTES = int(os.environ.get("POSTER_MAX_BYTES", str(20 * 1024 * 1024)))
+POSTER_THUMB_SIZES = [int(size) for size in os.environ.get("POSTER_THUMB_SIZES", "").split(",") if size.strip()]
+POSTER_THUMB_WORKERS = int(os.environ.get("POSTER_THUMB_WORKERS", "2"))
+
+# Servicio de consultas (query_service.py): puerto, resultados que sirve (el JSON del crawl o el NDJSON),
+# cada cuántos segundos se mira si un crawl nuevo los cambió y tope de resultados por consulta
+QUERY_PORT = int(os.environ.get("QUERY_PORT", "8080"))
+QUERY_SOURCE = os.environ.get("QUERY_SOURCE", os.path.join(OUTPUT_DIR, "movies_detailed.json"))
+QUERY_RELOAD_SECONDS = float(os.environ.get("QUERY_RELOAD_SECONDS", "2"))
+QUERY_MAX_RESULTS = int(os.environ.get("QUERY_MAX_RESULTS", "1000"))
+
+# Precalentado: conexiones keep-alive que se abren por circuito (o directas) mientras se pide el chart
+# (0 = ninguna) y URL ligera del mismo host con la que se abren
+PREWARM_CONNECTIONS = int(os.environ.get("PREWARM_CONNECTIONS", "2"))
+PREWARM_URL = os.environ.get("PREWARM_URL", IMDB_BASE_URL + "/robots.txt")
+############################## Configuración general #########################################################
@@ -0,0 +1,596 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin
+
+from config import (IMDB_BASE_URL, IMDB_TOP_URL, IMDB_CHART_URLS, PROXIES, MAX_CONCURRENCY, RATE_LIMIT, RATE_BURST,
+                    RATE_MAX, FOLLOW_DEPTH, PARSE_WORKERS, PARSE_QUEUE_SIZE, IMDB_DUMPS_DIR, ARCHIVE_PAGES, CAST_ENRICH,
+                    CAST_PEOPLE_LIMIT, HEDGE_ENABLED, RUN_BUDGET, POSTERS_ENABLED, POSTER_CONCURRENCY, POSTER_THUMB_SIZES,
+                    PREWARM_URL)
+from extractors import (parse_top_movies, parse_movie_details, parse_full_credits, parse_person, build_enhanced_movie,
+                        title_id, details_complete)
+from archive import PageArchive
+from cache import ResponseCache, resource_type
+from fetch_policy import RECHECK_SECONDS, DeadlineExceeded, FetchPolicy
+from frontier import CrawlFrontier, canonical_title_url
+from http_client import ImdbClient, RequestCancelled
+from imdb_dumps import enrich_from_dumps, load_titles
+from metrics import metrics
+from parse_pool import ParsePool
+from person_cache import PersonCache
+from planner import plan_fetches
+from posters import download_posters
+from proxy_pool import ProxyPool
+from rate_limit import AdaptiveRateLimiter, parse_retry_after
+
+# Las peticiones siguen usando `requests` (y pysocks para Tor); asyncio solo orquesta
+# cuántas van en vuelo a la vez y a qué ritmo salen hacia cada host.
+
+
+def acquire_circuit(client, exclude=None):
+    return client.proxy_pool.acquire(exclude) if client.proxy_pool is not None else None
+
+
+async def send(client, url, limiter, circuit, timeout, until=None, cancel=None):
+    """Una petición por `circuit` respetando el ritmo del host y del circuito.
+
+    La respuesta (código, latencia, Retry-After) vuelve al limiter como feedback AIMD.
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        with metrics.timer("imdb_stage_seconds", stage="rate_limit_wait"):
+            await limiter.acquire(url, circuit)
+    except asyncio.CancelledError:
+        # Copia cancelada antes de salir: el circuito no llegó a usarse
+        if circuit is not None:
+            client.proxy_pool.cancel(circuit)
+        raise
+    start = time.perf_counter()
+    try:
+        response = await loop.run_in_executor(
+            None, lambda: client.get(url, timeout=timeout, until=until, circuit=circuit, cancel=cancel)
+        )
+    except RequestCancelled:
+        raise
+    except Exception:
+        limiter.feedback(url, circuit, error=True)
+        raise
+    limiter.feedback(url, circuit, response.status_code, time.perf_counter() - start,
+                     parse_retry_after(response.headers.get("Retry-After")))
+    return response
+
+
+async def hedged_send(client, url, limiter, timeout, until, policy):
+    """Descarga con plazo y, si tarda más de lo habitual para su tipo, con una copia por otro circuito.
+
+    Gana la primera respuesta; la otra se cancela (si ya está leyendo el cuerpo lo abandona
+    y cierra la conexión; si aún espera cabeceras, su hilo acaba con el timeout).
+    """
+    loop = asyncio.get_running_loop()
+    deadline = policy.begin()
+    if deadline is not None:
+        timeout = min(timeout, deadline)
+    kind = resource_type(url)
+    hedge_delay = None
+    hedge_done = not policy.hedging
+    start = loop.time()
+    circuits = [acquire_circuit(client)]
+    cancels = [threading.Event()]
+    attempts = [asyncio.ensure_future(send(client, url, limiter, circuits[0], timeout, until, cancels[0]))]
+    pending = set(attempts)
+    error = None
+    try:
+        while pending:
+            waits = []
+            if deadline is not None:
+                waits.append(start + deadline - loop.time())
+            if not hedge_done:
+                # El umbral puede aparecer mientras se espera (las primeras descargas aún no tienen datos)
+                hedge_delay = hedge_delay if hedge_delay is not None else policy.hedge_delay(kind)
+                waits.append(start + hedge_delay - loop.time() if hedge_delay is not None else RECHECK_SECONDS)
+            done, pending = await asyncio.wait(pending, timeout=max(min(waits), 0) if waits else None,
+                                               return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    policy.observe(kind, loop.time() - start, len(attempts) > 1, task is not attempts[0])
+                    return task.result()
+                error = task.exception()
+            elapsed = loop.time() - start
+            if pending and deadline is not None and elapsed >= deadline:
+                policy.expired()
+                raise DeadlineExceeded(f"sin respuesta en {deadline:.1f} s")
+            if not hedge_done and hedge_delay is not None and elapsed >= hedge_delay:
+                # Una sola copia por descarga, y solo mientras la original siga en vuelo
+                hedge_done = True
+                if pending and policy.may_hedge():
+                    circuits.append(acquire_circuit(client, exclude=circuits[0]))
+                    cancels.append(threading.Event())
+                    attempts.append(asyncio.ensure_future(
+                        send(client, url, limiter, circuits[1], timeout, until, cancels[1])))
+                    pending.add(attempts[1])
+        raise error
+    finally:
+        for cancel in cancels:
+            cancel.set()
+        for task in attempts:
+            if not task.done():
+                task.cancel()
+            elif not task.cancelled():
+                task.exception()  # el error de la perdedora ya no interesa
+
+
+async def fetch(client, url, limiter, timeout, until=None):
+    """Descarga una URL con el cliente compartido respetando el ritmo del host y del circuito.
+
+    Con una política en el cliente (fetch_policy.FetchPolicy) la descarga tiene plazo y las
+    lentas se duplican por otro circuito (hedged_send).
+    """
+    loop = asyncio.get_running_loop()
+    # Lo que se sirve desde la caché no consume presupuesto de cortesía
+    if not client.needs_network(url):
+        return await loop.run_in_executor(None, lambda: client.get(url, timeout=timeout, until=until))
+    if client.policy is not None:
+        return await hedged_send(client, url, limiter, timeout, until, client.policy)
+    return await send(client, url, limiter, acquire_circuit(client), timeout, until)
+
+############################## Funcion obtener peliculas (async) #########################################################
+async def get_top_movies_async(client, limiter, chart_url=IMDB_TOP_URL, parse_pool=None):
+    print(f"🔍 Obteniendo lista de películas de {chart_url}...")
+
+    try:
+        response = await fetch(client, chart_url, limiter, timeout=20)
+        print(f"✅ Código de estado: {response.status_code}")
+    except Exception as e:
+        print(f"❌ Error al acceder a IMDb: {e}")
+        return []
+
+    if parse_pool is not None:
+        return await parse_pool.parse(chart_url, response, parse_top_movies)
+    return client.parse(chart_url, response, parse_top_movies)
+############################## Funcion obtener peliculas (async) #########################################################
+
+############################## Funcion obtener detalles de peliculas (async) #########################################################
+async def fetch_movie_page(client, movie_url, limiter, stream=False):
+    """Descarga la página de detalle de una película. Devuelve (url, respuesta) o (url, None) si falló.
+
+    Con `stream=True` la descarga se corta en cuanto el JSON-LD y el metascore ya llegaron.
+    """
+    if not movie_url.startswith('http'):
+        movie_url = urljoin(IMDB_BASE_URL, movie_url)
+
+    print(f"🎬 Obteniendo detalles de: {movie_url}")
+
+    try:
+        response = await fetch(client, movie_url, limiter, timeout=15, until=details_complete if stream else None)
+
+        if response.status_code != 200:
+            print(f"❌ Error HTTP {response.status_code} para {movie_url}")
+            return movie_url, None
+
+    except Exception as e:
+        print(f"❌ Error al acceder a {movie_url}: {e}")
+        return movie_url, None
+
+    return movie_url, response
+
+
+async def get_movie_details_async(client, movie_url, limiter, stream=False, parse_pool=None):
+    """Versión asíncrona de get_movie_details: descarga (fetch_movie_page) y parseo.
+
+    Con `parse_pool` (un ParsePool) el parseo va a otro proceso sin bloquear el bucle.
+    """
+    movie_url, response = await fetch_movie_page(client, movie_url, limiter, stream)
+    if response is None:
+        return {}
+    if parse_pool is not None:
+        return await parse_pool.parse(movie_url, response, parse_movie_details)
+    return client.parse(movie_url, response, parse_movie_details)
+############################## Funcion obtener detalles de peliculas (async) #########################################################
+
+############################## Reparto completo y fichas de persona (async) #########################################################
+def credits_url(movie_url):
+    return f"{IMDB_BASE_URL}/title/{title_id(movie_url)}/fullcredits/"
+
+
+def person_url(nm_id):
+    return f"{IMDB_BASE_URL}/name/{nm_id}/"
+
+
+async def fetch_parsed(client, url, limiter, parser, parse_pool=None):
+    """Descarga y parsea una página auxiliar (reparto, persona). None si falló"""
+    try:
+        response = await fetch(client, url, limiter, timeout=15)
+    except Exception as e:
+        print(f"❌ Error al acceder a {url}: {e}")
+        return None
+    if response.status_code != 200:
+        print(f"❌ Error HTTP {response.status_code} para {url}")
+        return None
+    if parse_pool is not None:
+        return await parse_pool.parse(url, response, parser)
+    return client.parse(url, response, parser)
+
+
+async def enrich_cast(client, movie_url, limiter, people, parse_pool=None, people_limit=CAST_PEOPLE_LIMIT):
+    """Reparto completo de una película con la ficha de sus `people_limit` primeros (0 = todos).
+
+    Las fichas salen de `people` (un PersonCache): cada persona se descarga como mucho
+    una vez por TTL aunque aparezca en muchas películas del crawl.
+    """
+    cast = await fetch_parsed(client, credits_url(movie_url), limiter, parse_full_credits, parse_pool)
+    if not cast:
+        return []
+
+    async def fetch_person(nm_id):
+        return await fetch_parsed(client, person_url(nm_id), limiter, parse_person, parse_pool)
+
+    wanted = cast[:people_limit] if people_limit else cast
+    persons = await asyncio.gather(*(people.get_or_fetch(member['nm_id'], fetch_person) for member in wanted))
+    enriched = []
+    for position, member in enumerate(cast):
+        entry = {'nm_id': member['nm_id'], 'name': member['name'], 'position': position}
+        person = persons[position] if position < len(persons) else None
+        if person:
+            entry['birth_year'] = person['birth_year']
+            entry['known_for'] = person['known_for']
+        enriched.append(entry)
+    return enriched
+
+
+def report_people(people):
+    """Resumen por consola del memo de personas"""
+    stats = people.stats
+    lookups = stats["memory"] + stats["disk"] + stats["coalesced"] + stats["fetched"] + stats["failed"]
+    if not lookups:
+        return
+    print(f"🧑 Personas: {lookups} consultas, {people.hit_ratio():.0%} sin descargar (memoria {stats['memory']}, "
+          f"disco {stats['disk']}, esperando a otra descarga {stats['coalesced']}), {stats['fetched']} descargadas, "
+          f"{stats['expired']} caducadas, {stats['failed']} fallidas")
+############################## Reparto completo y fichas de persona (async) #########################################################
+
+def stub_movie(tt_id):
+    """Registro mínimo para un título descubierto por enlace (sin datos de chart)"""
+    return {"title": "", "year": "", "duration": "", "rating": "", "ratingCount": "",
+            "url": canonical_title_url(tt_id), "genre": "", "description": "", "image": ""}
+
+
+async def crawl_movies(client, frontier, limiter, concurrency=MAX_CONCURRENCY, journal=None, stream=False, sink=None,
+                       limit=None, follow_depth=0, parse_pool=None, queue_size=PARSE_QUEUE_SIZE, people=None):
+    """Procesa títulos de la frontera (frontier.CrawlFrontier) en dos etapas.
+
+    `concurrency` workers de descarga sacan títulos de la frontera y dejan el HTML en una
+    cola de como mucho `queue_size` páginas; los workers de parseo (uno por proceso del
+    `parse_pool`, un ParsePool) la vacían. Si el parseo va por detrás, la cola se llena y
+    las descargas esperan: la memoria queda acotada aunque la red vaya más rápida.
+
+    Cada entrada de la frontera lleva su registro del chart y si necesita la página de
+    detalle (planner.plan_fetches); los títulos descubiertos por enlaces se crawlean desde
+    cero. Con `follow_depth` > 0 los títulos enlazados desde cada página de detalle se
+    encolan hasta esa profundidad. Como mucho se procesan `limit` títulos.
+
+    Devuelve los registros combinados en orden de la frontera. Con un `journal`
+    (CrawlJournal) las películas ya registradas no se vuelven a pedir y cada película
+    completada se anota en cuanto termina. Con un `sink` (de sinks.open_sinks) cada
+    registro se escribe en cuanto está listo, sin guardarlo en memoria, y se devuelve
+    cuántos se escribieron. Con `people` (un PersonCache) cada película se completa con
+    su reparto (enrich_cast) antes de emitirla.
+    """
+    done = journal.done if journal is not None else {}
+    limit = limit if limit is not None else len(frontier)
+    parse_pool = parse_pool if parse_pool is not None else ParsePool(client, 0)
+    pages = asyncio.Queue(maxsize=max(queue_size, 1))
+
+    results = []
+    # Los títulos terminan en cualquier orden: los adelantados esperan aquí a los anteriores
+    # para que la salida conserve el orden de la frontera (normalmente solo unos pocos)
+    ready = {}
+    next_idx = 1
+    written = 0
+    taken = 0
+    active = 0
+
+    def emit(idx, record):
+        nonlocal next_idx, written, active
+        active -= 1
+        ready[idx] = record
+        while next_idx in ready:
+            record = ready.pop(next_idx)
+            next_idx += 1
+            if record is None:
+                continue
+            written += 1
+            if sink is None:
+                results.append(record)
+            else:
+                with metrics.timer("imdb_stage_seconds", stage="write_sink"):
+                    sink.write(record)
+
+    def finish(idx, tt_id, depth, movie, details):
+        enhanced_movie = build_enhanced_movie(movie, details)
+        metrics.inc("imdb_movies_total", source="detail" if details else "failed")
+        if depth < follow_depth:
+            for related_id in details.get('related_ids', []):
+                frontier.push(related_id, depth + 1)
+        # Solo se anotan los detalles obtenidos: los errores se reintentan al reanudar
+        if journal is not None and details:
+            with metrics.timer("imdb_stage_seconds", stage="write_journal"):
+                journal.append(tt_id, enhanced_movie)
+        total = min(limit, taken + len(frontier))
+        actors_str = ', '.join(enhanced_movie['Actores']) if enhanced_movie['Actores'] else 'No disponible'
+        print(f"✅ [{idx}/{total}] {enhanced_movie['Título']} - Año: {enhanced_movie['Año']} - Duración: {enhanced_movie['Duración (min)']} min - Rating: {enhanced_movie['Calificación']} - Metascore: {enhanced_movie['Metascore']} - Actores: {actors_str}")
+        return enhanced_movie
+
+    async def take(idx, tt_id, depth, entry):
+        """Etapa de descarga: (registro, False) si no hace falta parsear nada o (None, True) si la página quedó en cola"""
+        movie, needs_detail = entry if entry is not None else (stub_movie(tt_id), True)
+        if not needs_detail:
+            metrics.inc("imdb_movies_total", source="chart")
+            return build_enhanced_movie(movie, {}), False
+        if tt_id in done:
+            metrics.inc("imdb_movies_total", source="journal")
+            return done.pop(tt_id), False
+        movie_url, response = await fetch_movie_page(client, movie['url'], limiter, stream)
+        if response is None:
+            # Sin presupuesto la página ni se pidió: no se emite vacía y el diario la reanuda
+            if client.policy is not None and client.policy.exhausted():
+                metrics.inc("imdb_movies_total", source="budget")
+                client.policy.skip()
+                return None, False
+            return finish(idx, tt_id, depth, movie, {}), False
+        # Con la cola llena este worker deja de descargar hasta que un parser quede libre
+        await pages.put((idx, tt_id, depth, movie, movie_url, response, time.perf_counter()))
+        return None, True
+
+    async def fetch_worker():
+        nonlocal taken, active
+        while taken < limit:
+            # Presupuesto agotado: lo que queda en la frontera se deja para la próxima ejecución
+            if client.policy is not None and client.policy.exhausted():
+                return
+            item = frontier.pop()
+            if item is None:
+                # Cola vacía: si aún hay páginas en vuelo (o por parsear) pueden traer enlaces nuevos
+                if not active:
+                    return
+                await asyncio.sleep(0.05)
+                continue
+            taken += 1
+            idx = taken
+            active += 1
+            record, queued = None, False
+            try:
+                record, queued = await take(idx, *item)
+            except Exception as e:
+                print(f"❌ Error procesando {item[0]}: {e}")
+            # Lo encolado lo emite el worker de parseo al terminar
+            if not queued:
+                emit(idx, record)
+
+    async def parse_worker():
+        while True:
+            job = await pages.get()
+            if job is None:
+                return
+            idx, tt_id, depth, movie, movie_url, response, queued_at = job
+            metrics.observe("imdb_stage_seconds", time.perf_counter() - queued_at, stage="parse_queue")
+            record = None
+            try:
+                details = await parse_pool.parse(movie_url, response, parse_movie_details)
+                if people is not None and details:
+                    details['cast'] = await enrich_cast(client, movie_url, limiter, people, parse_pool)
+                record = finish(idx, tt_id, depth, movie, details)
+            except Exception as e:
+                print(f"❌ Error procesando {tt_id}: {e}")
+            finally:
+                emit(idx, record)
+
+    # Con reparto cada worker de parseo también espera a la red: hacen falta tantos como descargas
+    parsers = [asyncio.create_task(parse_worker())
+               for _ in range(max(parse_pool.workers, 1) + (concurrency if people is not None else 0))]
+    try:
+        await asyncio.gather(*(fetch_worker() for _ in range(concurrency)))
+    finally:
+        for _ in parsers:
+            await pages.put(None)
+        await asyncio.gather(*parsers)
+    if client.policy is not None and client.policy.exhausted() and taken < limit and len(frontier):
+        client.policy.skip(min(limit - taken, len(frontier)))
+    return results if sink is None else written
+
+
+def io_threads(concurrency, hedge=HEDGE_ENABLED):
+    """Hilos (y conexiones por host) para `concurrency` descargas: las copias del hedging necesitan los suyos"""
+    return concurrency * 2 if hedge else concurrency
+
+
+def build_client(concurrency=MAX_CONCURRENCY, use_cache=True, offline=False, hedge=HEDGE_ENABLED, budget=RUN_BUDGET):
+    """Cliente HTTP con la caché en disco, el archivo de páginas, la política de plazos y copias
+    (FetchPolicy) y, con Tor activo, el pool de circuitos"""
+    cache = ResponseCache() if use_cache or offline else None
+    # Con Tor activo las peticiones se reparten entre los circuitos del pool
+    proxy_pool = ProxyPool() if PROXIES and not offline else None
+    archive = PageArchive() if ARCHIVE_PAGES and not offline else None
+    policy = FetchPolicy(hedging=hedge, budget=budget) if not offline else None
+    return ImdbClient(pool_size=io_threads(concurrency, hedge), cache=cache, offline=offline, proxy_pool=proxy_pool,
+                      archive=archive, policy=policy)
+
+
+async def prewarm(client, limiter):
+    """Precalienta el pool de conexiones (ImdbClient.warm_up) sin bloquear el bucle: se lanza
+    a la vez que se pide el chart o se espera trabajo de la cola.
+
+    Cada conexión espera su token del limiter como cualquier otra petición y devuelve su
+    respuesta como feedback: el arranque no lanza una ráfaga contra IMDb antes de que el
+    AIMD haya visto nada. Las conexiones van en hilos propios para no ocupar los de descarga.
+    """
+    loop = asyncio.get_running_loop()
+    jobs = client.warm_up_circuits()
+    if not jobs:
+        return
+    start = time.perf_counter()
+    executor = ThreadPoolExecutor(max_workers=len(jobs))
+
+    async def open_connection(circuit):
+        with metrics.timer("imdb_stage_seconds", stage="rate_limit_wait"):
+            await limiter.acquire(PREWARM_URL, circuit)
+        began = time.perf_counter()
+        response = await loop.run_in_executor(executor, client.warm_up, circuit)
+        if response is None:
+            limiter.feedback(PREWARM_URL, circuit, error=True)
+            return False
+        limiter.feedback(PREWARM_URL, circuit, response.status_code, time.perf_counter() - began,
+                         parse_retry_after(response.headers.get("Retry-After")))
+        return True
+
+    try:
+        with metrics.timer("imdb_stage_seconds", stage="prewarm"):
+            opened = sum(await asyncio.gather(*(open_connection(circuit) for circuit in jobs)))
+    finally:
+        # Cancelado (el chart falló): las conexiones en curso acaban solas, sin bloquear el bucle
+        executor.shutdown(wait=False)
+    circuits = len(client.proxy_pool.circuits) if client.proxy_pool is not None else 1
+    print(f"🔥 Conexiones precalentadas: {opened} en {circuits} circuito(s), {len(jobs) - opened} fallidas, "
+          f"{(time.perf_counter() - start) * 1000:.0f} ms")
+
+
+def report_client(client, limiter, stream=False):
+    """Resumen por consola (y métricas) de conexiones, caché, streaming, ritmo y circuitos"""
+    stats = client.pool_stats()
+    metrics.inc("imdb_connections_total", stats["hits"], kind="reused")
+    metrics.inc("imdb_connections_total", stats["misses"], kind="new")
+    print(f"🔌 Pool de conexiones: {stats['hits']} reutilizadas, {stats['misses']} nuevas ({stats['requests']} peticiones)")
+    if client.cache is not None:
+        cache_stats = client.cache_stats
+        print(f"🗄️ Caché: {cache_stats['fresh']} frescas, {cache_stats['revalidated']} revalidadas (304), {cache_stats['downloaded']} descargadas")
+    if stream and client.stream_stats["pages"]:
+        stream_stats = client.stream_stats
+        print(f"✂️ Streaming: {stream_stats['aborted']}/{stream_stats['pages']} páginas cortadas, "
+              f"{stream_stats['bytes_read'] / 1024:.0f} KB leídos, {stream_stats['bytes_saved'] / 1024:.0f} KB ahorrados, "
+              f"{stream_stats['seconds'] / stream_stats['pages'] * 1000:.0f} ms de lectura por página")
+    for key, (current_rate, cuts) in limiter.rates().items():
+        print(f"🚦 {key}: {current_rate} peticiones/s al final, {cuts} recortes")
+    if client.policy is not None:
+        report_policy(client.policy)
+    if client.proxy_pool is not None:
+        for circuit in client.proxy_pool.stats():
+            print(f"🧅 {circuit['proxy']}: {circuit['requests']} peticiones, {circuit['errors']} errores, "
+                  f"latencia {circuit['latency_ms']} ms, rotaciones {circuit['rotations']}")
+
+
+def report_policy(policy):
+    """Latencia por tipo de página (p50/p95/p99), copias lanzadas y descargas fuera de plazo"""
+    stats = policy.stats
+    for kind in sorted(policy.latencies):
+        p50, p95, p99 = policy.percentiles(kind)
+        print(f"📶 Descargas de '{kind}': {len(policy.latencies[kind])}, p50 {p50 * 1000:.0f} ms, "
+              f"p95 {p95 * 1000:.0f} ms, p99 {p99 * 1000:.0f} ms")
+    if stats["hedged"] or stats["capped"]:
+        print(f"🪃 Hedging: {stats['hedged']} copias ({stats['hedged'] / max(stats['requests'], 1):.0%} de las descargas), "
+              f"{stats['hedge_won']} ganaron a la original, {stats['capped']} descartadas por el tope")
+    if stats["deadline"] or stats["budget"] or stats["skipped"]:
+        print(f"⌛ Fuera de plazo: {stats['deadline']} descargas, {stats['budget']} sin pedir por presupuesto agotado, "
+              f"{stats['skipped']} títulos para la próxima ejecución")
+
+
+async def collect_movies(client, limiter, parse_pool=None, charts=None, limit=None, dumps_dir=None, dumps_all=False):
+    """Registros de los charts (deduplicados, en orden de ranking), completados con los dumps si hay"""
+    # Todos los charts alimentan una sola lista: cada título entra una vez, en orden de ranking
+    movies = []
+    chart_ids = set()
+    chart_urls = [] if dumps_dir and dumps_all else charts or IMDB_CHART_URLS
+    for chart_url in chart_urls:
+        for movie in await get_top_movies_async(client, limiter, chart_url, parse_pool):
+            if title_id(movie['url']) not in chart_ids:
+                chart_ids.add(title_id(movie['url']))
+                movies.append(movie)
+    if dumps_dir:
+        # Una lectura secuencial de los dumps en lugar de una página por Tor para cada campo que traen
+        movies = load_titles(dumps_dir, limit=limit) if dumps_all else enrich_from_dumps(movies, dumps_dir)
+    print(f"\n📦 Películas extraídas: {len(movies)}\n")
+    return movies
+
+
+async def run_crawl(limit=50, concurrency=MAX_CONCURRENCY, rate=RATE_LIMIT, burst=RATE_BURST, max_rate=RATE_MAX,
+                    use_cache=True, offline=False,
+                    journal=None, stream=False, fields=None, chart_only=False, client=None, sink=None,
+                    charts=None, follow_depth=FOLLOW_DEPTH, parse_workers=PARSE_WORKERS, dumps_dir=IMDB_DUMPS_DIR,
+                    dumps_all=False, cast=CAST_ENRICH, hedge=HEDGE_ENABLED, budget=RUN_BUDGET, posters=POSTERS_ENABLED,
+                    thumb_sizes=POSTER_THUMB_SIZES):
+    """Chart + detalles de forma concurrente. Devuelve (movies, enhanced_movies)
+
+    Con `offline=True` todo se sirve desde la caché en disco (sin red). Con `journal`
+    se reanuda un crawl interrumpido pidiendo solo las películas que faltan. Con `stream`
+    cada página de detalle deja de descargarse en cuanto ya tiene los datos necesarios.
+    `fields` limita los campos de salida que interesan: solo se piden las páginas de detalle
+    de las películas a las que el chart no les da esos campos (`chart_only` no pide ninguna).
+    Se puede pasar un `client` ya construido (p. ej. desde el benchmark); si no, se crea uno.
+    Con `sink` los registros se escriben a medida que terminan y el segundo valor devuelto
+    es el número de registros escritos en lugar de la lista.
+    `charts` (por defecto IMDB_CHART_URLS) son los charts que alimentan la frontera y
+    `follow_depth` cuántos saltos de enlaces entre títulos se siguen; `limit` acota el
+    total de títulos procesados. El parseo corre en `parse_workers` procesos (0 = en este).
+    Con `dumps_dir` (imdb_dumps) los títulos de los charts se completan con los dumps TSV
+    de IMDb y solo se piden las páginas de los campos que los dumps no traen (metascore);
+    con `dumps_all` la lista sale entera de los dumps, sin pedir ningún chart.
+    Con `cast` cada película trae su reparto completo y las fichas de persona (PersonCache).
+    `hedge` duplica por otro circuito las descargas más lentas de lo habitual y `budget`
+    (segundos, 0 = sin límite) acota la duración del crawl (FetchPolicy).
+    Con `posters` los pósters del chart se descargan a la vez que los detalles (posters.py),
+    con miniaturas de los lados de `thumb_sizes`.
+    """
+    loop = asyncio.get_running_loop()
+    # Las descargas de pósters ocupan sus propios hilos para no quitárselos a las páginas
+    threads = io_threads(concurrency, hedge) + (POSTER_CONCURRENCY if posters and not offline else 0)
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=threads))
+    # `rate` es el ritmo inicial; AIMD lo sube hasta `max_rate` mientras el servidor responda bien
+    limiter = AdaptiveRateLimiter(rate, burst, max_rate)
+    if client is None:
+        client = build_client(concurrency, use_cache, offline, hedge, budget)
+    parse_pool = ParsePool(client, parse_workers)
+    people = PersonCache() if cast else None
+    # Circuitos y conexiones se abren mientras se descarga el chart, no con la primera página de detalle
+    warm = asyncio.ensure_future(prewarm(client, limiter)) if not offline else None
+
+    try:
+        movies = await collect_movies(client, limiter, parse_pool, charts, limit, dumps_dir, dumps_all)
+        if warm is not None:
+            await warm
+
+        movies_to_process = movies[:limit]
+        plan = plan_fetches(movies_to_process, fields, chart_only)
+        frontier = CrawlFrontier()
+        for movie, missing in zip(movies_to_process, plan):
+            frontier.push(title_id(movie['url']), record=(movie, bool(missing)))
+        if journal is not None:
+            journal.load()
+            planned = [movie for movie, missing in zip(movies_to_process, plan) if missing]
+            pending = sum(1 for movie in planned if title_id(movie['url']) not in journal.done)
+            if pending < len(planned):
+                print(f"♻️ Reanudando: {len(planned) - pending} películas ya en el diario, faltan {pending}")
+
+        crawl = crawl_movies(client, frontier, limiter, concurrency, journal, stream, sink, limit,
+                             0 if chart_only else follow_depth, parse_pool, people=people)
+        if posters and not offline:
+            enhanced_movies, _ = await asyncio.gather(
+                crawl, download_posters(client, limiter, movies_to_process, thumb_sizes=thumb_sizes)
+            )
+        else:
+            enhanced_movies = await crawl
+        frontier_stats = frontier.stats()
+        print(f"🧭 Frontera: {frontier_stats['seen']} títulos vistos, {frontier_stats['duplicates']} duplicados descartados, "
+              f"{frontier_stats['queued']} pendientes")
+    finally:
+        if warm is not None and not warm.done():
+            # El chart falló antes de terminar el precalentado: no se deja la tarea suelta
+            warm.cancel()
+            await asyncio.gather(warm, return_exceptions=True)
+        parse_pool.close()
+        if journal is not None:
+            journal.close()
+        if people is not None:
+            report_people(people)
+            people.close()
+        report_client(client, limiter, stream)
+        client.close()
+    return movies, enhanced_movies
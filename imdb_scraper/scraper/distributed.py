@@ -0,0 +1,181 @@
+import asyncio
+import itertools
+import os
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from config import (MAX_CONCURRENCY, RATE_LIMIT, RATE_BURST, RATE_MAX, FOLLOW_DEPTH, PARSE_WORKERS, IMDB_DUMPS_DIR,
+                    LEASE_SECONDS, QUEUE_POLL_SECONDS, CAST_ENRICH, HEDGE_ENABLED, RUN_BUDGET)
+from crawler import (build_client, collect_movies, enrich_cast, get_movie_details_async, io_threads, prewarm,
+                     report_client, report_people, stub_movie)
+from extractors import build_enhanced_movie, title_id
+from frontier import tt_number, tt_string
+from metrics import metrics
+from parse_pool import ParsePool
+from person_cache import PersonCache
+from planner import plan_fetches
+from rate_limit import AdaptiveRateLimiter
+
+# Un coordinador llena la cola (work_queue.WorkQueue) y N workers, en este u otros
+# contenedores, la vacían. El estado vive en la cola: cualquiera de ellos puede morir y
+# volver a arrancar sin perder el trabajo hecho.
+
+# Tiempo que un worker sigue esperando con la cola terminada, por si el coordinador
+# está a punto de abrir un crawl nuevo
+IDLE_EXIT_SECONDS = 30
+# Registros que el coordinador lee de la cola de una vez al exportar
+RESULTS_BATCH = 500
+# Hilo propio para la cola: sus esperas por el lock de SQLite no compiten con las descargas
+# del executor por defecto, y las renovaciones no se quedan detrás de una página lenta.
+# Uno basta: WorkQueue serializa sus operaciones con un lock
+QUEUE_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="work-queue")
+
+
+def worker_id():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+async def run_queue(method, *args):
+    """Llama a un método de la WorkQueue en QUEUE_EXECUTOR: SQLite puede esperar su lock sin parar el bucle"""
+    return await asyncio.get_running_loop().run_in_executor(QUEUE_EXECUTOR, method, *args)
+
+
+async def run_coordinator(queue, sink, limit=50, rate=RATE_LIMIT, burst=RATE_BURST, max_rate=RATE_MAX, use_cache=True,
+                          fields=None, chart_only=False, charts=None, follow_depth=FOLLOW_DEPTH,
+                          dumps_dir=IMDB_DUMPS_DIR, dumps_all=False, fresh=False, poll_seconds=QUEUE_POLL_SECONDS):
+    """Encola los títulos de los charts, espera a que los workers terminen y exporta en orden.
+
+    Si la cola tiene trabajo a medias de una ejecución anterior se continúa con él
+    (`fresh=True` lo descarta). Devuelve el número de registros escritos en `sink`.
+    """
+    stats = await run_queue(queue.stats)
+    if not fresh and (stats["queued"] or stats["leased"]):
+        print(f"♻️ Reanudando la cola: {stats['done']} hechos, {stats['queued'] + stats['leased']} pendientes")
+    else:
+        # La cola se abre antes de pedir los charts: los workers que ya esperan no la dan por terminada
+        await run_queue(queue.reset, limit, 0 if chart_only else follow_depth)
+        client = build_client(1, use_cache)
+        limiter = AdaptiveRateLimiter(rate, burst, max_rate)
+        try:
+            movies = (await collect_movies(client, limiter, None, charts, limit, dumps_dir, dumps_all))[:limit]
+        finally:
+            client.close()
+        plan = plan_fetches(movies, fields, chart_only)
+        items = [(title_id(movie['url']), 0, movie, bool(missing)) for movie, missing in zip(movies, plan)]
+        added = await run_queue(queue.enqueue, items)
+        print(f"📥 {added} títulos encolados en '{queue.path}'")
+    await run_queue(queue.seal)
+
+    # El trabajo lo hacen los workers: aquí solo se sigue el progreso y se recuperan leases caducados
+    last = None
+    while not await run_queue(queue.finished):
+        await run_queue(queue.requeue_expired)
+        stats = await run_queue(queue.stats)
+        if stats != last:
+            print(f"⏳ Cola: {stats['done']} hechos, {stats['failed']} fallidos, {stats['leased']} en curso, {stats['queued']} pendientes")
+            last = stats
+        await asyncio.sleep(poll_seconds)
+
+    written = 0
+    results = queue.results()
+    # Por lotes: ni se carga la cola entera en memoria ni se lee SQLite desde el bucle
+    while True:
+        batch = await run_queue(list, itertools.islice(results, RESULTS_BATCH))
+        if not batch:
+            break
+        for record in batch:
+            with metrics.timer("imdb_stage_seconds", stage="write_sink"):
+                sink.write(record)
+        written += len(batch)
+    stats = await run_queue(queue.stats)
+    print(f"🏁 Cola terminada: {stats['done']} hechos, {stats['failed']} fallidos")
+    return written
+
+
+async def run_worker(queue, worker=None, concurrency=MAX_CONCURRENCY, rate=RATE_LIMIT, burst=RATE_BURST, max_rate=RATE_MAX,
+                     use_cache=True, stream=False, parse_workers=PARSE_WORKERS, lease_seconds=LEASE_SECONDS,
+                     poll_seconds=QUEUE_POLL_SECONDS, idle_exit=IDLE_EXIT_SECONDS, cast=CAST_ENRICH,
+                     hedge=HEDGE_ENABLED, budget=RUN_BUDGET):
+    """Toma títulos de la cola con lease, descarga y extrae sus detalles y deja el resultado.
+
+    `concurrency` carriles trabajan a la vez, cada uno con su propio lease. Los títulos
+    enlazados se encolan según la profundidad que fijó el coordinador. Un título sin
+    detalles se devuelve a la cola para reintentarlo (aquí o en otro worker). El worker
+    termina cuando la cola lleva `idle_exit` segundos sellada y vacía. Con `cast` cada
+    título trae su reparto completo; el memo de personas (PERSON_CACHE_PATH) se comparte
+    entre workers si está en el volumen común. Agotado el presupuesto (`budget`) el worker
+    deja de tomar títulos y los demás se quedan en la cola. Devuelve cuántos títulos completó.
+    """
+    worker = worker or worker_id()
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=io_threads(concurrency, hedge)))
+    limiter = AdaptiveRateLimiter(rate, burst, max_rate)
+    client = build_client(concurrency, use_cache, hedge=hedge, budget=budget)
+    parse_pool = ParsePool(client, parse_workers)
+    people = PersonCache() if cast else None
+    completed = 0
+    print(f"👷 Worker {worker} esperando trabajo en '{queue.path}'")
+
+    async def process(depth, movie, needs_detail):
+        if not needs_detail:
+            return build_enhanced_movie(movie, {})
+        details = await get_movie_details_async(client, movie['url'], limiter, stream, parse_pool)
+        if not details:
+            return None
+        if people is not None:
+            details['cast'] = await enrich_cast(client, movie['url'], limiter, people, parse_pool)
+        if depth < await run_queue(queue.get_meta, "follow_depth", 0):
+            related = [tt_string(tt_number(related_id)) for related_id in details.get('related_ids', [])]
+            await run_queue(queue.enqueue, [(related_id, depth + 1, stub_movie(related_id), True)
+                                            for related_id in related])
+        return build_enhanced_movie(movie, details)
+
+    async def lane():
+        nonlocal completed
+        idle_since = None
+        while True:
+            if client.policy.exhausted():
+                return
+            leased = await run_queue(queue.lease, worker, 1, lease_seconds)
+            if not leased:
+                if not await run_queue(queue.finished):
+                    idle_since = None
+                elif idle_since is None:
+                    idle_since = time.monotonic()
+                elif time.monotonic() - idle_since >= idle_exit:
+                    return
+                await asyncio.sleep(poll_seconds)
+                continue
+            idle_since = None
+
+            tt_id, depth, movie, needs_detail = leased[0]
+            error = "sin detalles"
+            try:
+                record = await process(depth, movie, needs_detail)
+            except Exception as e:
+                print(f"❌ Error procesando {tt_id}: {e}")
+                record, error = None, str(e)
+            if record is None and client.policy.exhausted():
+                # Se quedó sin presupuesto, no falló: vuelve a la cola para otro worker o la próxima ejecución
+                await run_queue(queue.release, tt_id, worker)
+            elif record is None:
+                await run_queue(queue.fail, tt_id, worker, error, build_enhanced_movie(movie, {}))
+            elif await run_queue(queue.complete, tt_id, worker, record):
+                completed += 1
+                print(f"✅ [{worker}] {record['Título']} - Año: {record['Año']} - Rating: {record['Calificación']} - Metascore: {record['Metascore']}")
+            else:
+                print(f"⚠️ Lease de {tt_id} perdido (caducó y lo tomó otro worker): resultado descartado")
+
+    try:
+        # El pool se precalienta mientras los carriles esperan su primer título
+        await asyncio.gather(prewarm(client, limiter), *(lane() for _ in range(concurrency)))
+    finally:
+        parse_pool.close()
+        if people is not None:
+            report_people(people)
+            people.close()
+        report_client(client, limiter, stream)
+        client.close()
+    print(f"👷 Worker {worker}: {completed} títulos completados")
+    return completed
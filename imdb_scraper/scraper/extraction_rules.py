@@ -0,0 +1,189 @@
+from html_backends import compile_css, get_backend
+from metrics import metrics
+
+# Elementos sin etiqueta de cierre: no se apilan
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "param", "source", "track", "wbr"}
+# Su contenido no es texto visible (BeautifulSoup tampoco lo devuelve en `.text`)
+RAW_TEXT_TAGS = {"script", "style"}
+
+
+def compound_matches(compound, tag, attrs):
+    wanted_tag, classes, conditions = compound
+    if wanted_tag is not None and wanted_tag != tag:
+        return False
+    if classes:
+        present = (attrs.get("class") or "").split()
+        if any(class_name not in present for class_name in classes):
+            return False
+    for attr, operator, value in conditions:
+        if attr not in attrs:
+            return False
+        if operator == "=" and (attrs[attr] or "") != value:
+            return False
+        if operator == "*=" and value not in (attrs[attr] or ""):
+            return False
+    return True
+
+
+class FieldRules:
+    """Registro declarativo campo -> cadena de selectores, evaluado en una sola pasada.
+
+    Cada campo lista sus selectores por prioridad (el primero que encuentra algo gana,
+    como los `select_one` encadenados de antes) y cuántos elementos quiere. Los
+    selectores se compilan una vez al crear el registro; `extract` recorre el HTML con
+    el tokenizador del backend (html_backends) sin construir el árbol y anota para todos
+    los selectores a la vez sus primeras coincidencias (texto y atributos). Con los
+    backends en C (lxml, selectolax) cada selector se busca sobre su árbol, que es más rápido.
+
+    Cada página suma en `imdb_selector_total` si cada selector dio el valor (`hit`),
+    coincidió pero ganó uno anterior (`shadowed`) o no encontró nada (`miss`): un
+    fallback que nunca coincide se puede quitar.
+    """
+
+    def __init__(self, fields, page="title"):
+        self.page = page
+        self.fields = {}
+        self.selectors = []
+        # Etiqueta -> [(id de selector, paso)] a comprobar al abrir un elemento (None: cualquier etiqueta)
+        self.by_tag = {}
+        for field, (chain, limit) in fields.items():
+            ids = []
+            for text in chain:
+                steps = compile_css(text)
+                self.selectors.append((field, text, steps, limit))
+                ids.append(len(self.selectors) - 1)
+                for step, compound in enumerate(steps):
+                    self.by_tag.setdefault(compound[0], []).append((ids[-1], step))
+            self.fields[field] = ids
+
+    def extract(self, html, backend=None):
+        """Campo -> [(texto, atributos)] del primer selector de su cadena que coincidió"""
+        backend = backend or get_backend()
+        if backend.scan is not None:
+            scanner = _RuleScanner(self)
+            backend.scan(html, scanner)
+            matches = scanner.matches
+        else:
+            document = backend.parse(html)
+            matches = [[([backend.text(node)], backend.attrs(node)) for node in backend.select(document, text)[:limit]]
+                       for _, text, _, limit in self.selectors]
+
+        values = {}
+        for field, ids in self.fields.items():
+            winner = None
+            for selector_id in ids:
+                found = bool(matches[selector_id])
+                if found and winner is None:
+                    winner = selector_id
+                    result = "hit"
+                else:
+                    result = "shadowed" if found else "miss"
+                metrics.inc("imdb_selector_total", page=self.page, field=field,
+                            selector=self.selectors[selector_id][1], result=result)
+            values[field] = ([("".join(text).strip(), attrs) for text, attrs in matches[winner]]
+                             if winner is not None else [])
+        return values
+
+
+class _RuleScanner:
+    """Handler de una pasada sobre el HTML: pila de elementos abiertos con los pasos de selector ya cumplidos"""
+
+    def __init__(self, rules):
+        self.rules = rules
+        self.matches = [[] for _ in rules.selectors]
+        # (etiqueta, pasos cumplidos por el elemento o sus ancestros, capturas abiertas en él)
+        self.stack = []
+        self.capturing = []
+        self.raw_text = 0
+
+    def start(self, tag, attrs):
+        parent = self.stack[-1][1] if self.stack else frozenset()
+        reached = None
+        captures = []
+        candidates = self.rules.by_tag.get(tag, []) + self.rules.by_tag.get(None, [])
+        if candidates:
+            for selector_id, step in candidates:
+                _, _, steps, limit = self.rules.selectors[selector_id]
+                if step and (selector_id, step - 1) not in parent:
+                    continue
+                if not compound_matches(steps[step], tag, attrs):
+                    continue
+                if step < len(steps) - 1:
+                    reached = set(parent) if reached is None else reached
+                    reached.add((selector_id, step))
+                elif len(self.matches[selector_id]) < limit:
+                    capture = ([], attrs)
+                    self.matches[selector_id].append(capture)
+                    captures.append(capture[0])
+        if tag in VOID_TAGS:
+            return
+        self.capturing.extend(captures)
+        self.stack.append((tag, parent if reached is None else frozenset(reached), captures))
+        if tag in RAW_TEXT_TAGS:
+            self.raw_text += 1
+
+    def end(self, tag):
+        # Un cierre sin apertura se ignora; uno que salta elementos sin cerrar los cierra todos
+        if not any(entry[0] == tag for entry in self.stack):
+            return
+        while True:
+            closed, _, captures = self.stack.pop()
+            if captures:
+                self.capturing = [text for text in self.capturing if not any(text is capture for capture in captures)]
+            if closed in RAW_TEXT_TAGS:
+                self.raw_text -= 1
+            if closed == tag:
+                return
+
+    def data(self, data):
+        if self.capturing and not self.raw_text:
+            for text in self.capturing:
+                text.append(data)
+
+
+############################## Reglas de la pagina de titulo #########################################################
+# Por prioridad: el primero de cada cadena que coincide da el valor (los demás son fallbacks)
+TITLE_RULES = FieldRules({
+    "title": (["h1[data-testid='hero-title-block__title']", "h1.sc-afe43def-0"], 1),
+    "precise_year": (["span[data-testid='hero-title-block__metadata'] li", "ul.ipc-inline-list li"], 1),
+    "rating": (["span[data-testid='hero-rating-bar__aggregate-rating__score'] span", "span.sc-7ab21ed2-1"], 1),
+    "duration": (["li[data-testid='title-techspec-runtime']", "time"], 1),
+    "actors": (["a[data-testid='title-cast-item__actor']", "div[data-testid='title-cast'] a[href*='/name/']"], 3),
+    "metascore": (["span.metacritic-score-box", "div[data-testid='metacritic-score-box']", "span.score-meta"], 1),
+}, page="title")
+############################## Reglas de la pagina de titulo #########################################################
+
+############################## Reglas de reparto y personas #########################################################
+# /title/tt.../fullcredits: diseño actual y la tabla `cast_list` antigua (su enlace de foto no tiene texto)
+CREDITS_RULES = FieldRules({
+    "cast": (["div[data-testid='sub-section-cast'] a.name-credits--title-text",
+              "table.cast_list a[href*='/name/']"], 1000),
+}, page="credits")
+
+# /name/nm...: el JSON-LD trae nombre y nacimiento; "Conocido por" solo está en el HTML
+PERSON_RULES = FieldRules({
+    "name": (["h1[data-testid='hero__pageTitle'] span", "h1 span.itemprop"], 1),
+    "birth_date": (["div[data-testid='birth-and-death-birthdate'] span", "time[datetime]"], 2),
+    "known_for": (["div[data-testid='nm_flmg_kwn_for'] a.ipc-primary-image-list-card__title",
+                   "div[id='knownfor'] a[href*='/title/']"], 12),
+}, page="name")
+############################## Reglas de reparto y personas #########################################################
+
+
+def first_text(values, field):
+    """Texto del primer elemento de `field` ("" si ningún selector coincidió)"""
+    return values[field][0][0] if values.get(field) else ""
+
+
+def selector_hit_rates(page=None):
+    """(página, campo, selector) -> (aciertos, coincidencias, páginas) acumulados en las métricas"""
+    rates = {}
+    for labels, value in metrics.counts("imdb_selector_total"):
+        if page is not None and labels["page"] != page:
+            continue
+        key = (labels["page"], labels["field"], labels["selector"])
+        hits, matched, pages = rates.get(key, (0, 0, 0))
+        rates[key] = (hits + (value if labels["result"] == "hit" else 0),
+                      matched + (value if labels["result"] != "miss" else 0),
+                      pages + value)
+    return rates
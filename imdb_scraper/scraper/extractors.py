@@ -0,0 +1,406 @@
+import json
+import re
+
+from extraction_rules import CREDITS_RULES, PERSON_RULES, TITLE_RULES, first_text
+from frontier import canonical_title_url
+from html_backends import get_backend
+from metrics import metrics
+
+# Subir cuando cambie la lógica de extracción: invalida los resultados parseados en caché
+EXTRACTOR_VERSION = 5
+
+TITLE_ID_RE = re.compile(r"/title/(tt\d+)")
+NAME_ID_RE = re.compile(r"/name/(nm\d+)")
+TITLE_LINK_RE = re.compile(rb"/title/(tt\d+)")
+
+
+def title_id(url):
+    """Devuelve el id `tt` de una URL de título (o None)"""
+    match = TITLE_ID_RE.search(url or "")
+    return match.group(1) if match else None
+
+
+def name_id(url):
+    """Devuelve el id `nm` de una URL de persona (o None)"""
+    match = NAME_ID_RE.search(url or "")
+    return match.group(1) if match else None
+
+
+LD_JSON_RE = re.compile(rb'<script[^>]*type=["\']?application/ld\+json["\']?[^>]*>(.*?)</script>', re.S | re.I)
+# Mismos elementos que la regla `metascore` de TITLE_RULES
+METASCORE_RE = re.compile(
+    rb'<(?:span|div)\b[^>]*(?:class="[^"]*\b(?:metacritic-score-box|score-meta)\b[^"]*"|data-testid="metacritic-score-box")[^>]*>(.*?)</(?:span|div)>',
+    re.S | re.I,
+)
+TAG_RE = re.compile(rb'<[^>]+>')
+
+
+def _as_bytes(html):
+    return html.encode('utf-8') if isinstance(html, str) else html
+
+
+def extract_json_ld(html):
+    """Busca el primer bloque ld+json en el HTML crudo y decodifica solo ese bloque"""
+    match = LD_JSON_RE.search(_as_bytes(html))
+    if not match:
+        return None
+    return json.loads(match.group(1).decode('utf-8'))
+
+
+def extract_title_links(html):
+    """Ids `tt` enlazados desde una página (recomendaciones, etc.), sin repetir y en orden"""
+    return list(dict.fromkeys(match.decode() for match in TITLE_LINK_RE.findall(_as_bytes(html))))
+
+
+def extract_metascore(html):
+    """Metascore sin construir el DOM (mismas clases que busca el fallback HTML)"""
+    match = METASCORE_RE.search(_as_bytes(html))
+    if not match:
+        return ""
+    return TAG_RE.sub(b'', match.group(1)).decode('utf-8', errors='replace').strip()
+
+
+def parse_duration(iso_duration):
+    """Convierte duración ISO 8601 (PT#H#M) a minutos"""
+    match = re.match(r"PT(?:(\d+)H)?(?:(\d+)M)?", iso_duration)
+    if not match:
+        return ""
+    hours = int(match.group(1)) if match.group(1) else 0
+    minutes = int(match.group(2)) if match.group(2) else 0
+    return hours * 60 + minutes
+
+############################## Extraer lista de peliculas #########################################################
+def parse_top_movies(html, fast=True):
+    """Extrae la lista de películas desde el HTML (str o bytes) de un chart (Top 250 u otro)
+
+    Todas las URLs se normalizan a /title/ttXXXXXXX/ y cada título aparece una sola vez.
+    Con `fast=False` se salta el JSON-LD y se usa directamente el HTML (para medirlo).
+    """
+    movies = []
+    seen = set()
+
+    # Método 1: Intentar extraer desde JSON-LD (sin construir el DOM)
+    try:
+        data = extract_json_ld(html) if fast else None
+        if data:
+            if "itemListElement" in data:
+                items = data.get("itemListElement", [])
+                for entry in items:
+                    item = entry.get("item", {})
+                    url = canonical_title_url(item.get("url")) if item else None
+                    if url and url not in seen:
+                        seen.add(url)
+                        movie = {
+                            "title": item.get("name"),
+                            "year": item.get("datePublished", ""),
+                            "duration": parse_duration(item.get("duration", "")),
+                            "rating": item.get("aggregateRating", {}).get("ratingValue", ""),
+                            "ratingCount": item.get("aggregateRating", {}).get("ratingCount", ""),
+                            "url": url,
+                            "genre": item.get("genre"),
+                            "description": item.get("description"),
+                            "image": item.get("image"),
+                        }
+                        movies.append(movie)
+                print(f"✅ Encontradas {len(movies)} películas via JSON-LD")
+                if movies:
+                    metrics.inc("imdb_extract_total", page="chart", source="json_ld")
+                    return movies
+    except Exception as e:
+        print(f"⚠️ Error con JSON-LD: {e}")
+
+    backend = get_backend()
+    try:
+        with metrics.timer("imdb_stage_seconds", stage="build_dom"):
+            document = backend.parse(html)
+    except Exception as e:
+        print(f"❌ No se pudo parsear el HTML ({backend.name}): {e}")
+        return movies
+
+    # Método 2: Extraer desde la tabla HTML
+    try:
+        movie_links = backend.select(document, "h3.ipc-title__text a[href*='/title/']")
+        if movie_links:
+            for link in movie_links:
+                href = canonical_title_url(backend.attr(link, 'href'))
+                if href and href not in seen:
+                    seen.add(href)
+
+                    # Extraer título del texto del enlace
+                    title_text = backend.text(link, strip=True)
+                    # Remover numeración si existe (ej: "1. The Shawshank Redemption")
+                    title = re.sub(r'^\d+\.\s*', '', title_text)
+
+                    movie = {
+                        "title": title,
+                        "year": "",
+                        "duration": "",
+                        "rating": "",
+                        "ratingCount": "",
+                        "url": href,
+                        "genre": "",
+                        "description": "",
+                        "image": "",
+                    }
+                    movies.append(movie)
+            print(f"✅ Encontradas {len(movies)} películas via HTML")
+            if movies:
+                metrics.inc("imdb_extract_total", page="chart", source="html_fallback")
+                return movies
+    except Exception as e:
+        print(f"⚠️ Error con HTML parsing: {e}")
+
+    # Método 3: Buscar enlaces en cualquier parte de la página
+    try:
+        all_links = backend.select(document, "a[href]")
+        for link in all_links:
+            href = backend.attr(link, 'href')
+            if href and '/title/tt' in href and '/chart/top' not in href:
+                href = canonical_title_url(href)
+
+                # Evitar duplicados (por id `tt`, sin recorrer la lista)
+                if href and href not in seen:
+                    seen.add(href)
+                    title_text = backend.text(link, strip=True)
+                    title = re.sub(r'^\d+\.\s*', '', title_text) if title_text else "Unknown"
+
+                    movie = {
+                        "title": title,
+                        "year": "",
+                        "duration": "",
+                        "rating": "",
+                        "ratingCount": "",
+                        "url": href,
+                        "genre": "",
+                        "description": "",
+                        "image": "",
+                    }
+                    movies.append(movie)
+        print(f"✅ Encontradas {len(movies)} películas via búsqueda general")
+        if movies:
+            metrics.inc("imdb_extract_total", page="chart", source="links")
+            return movies
+    except Exception as e:
+        print(f"⚠️ Error con búsqueda general: {e}")
+
+    print("❌ No se pudieron extraer links de películas")
+    return movies
+############################## Extraer lista de peliculas #########################################################
+
+############################## Extraer detalles de pelicula #########################################################
+def details_from_json_ld(data):
+    """Campos de detalle a partir del objeto JSON-LD de la página de una película"""
+    details = {}
+
+    # Título
+    details['title'] = data.get("name", "")
+
+    # Año
+    details['precise_year'] = data.get("datePublished", "")
+
+    # Rating
+    details['rating'] = data.get("aggregateRating", {}).get("ratingValue", "")
+
+    # Duración
+    duration_iso = data.get("duration", "")
+    if duration_iso:
+        match = re.match(r'PT(?:(\d+)H)?(?:(\d+)M)?', duration_iso)
+        if match:
+            horas = int(match.group(1)) if match.group(1) else 0
+            minutos = int(match.group(2)) if match.group(2) else 0
+            details['detailed_duration'] = horas * 60 + minutos
+
+    # Actores (con su id `nm` para poder normalizarlos en la base de datos)
+    actors = []
+    actor_ids = []
+    actor_data = data.get("actor", [])
+    if isinstance(actor_data, list):
+        for actor in actor_data[:3]:
+            if isinstance(actor, dict) and 'name' in actor:
+                actors.append(actor['name'])
+                actor_ids.append(name_id(actor.get('url')))
+    details['actors'] = actors
+    details['actor_ids'] = actor_ids
+    return details
+
+
+def fill_details_from_html(html, details):
+    """Completa desde el HTML los campos que el JSON-LD no trajo. Devuelve True si aportó algo
+
+    Todos los selectores (TITLE_RULES) se evalúan en una sola pasada sobre el HTML.
+    """
+    values = TITLE_RULES.extract(html)
+    filled = False
+
+    # Título, año y rating
+    for field in ('title', 'precise_year', 'rating'):
+        if not details.get(field):
+            details[field] = first_text(values, field)
+            filled = filled or bool(details[field])
+
+    # Duración
+    if not details.get('detailed_duration'):
+        duration_text = first_text(values, 'duration')
+        match = re.search(r'(\d+)h\s*(\d+)m', duration_text)
+        if match:
+            horas = int(match.group(1))
+            minutos = int(match.group(2))
+            details['detailed_duration'] = horas * 60 + minutos
+            filled = True
+        else:
+            match = re.search(r'(\d+)\s*min', duration_text)
+            if match:
+                details['detailed_duration'] = int(match.group(1))
+                filled = True
+
+    # Actores (primeros 3)
+    if not details.get('actors'):
+        actors = []
+        actor_ids = []
+        for actor_name, attrs in values['actors']:
+            if actor_name:
+                actors.append(actor_name)
+                actor_ids.append(name_id(attrs.get('href')))
+        details['actors'] = actors
+        details['actor_ids'] = actor_ids
+        filled = filled or bool(actors)
+
+    # Metascore (sale de la misma pasada)
+    if not details.get('metascore'):
+        details['metascore'] = first_text(values, 'metascore')
+
+    return filled
+
+
+def details_complete(html):
+    """True si el prefijo `html` ya trae todo lo que usa el camino rápido (JSON-LD + metascore)"""
+    raw = _as_bytes(html)
+    if not METASCORE_RE.search(raw):
+        return False
+    try:
+        data = extract_json_ld(raw)
+    except ValueError:
+        return False
+    if not data:
+        return False
+    details = details_from_json_ld(data)
+    return bool(details.get('title') and details.get('detailed_duration') and details.get('actors'))
+
+
+def parse_movie_details(html, fast=True):
+    """Extrae los detalles de una película desde el HTML (str o bytes) de su página.
+
+    Camino rápido: el bloque JSON-LD se localiza en el texto crudo y el metascore con una
+    expresión regular, sin construir el DOM. Si falta el JSON-LD o le faltan campos
+    necesarios (título, duración, actores), o si `fast=False`, el fallback evalúa los
+    selectores de TITLE_RULES en una sola pasada sobre el HTML (tampoco construye el DOM).
+    """
+    details = {}
+
+    # Intentar extraer datos desde JSON-LD primero
+    try:
+        with metrics.timer("imdb_stage_seconds", stage="extract_json_ld"):
+            data = extract_json_ld(html)
+            if data:
+                details = details_from_json_ld(data)
+        if data:
+            print(f"✅ Datos extraídos via JSON-LD: {details['title']}")
+    except Exception as e:
+        print(f"⚠️ Error extrayendo JSON-LD: {e}")
+
+    if fast and details.get('title') and details.get('detailed_duration') and details.get('actors'):
+        details['metascore'] = extract_metascore(html)
+        metrics.inc("imdb_extract_total", page="title", source="json_ld")
+    else:
+        metrics.inc("imdb_extract_total", page="title", source="html_fallback")
+
+        # Fallback: extraer desde HTML los campos que JSON-LD no aportó (y el metascore)
+        try:
+            with metrics.timer("imdb_stage_seconds", stage="extract_html"):
+                filled = fill_details_from_html(html, details)
+            if filled:
+                print(f"✅ Datos extraídos via HTML fallback: {details.get('title', 'Unknown')}")
+        except Exception as e:
+            print(f"⚠️ Error extrayendo HTML: {e}")
+
+    # Asegurar valores por defecto
+    details.setdefault('title', '')
+    details.setdefault('precise_year', '')
+    details.setdefault('rating', '')
+    details.setdefault('detailed_duration', '')
+    details.setdefault('actors', [])
+    details.setdefault('actor_ids', [None] * len(details['actors']))
+    # Títulos enlazados: la frontera de crawl los puede seguir (FOLLOW_DEPTH)
+    details['related_ids'] = extract_title_links(html)
+    details.setdefault('metascore', '')
+
+    actors_count = len(details['actors'])
+    print(f"✅ Detalles finales: título={bool(details['title'])}, año={bool(details['precise_year'])}, rating={bool(details['rating'])}, duración={bool(details['detailed_duration'])}, actores={actors_count}, metascore={bool(details['metascore'])}")
+    return details
+############################## Extraer detalles de pelicula #########################################################
+
+############################## Extraer reparto y personas #########################################################
+YEAR_RE = re.compile(r"\b(1[89]\d\d|20\d\d)\b")
+KNOWN_FOR_SIZE = 4  # los mismos que muestra IMDb en "Conocido por"
+
+
+def parse_full_credits(html):
+    """Reparto completo de /title/tt.../fullcredits en orden: [{'nm_id', 'name'}] sin repetir"""
+    cast = []
+    seen = set()
+    for name, attrs in CREDITS_RULES.extract(html)['cast']:
+        nm_id = name_id(attrs.get('href'))
+        if name and nm_id and nm_id not in seen:
+            seen.add(nm_id)
+            cast.append({'nm_id': nm_id, 'name': name})
+    metrics.inc("imdb_extract_total", page="credits", source="html" if cast else "empty")
+    return cast
+
+
+def parse_person(html):
+    """Ficha de /name/nm...: nombre, año de nacimiento y títulos por los que se la conoce"""
+    data = {}
+    try:
+        data = extract_json_ld(html) or {}
+    except ValueError:
+        pass
+    values = PERSON_RULES.extract(html)
+
+    birth_year = None
+    for text in [data.get('birthDate') or ''] + [text for text, _ in values['birth_date']]:
+        match = YEAR_RE.search(text)
+        if match:
+            birth_year = int(match.group(1))
+            break
+
+    known_for = []
+    for title, attrs in values['known_for']:
+        tt_id = title_id(attrs.get('href'))
+        if tt_id and title and all(item['tt_id'] != tt_id for item in known_for):
+            known_for.append({'tt_id': tt_id, 'title': title})
+
+    return {
+        'name': data.get('name') or first_text(values, 'name'),
+        'birth_year': birth_year,
+        'known_for': known_for[:KNOWN_FOR_SIZE],
+    }
+############################## Extraer reparto y personas #########################################################
+
+def build_enhanced_movie(movie, details):
+    """Combina los datos básicos del chart con los detalles de la página de la película"""
+    record = {
+        'Título': details.get('title') or movie['title'],
+        'Año': details.get('precise_year') or movie['year'],
+        'Calificación': details.get('rating') or movie['rating'],
+        'Duración (min)': details.get('detailed_duration') or movie['duration'],
+        'Metascore': details.get('metascore', 'N/A'),
+        'Actores': details.get('actors') or movie.get('actors', []),
+        'actor_ids': details.get('actor_ids') or movie.get('actor_ids', []),
+        'url': movie['url'],
+        'genre': movie['genre'],
+        'description': movie['description']
+    }
+    # Reparto completo con las fichas de persona (solo si se pidió: CAST_ENRICH / --cast)
+    if details.get('cast'):
+        record['cast'] = details['cast']
+    return record
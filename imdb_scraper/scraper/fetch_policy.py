@@ -0,0 +1,128 @@
+import time
+from array import array
+
+from config import (FETCH_DEADLINE, RUN_BUDGET, HEDGE_ENABLED, HEDGE_QUANTILE, HEDGE_WINDOW, HEDGE_MIN_SAMPLES,
+                    HEDGE_MAX_RATIO, HEDGE_MIN_DELAY)
+from metrics import metrics
+
+
+# Hasta tener HEDGE_MIN_SAMPLES descargas de un tipo, la copia sale a tantas veces su mediana
+COLD_START_FACTOR = 3
+# Sin ninguna descarga de ese tipo completada aún, cada cuánto se vuelve a mirar si ya hay umbral
+RECHECK_SECONDS = 0.5
+# Copias permitidas por encima de HEDGE_MAX_RATIO (al principio del crawl la proporción aún no deja ninguna)
+HEDGE_BURST = 3
+
+
+class DeadlineExceeded(TimeoutError):
+    """Una descarga (o el crawl entero) se quedó sin tiempo"""
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+class FetchPolicy:
+    """Plazos y peticiones duplicadas (hedging) para recortar la cola de latencias por Tor.
+
+    Cada descarga dura como mucho `deadline` segundos, copias incluidas, y todas juntas
+    `budget` segundos desde que se creó la política (0 = sin límite): agotado el
+    presupuesto las descargas siguientes fallan sin tocar la red y el crawl acaba con lo
+    que tenga (el diario permite completarlo después).
+
+    Si una descarga tarda más que el percentil `quantile` de las últimas `window` de su
+    tipo de página (chart, título, reparto, persona), sale una copia por otro circuito (u
+    otra conexión del pool sin Tor): gana la primera respuesta y la otra se cancela. Las
+    copias se limitan a `max_ratio` de las descargas para no duplicar la carga sobre IMDb.
+    Solo la usa el bucle asíncrono (crawler.fetch), así que no necesita locks.
+    """
+
+    def __init__(self, hedging=HEDGE_ENABLED, deadline=FETCH_DEADLINE, budget=RUN_BUDGET, quantile=HEDGE_QUANTILE,
+                 window=HEDGE_WINDOW, min_samples=HEDGE_MIN_SAMPLES, max_ratio=HEDGE_MAX_RATIO,
+                 min_delay=HEDGE_MIN_DELAY):
+        self.hedging = hedging
+        self.deadline = deadline
+        self.budget = budget
+        self.quantile = quantile
+        self.window = window
+        self.min_samples = min_samples
+        self.max_ratio = max_ratio
+        self.min_delay = min_delay
+        self.started = time.monotonic()
+        # Tipo de página -> latencia de cada descarga completada (array de doubles: 8 bytes por descarga)
+        self.latencies = {}
+        self.thresholds = {}
+        self.stats = {"requests": 0, "hedged": 0, "hedge_won": 0, "capped": 0, "deadline": 0, "budget": 0, "skipped": 0}
+
+    def remaining(self):
+        """Segundos que quedan del presupuesto del crawl (None = sin límite)"""
+        return self.budget - (time.monotonic() - self.started) if self.budget else None
+
+    def exhausted(self):
+        return bool(self.budget) and self.remaining() <= 0
+
+    def skip(self, count=1):
+        """Anota títulos que el crawl deja sin pedir porque se acabó el presupuesto"""
+        self.stats["skipped"] += count
+
+    def cut_short(self):
+        """True si el presupuesto dejó algo sin pedir (el diario se conserva para continuar)"""
+        return bool(self.stats["budget"] or self.stats["skipped"])
+
+    def begin(self):
+        """Plazo en segundos de la siguiente descarga (None = sin plazo). DeadlineExceeded si no queda presupuesto"""
+        limit = self.deadline or None
+        if self.budget:
+            remaining = self.remaining()
+            if remaining <= 0:
+                self.stats["budget"] += 1
+                metrics.inc("imdb_deadline_total", scope="run")
+                if self.stats["budget"] == 1:
+                    print(f"⌛ Presupuesto de {self.budget:.0f} s agotado: no se piden más páginas")
+                raise DeadlineExceeded(f"presupuesto de {self.budget:.0f} s agotado")
+            limit = remaining if limit is None else min(limit, remaining)
+        self.stats["requests"] += 1
+        return limit
+
+    def hedge_delay(self, kind):
+        """Segundos tras los que conviene lanzar una copia de una descarga de `kind` (None = aún no hay datos)"""
+        if kind in self.thresholds:
+            return self.thresholds[kind]
+        latencies = self.latencies.get(kind)
+        if latencies:
+            # Arranque: pocas muestras para un percentil, pero los primeros rezagados también cuentan
+            return max(COLD_START_FACTOR * percentile(latencies, 0.5), self.min_delay)
+        return None
+
+    def may_hedge(self):
+        """True si lanzar otra copia no pasa de `max_ratio` copias por descarga (más HEDGE_BURST)"""
+        if self.stats["hedged"] >= self.max_ratio * self.stats["requests"] + HEDGE_BURST:
+            self.stats["capped"] += 1
+            metrics.inc("imdb_hedge_total", result="capped")
+            return False
+        self.stats["hedged"] += 1
+        metrics.inc("imdb_hedge_total", result="launched")
+        return True
+
+    def observe(self, kind, seconds, hedged=False, hedge_won=False):
+        """Anota la latencia de una descarga completada y recalcula el umbral de su tipo"""
+        latencies = self.latencies.setdefault(kind, array("d"))
+        latencies.append(seconds)
+        if hedged:
+            self.stats["hedge_won"] += int(hedge_won)
+            metrics.inc("imdb_hedge_total", result="won" if hedge_won else "lost")
+        if len(latencies) >= self.min_samples:
+            recent = latencies[-self.window:]
+            self.thresholds[kind] = max(percentile(recent, self.quantile), self.min_delay)
+
+    def expired(self):
+        self.stats["deadline"] += 1
+        metrics.inc("imdb_deadline_total", scope="request")
+
+    def percentiles(self, kind, fractions=(0.5, 0.95, 0.99)):
+        """Percentiles (s) de todas las descargas completadas de `kind`"""
+        latencies = self.latencies.get(kind) or []
+        return [percentile(latencies, fraction) for fraction in fractions]
@@ -0,0 +1,112 @@
+import heapq
+import math
+import re
+
+from config import IMDB_BASE_URL, FRONTIER_DEDUPE, FRONTIER_BLOOM_CAPACITY, FRONTIER_BLOOM_ERROR
+
+TT_RE = re.compile(r"tt(\d+)")
+# Orden de llegada dentro de un mismo nivel (24 bits) e id numérico (32 bits) dentro de la clave
+ORDER_BITS = 24
+ID_BITS = 32
+MAX_ORDER = (1 << ORDER_BITS) - 1
+
+
+def tt_number(value):
+    """'tt0111161', '/title/tt0111161/?ref_=chttp' o una URL completa -> 111161 (None si no hay id)"""
+    match = TT_RE.search(value or "")
+    return int(match.group(1)) if match else None
+
+
+def tt_string(number):
+    """111161 -> 'tt0111161' (IMDb rellena los ids a 7 cifras como mínimo)"""
+    return f"tt{number:07d}"
+
+
+def canonical_title_url(href):
+    """Un id `tt` o cualquier variante de enlace a un título -> https://www.imdb.com/title/ttXXXXXXX/ (o None)"""
+    number = tt_number(href) if href and ("/title/" in href or TT_RE.fullmatch(href)) else None
+    return f"{IMDB_BASE_URL}/title/{tt_string(number)}/" if number is not None else None
+
+
+class BloomFilter:
+    """Conjunto aproximado de enteros en un bytearray: ~1,8 bytes por id con un 0,1% de falsos positivos.
+
+    Un falso positivo hace que un título nuevo se dé por visto y no se encole; nunca al revés.
+    """
+
+    def __init__(self, capacity, error_rate):
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, value):
+        # Doble hashing con dos multiplicadores de 64 bits: barato y suficiente para ids enteros
+        h1 = (value * 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF
+        h2 = ((value * 0xC2B2AE3D27D4EB4F) & 0xFFFFFFFFFFFFFFFF) | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def __contains__(self, value):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(value))
+
+    def add(self, value):
+        for pos in self._positions(value):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __len__(self):
+        return self.count
+
+    def nbytes(self):
+        return len(self.bits)
+
+
+class CrawlFrontier:
+    """Cola de prioridad de títulos por crawlear, deduplicada por id `tt`.
+
+    Cada id encolado es un único entero en un heap: (nivel, orden de llegada, id numérico)
+    empaquetados en una sola clave, unos 45 bytes por id. Los vistos se guardan como enteros
+    en un set (exacto, ~65 bytes más por id) o en un filtro de Bloom (`dedupe="bloom"`, ~2
+    bytes por id de capacidad reservada de antemano). Solo las películas de los charts
+    llevan su registro asociado; los títulos descubiertos por enlaces se encolan con el id
+    y nada más.
+    """
+
+    def __init__(self, dedupe=FRONTIER_DEDUPE, capacity=FRONTIER_BLOOM_CAPACITY, error_rate=FRONTIER_BLOOM_ERROR):
+        self.heap = []
+        self.seen = BloomFilter(capacity, error_rate) if dedupe == "bloom" else set()
+        self.records = {}
+        self.orders = {}
+        self.duplicates = 0
+
+    def push(self, tt_id, depth=0, record=None):
+        """Encola un título si no se había visto. Devuelve True si es nuevo"""
+        number = tt_number(tt_id)
+        if number is None:
+            return False
+        if number in self.seen:
+            self.duplicates += 1
+            return False
+        self.seen.add(number)
+        order = self.orders.get(depth, 0)
+        self.orders[depth] = order + 1
+        key = (depth << (ORDER_BITS + ID_BITS)) | (min(order, MAX_ORDER) << ID_BITS) | number
+        heapq.heappush(self.heap, key)
+        if record is not None:
+            self.records[number] = record
+        return True
+
+    def pop(self):
+        """Siguiente título por prioridad: (id `tt`, profundidad, registro del chart o None)"""
+        if not self.heap:
+            return None
+        key = heapq.heappop(self.heap)
+        number = key & ((1 << ID_BITS) - 1)
+        depth = key >> (ORDER_BITS + ID_BITS)
+        return tt_string(number), depth, self.records.pop(number, None)
+
+    def __len__(self):
+        return len(self.heap)
+
+    def stats(self):
+        return {"queued": len(self.heap), "seen": len(self.seen), "duplicates": self.duplicates}
@@ -0,0 +1,217 @@
+import re
+from functools import lru_cache
+from html.parser import HTMLParser
+
+from config import HTML_BACKEND
+
+# Subconjunto de CSS que usa el scraper: etiqueta, .clase, [attr], [attr='v'], [attr*='v'] y descendiente.
+# Es lo que entienden las reglas de extraction_rules.py y lo que se traduce a XPath para lxml
+COMPOUND_RE = re.compile(r"^([a-zA-Z][a-zA-Z0-9-]*|\*)?((?:\.[\w-]+|\[[\w-]+(?:\*?=['\"][^'\"]*['\"])?\])*)$")
+PART_RE = re.compile(r"\.([\w-]+)|\[([\w-]+)(?:(\*?=)['\"]([^'\"]*)['\"])?\]")
+
+# Orden de preferencia en modo `auto`, de más a menos rápido según benchmark/backend_benchmark.py
+BACKEND_ORDER = ("selectolax", "lxml", "html.parser")
+
+
+def compile_compound(text):
+    """`h1.clase[data-testid='x']` -> (etiqueta o None, clases, [(atributo, operador, valor)])"""
+    match = COMPOUND_RE.match(text)
+    if not match or not text:
+        raise ValueError(f"Selector no soportado: {text!r}")
+    tag = match.group(1) if match.group(1) not in (None, "*") else None
+    classes = []
+    conditions = []
+    for class_name, attr, operator, value in PART_RE.findall(match.group(2)):
+        if class_name:
+            classes.append(class_name)
+        else:
+            conditions.append((attr.lower(), operator or None, value))
+    return tag and tag.lower(), tuple(classes), tuple(conditions)
+
+
+def compile_css(css):
+    """Selector con descendientes -> tupla de pasos compilados"""
+    return tuple(compile_compound(part) for part in css.split())
+
+
+@lru_cache(maxsize=None)
+def css_to_xpath(css):
+    """Traduce el subconjunto de CSS a una expresión XPath compilada (para lxml)"""
+    from lxml import etree
+
+    path = ""
+    for tag, classes, conditions in compile_css(css):
+        predicates = [f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')" for name in classes]
+        for attr, operator, value in conditions:
+            if operator is None:
+                predicates.append(f"@{attr}")
+            elif operator == "=":
+                predicates.append(f"@{attr}='{value}'")
+            else:
+                predicates.append(f"contains(@{attr}, '{value}')")
+        path += "//" + (tag or "*") + "".join(f"[{predicate}]" for predicate in predicates)
+    return etree.XPath(path)
+
+
+def _as_text(html):
+    return html.decode("utf-8", errors="replace") if isinstance(html, bytes) else html
+
+
+############################## Backends de parseo #########################################################
+# Todos exponen lo mismo: parse(html) -> documento, select(documento, css) -> elementos en
+# orden del documento, text(elemento, strip), attr(elemento, nombre) y attrs(elemento).
+# `scan` (solo en el backend puro Python, donde construir el árbol es lo caro) recorre el
+# HTML sin construirlo, emitiendo start(etiqueta, atributos) / end(etiqueta) / data(texto).
+
+class HtmlParserBackend:
+    """BeautifulSoup sobre `html.parser`: puro Python, siempre disponible"""
+
+    name = "html.parser"
+
+    @staticmethod
+    def available():
+        return True
+
+    def parse(self, html):
+        from bs4 import BeautifulSoup
+
+        return BeautifulSoup(html, "html.parser")
+
+    def select(self, document, css):
+        return document.select(css)
+
+    def text(self, node, strip=False):
+        return node.get_text(strip=True) if strip else node.get_text()
+
+    def attr(self, node, name):
+        return node.get(name)
+
+    def attrs(self, node):
+        # BeautifulSoup devuelve `class` como lista
+        return {key: " ".join(value) if isinstance(value, list) else value for key, value in node.attrs.items()}
+
+    def scan(self, html, handler):
+        parser = _ForwardingParser(handler)
+        parser.feed(_as_text(html))
+        parser.close()
+
+
+class _ForwardingParser(HTMLParser):
+    """Tokenizador de `html.parser` que pasa los eventos al handler"""
+
+    def __init__(self, handler):
+        super().__init__(convert_charrefs=True)
+        self.handler = handler
+
+    def handle_starttag(self, tag, attrs):
+        self.handler.start(tag, dict(attrs))
+
+    def handle_startendtag(self, tag, attrs):
+        # Como BeautifulSoup: `<x/>` abre y cierra
+        self.handler.start(tag, dict(attrs))
+        self.handler.end(tag)
+
+    def handle_endtag(self, tag):
+        self.handler.end(tag)
+
+    def handle_data(self, data):
+        self.handler.data(data)
+
+
+class LxmlBackend:
+    """libxml2 (lxml): árbol en C y selectores traducidos a XPath"""
+
+    name = "lxml"
+
+    @staticmethod
+    def available():
+        try:
+            import lxml.html  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    def parse(self, html):
+        import lxml.html
+
+        if isinstance(html, str):
+            return lxml.html.document_fromstring(html)
+        return lxml.html.document_fromstring(html, parser=lxml.html.HTMLParser(encoding="utf-8"))
+
+    def select(self, document, css):
+        return css_to_xpath(css)(document)
+
+    def text(self, node, strip=False):
+        if strip:
+            return "".join(part.strip() for part in node.itertext())
+        return node.text_content()
+
+    def attr(self, node, name):
+        return node.get(name)
+
+    def attrs(self, node):
+        return dict(node.attrib)
+
+    # Medido: XPath sobre el árbol en C es más rápido que recibir cada evento en Python
+    scan = None
+
+
+class SelectolaxBackend:
+    """Lexbor (selectolax): parser y selectores CSS en C, el más rápido"""
+
+    name = "selectolax"
+
+    @staticmethod
+    def available():
+        try:
+            from selectolax.lexbor import LexborHTMLParser  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    def parse(self, html):
+        from selectolax.lexbor import LexborHTMLParser
+
+        return LexborHTMLParser(_as_text(html))
+
+    def select(self, document, css):
+        return document.css(css)
+
+    def text(self, node, strip=False):
+        return node.text(deep=True, strip=strip)
+
+    def attr(self, node, name):
+        return node.attributes.get(name)
+
+    def attrs(self, node):
+        return dict(node.attributes)
+
+    # Sin API de eventos: las reglas se evalúan con `select` sobre el árbol
+    scan = None
+
+
+BACKENDS = {backend.name: backend for backend in (HtmlParserBackend, LxmlBackend, SelectolaxBackend)}
+############################## Backends de parseo #########################################################
+
+
+def available_backends():
+    """Nombres de los backends instalados, en orden de preferencia"""
+    return [name for name in BACKEND_ORDER if BACKENDS[name].available()]
+
+
+_backend = None
+
+
+def get_backend(name=None):
+    """Backend de parseo del proceso: `name`, HTML_BACKEND o, en modo `auto`, el más rápido instalado"""
+    global _backend
+    if name is None and _backend is not None:
+        return _backend
+    wanted = name or HTML_BACKEND
+    if wanted != "auto" and (wanted not in BACKENDS or not BACKENDS[wanted].available()):
+        print(f"⚠️ Parser HTML '{wanted}' no disponible: se elige automáticamente")
+        wanted = "auto"
+    backend = BACKENDS[available_backends()[0] if wanted == "auto" else wanted]()
+    if name is None:
+        _backend = backend
+    return backend
@@ -0,0 +1,328 @@
+import hashlib
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from cache import CacheMiss, CachedResponse, ResponseCache
+from config import PROXIES, HEADERS, MAX_CONCURRENCY, STREAM_CHUNK_SIZE, PREWARM_CONNECTIONS, PREWARM_URL
+from extractors import EXTRACTOR_VERSION
+from metrics import metrics
+
+
+class RequestCancelled(Exception):
+    """La petición se abandonó a mitad (p. ej. una copia que llegó tarde)"""
+
+
+class ImdbClient:
+    """Cliente HTTP compartido por el chart y los detalles.
+
+    Una sola `requests.Session` con un pool de conexiones dimensionado: las conexiones
+    a www.imdb.com (a través de `socks5h://tor:9050` si hay proxy) se mantienen vivas y
+    se reutilizan, así cada página paga un viaje por Tor y no un handshake SOCKS+TCP+TLS.
+
+    Con `cache` (un ResponseCache) las respuestas frescas se sirven desde disco y las
+    caducadas se revalidan con GET condicional; con `offline=True` nunca se toca la red.
+    Con `proxy_pool` (un ProxyPool) cada petición sale por el circuito Tor mejor puntuado
+    en lugar de por `proxies`; cada circuito mantiene su propio pool de conexiones.
+    Con `archive` (un PageArchive) cada página descargada con 200 se guarda además en el
+    archivo WARC, para poder re-extraerla más adelante sin red.
+    Con `policy` (un fetch_policy.FetchPolicy) el motor asíncrono aplica plazos y copias
+    de las peticiones lentas; el cliente solo las deja cancelar con `cancel`.
+    """
+
+    def __init__(self, proxies=PROXIES, headers=HEADERS, pool_size=MAX_CONCURRENCY, cache=None, offline=False,
+                 proxy_pool=None, archive=None, policy=None):
+        self.proxies = proxies
+        self.proxy_pool = proxy_pool
+        self.pool_size = pool_size
+        self.cache = cache
+        self.archive = archive
+        self.policy = policy
+        self.offline = offline
+        self.cache_stats = {"fresh": 0, "revalidated": 0, "downloaded": 0}
+        self.stream_stats = {"pages": 0, "aborted": 0, "bytes_read": 0, "bytes_saved": 0, "seconds": 0.0}
+        self._stats_lock = threading.Lock()
+        self.session = requests.Session()
+        self.session.headers.update(headers)
+        self.session.headers["Connection"] = "keep-alive"
+        # pool_maxsize = conexiones vivas por host; pool_block evita abrir conexiones de más
+        self.adapter = HTTPAdapter(pool_connections=10, pool_maxsize=pool_size, pool_block=True)
+        self.session.mount("http://", self.adapter)
+        self.session.mount("https://", self.adapter)
+
+    def needs_network(self, url):
+        """False si la petición se resolverá desde la caché sin salir a la red"""
+        if self.offline:
+            return False
+        if self.cache is None:
+            return True
+        entry = self.cache.peek(url)
+        return entry is None or not self.cache.is_fresh(entry)
+
+    def _request(self, url, timeout, circuit=None, **kwargs):
+        if self.proxy_pool is not None:
+            # El motor asíncrono elige el circuito antes (para limitar su ritmo); si no, se elige aquí
+            circuit = circuit or self.proxy_pool.acquire()
+        proxies = circuit.proxies if circuit is not None else self.proxies
+        start = time.perf_counter()
+        try:
+            response = self.session.get(url, proxies=proxies, timeout=timeout, **kwargs)
+        except Exception:
+            metrics.inc("imdb_http_errors_total")
+            if circuit is not None:
+                self.proxy_pool.release(circuit, error=True)
+            raise
+        elapsed = time.perf_counter() - start
+        if circuit is not None:
+            self.proxy_pool.release(circuit, elapsed, response.status_code)
+        self._record(response, elapsed, kwargs.get("stream", False))
+        return response
+
+    def _record(self, response, elapsed, stream):
+        """Métricas de una respuesta: TTFB (incluye conectar por el proxy si la conexión es nueva),
+        descarga del cuerpo, código de estado y bytes"""
+        # `elapsed` de requests va del envío a tener las cabeceras
+        ttfb = response.elapsed.total_seconds()
+        metrics.observe("imdb_stage_seconds", ttfb, stage="ttfb")
+        metrics.inc("imdb_http_responses_total", status=str(response.status_code))
+        if response.status_code in (429, 503) or "Retry-After" in response.headers:
+            metrics.inc("imdb_throttled_total")
+        if not stream:
+            metrics.observe("imdb_stage_seconds", max(elapsed - ttfb, 0.0), stage="download")
+            metrics.inc("imdb_bytes_total", len(response.content), source="network")
+
+    def _send(self, url, timeout, until=None, circuit=None, cancel=None, **kwargs):
+        if until is None and cancel is None:
+            response = self._request(url, timeout, circuit, **kwargs)
+        else:
+            # Cancelable: el cuerpo se lee por trozos para poder abandonarlo a mitad
+            response = self._request(url, timeout, circuit, stream=True, **kwargs)
+            if response.status_code != 200:
+                response.content  # cuerpo completo (corto) para que la conexión vuelva al pool
+                return response
+            response = self._read_until(response, until, cancel=cancel)
+        if cancel is not None and cancel.is_set():
+            # Ganó la otra copia: esta respuesta no se archiva ni se guarda en la caché
+            raise RequestCancelled(url)
+        if self.archive is not None and response.status_code == 200:
+            with metrics.timer("imdb_stage_seconds", stage="write_archive"):
+                self.archive.append_response(url, response)
+        return response
+
+    def _read_until(self, response, until, chunk_size=STREAM_CHUNK_SIZE, cancel=None):
+        """Lee el cuerpo por trozos y corta en cuanto `until(bytes_leídos)` es True.
+
+        Cortar a mitad obliga a cerrar la conexión (HTTP/1.1 no permite abandonar un
+        cuerpo y reutilizarla), así que se cambia un handshake por los KB no descargados.
+        Sin `until` se lee entero; si `cancel` (threading.Event) se activa, se abandona.
+        """
+        start = time.perf_counter()
+        buffer = bytearray()
+        truncated = False
+        for chunk in response.iter_content(chunk_size):
+            if cancel is not None and cancel.is_set():
+                response.close()
+                raise RequestCancelled(response.url)
+            buffer += chunk
+            if until is not None and until(bytes(buffer)):
+                truncated = True
+                break
+
+        # Bytes en el cable (comprimidos si hay gzip) frente a Content-Length
+        wire_read = response.raw.tell()
+        total = response.headers.get("Content-Length")
+        if truncated and total and total.isdigit():
+            # Si el predicado se cumplió justo con el último trozo no se cortó nada
+            truncated = wire_read < int(total)
+        saved = int(total) - wire_read if truncated and total and total.isdigit() else 0
+        if truncated:
+            response.close()
+        else:
+            response.raw.release_conn()  # cuerpo leído entero: la conexión vuelve al pool
+
+        response._content = bytes(buffer)
+        response._content_consumed = True
+        response.truncated = truncated
+        response.bytes_read = wire_read
+        response.bytes_saved = saved
+
+        seconds = time.perf_counter() - start
+        metrics.observe("imdb_stage_seconds", seconds, stage="download")
+        metrics.inc("imdb_bytes_total", wire_read, source="network")
+        if until is None:
+            return response
+        with self._stats_lock:
+            self.stream_stats["pages"] += 1
+            self.stream_stats["aborted"] += int(truncated)
+            self.stream_stats["bytes_read"] += wire_read
+            self.stream_stats["bytes_saved"] += saved
+            self.stream_stats["seconds"] += seconds
+        return response
+
+    def download(self, url, file, timeout=30, circuit=None, max_bytes=None, chunk_size=STREAM_CHUNK_SIZE):
+        """Descarga un binario (p. ej. un póster) a `file` por trozos calculando su SHA-256.
+
+        El cuerpo nunca está entero en memoria y no pasa por la caché ni por el archivo de
+        páginas. Devuelve (respuesta, hash hex, bytes); el hash es None si no hubo 200.
+        """
+        if self.offline:
+            raise CacheMiss(url)
+        response = self._request(url, timeout, circuit, stream=True)
+        if response.status_code != 200:
+            response.content  # cuerpo completo (corto) para que la conexión vuelva al pool
+            return response, None, 0
+        start = time.perf_counter()
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            for chunk in response.iter_content(chunk_size):
+                size += len(chunk)
+                if max_bytes and size > max_bytes:
+                    raise ValueError(f"{url} pasa de {max_bytes} bytes")
+                digest.update(chunk)
+                file.write(chunk)
+        except Exception:
+            response.close()
+            raise
+        finally:
+            metrics.observe("imdb_stage_seconds", time.perf_counter() - start, stage="download")
+            metrics.inc("imdb_bytes_total", size, source="network")
+        response.raw.release_conn()  # cuerpo leído entero: la conexión vuelve al pool
+        return response, digest.hexdigest(), size
+
+    def get(self, url, timeout=15, until=None, circuit=None, cancel=None, **kwargs):
+        """GET compartido. Con `until` el cuerpo se lee en streaming y se corta en cuanto
+        el predicado confirma que ya están todos los datos necesarios. `circuit` (del
+        ProxyPool) fija el circuito; si la respuesta sale de la caché se devuelve sin usarlo.
+        Si `cancel` (threading.Event) se activa durante la descarga, lanza RequestCancelled.
+        """
+        if self.cache is None:
+            if self.offline:
+                raise CacheMiss(url)
+            return self._send(url, timeout, until, circuit, cancel, **kwargs)
+
+        entry = self.cache.get(url)
+        if entry is not None and entry.get("partial"):
+            # Cuerpo cortado guardado por una versión anterior: ni se sirve ni se revalida
+            entry = None
+        if self.offline or (entry is not None and self.cache.is_fresh(entry)):
+            if circuit is not None:
+                self.proxy_pool.cancel(circuit)
+            if entry is None:
+                metrics.inc("imdb_cache_total", result="miss")
+                raise CacheMiss(url)
+            if not self.offline:
+                self.cache_stats["fresh"] += 1
+            metrics.inc("imdb_cache_total", result="fresh")
+            metrics.inc("imdb_bytes_total", entry.get("size", 0), source="cache")
+            return CachedResponse(url, entry)
+
+        headers = dict(kwargs.pop("headers", None) or {})
+        if entry is not None:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        response = self._send(url, timeout, until, circuit, cancel, headers=headers, **kwargs)
+        if response.status_code == 304 and entry is not None:
+            self.cache.revalidated(url, entry)
+            self.cache_stats["revalidated"] += 1
+            metrics.inc("imdb_cache_total", result="revalidated")
+            return CachedResponse(url, entry, not_modified=True)
+        # Una página cortada por `until` no está completa: servirla después como tal perdería datos
+        if response.status_code == 200 and not getattr(response, "truncated", False):
+            self.cache.put(url, response)
+            self.cache_stats["downloaded"] += 1
+            metrics.inc("imdb_cache_total", result="downloaded")
+        return response
+
+    def reused_parse(self, url, response, parser):
+        """Resultado de `parser` guardado en la caché para esta misma página, o None.
+
+        En modo offline siempre se vuelve a parsear: es justo lo que se quiere al
+        re-ejecutar la extracción sobre páginas ya descargadas.
+        """
+        if not getattr(response, "from_cache", False) or self.offline:
+            return None
+        parsed = response.entry.get("parsed", {}).get(f"{parser.__name__}:v{EXTRACTOR_VERSION}")
+        if parsed is not None:
+            metrics.inc("imdb_cache_total", result="parse_reused")
+        return parsed
+
+    def store_parsed(self, url, response, parser, parsed):
+        if (self.cache is not None and not self.offline and response.status_code == 200
+                and not getattr(response, "truncated", False)):
+            self.cache.store_parsed(url, f"{parser.__name__}:v{EXTRACTOR_VERSION}", parsed)
+
+    def parse(self, url, response, parser):
+        """Aplica `parser` al HTML, reutilizando el resultado guardado si la página no cambió"""
+        parsed = self.reused_parse(url, response, parser)
+        if parsed is not None:
+            return parsed
+
+        with metrics.timer("imdb_stage_seconds", stage=parser.__name__):
+            parsed = parser(response.content)
+        self.store_parsed(url, response, parser, parsed)
+        return parsed
+
+    def warm_up_circuits(self, connections=PREWARM_CONNECTIONS):
+        """Un circuito (None sin Tor) por cada conexión a precalentar: `connections` por circuito"""
+        if self.offline:
+            return []
+        circuits = self.proxy_pool.circuits if self.proxy_pool is not None else [None]
+        return [circuit for circuit in circuits for _ in range(min(connections, self.pool_size))]
+
+    def warm_up(self, circuit=None, url=PREWARM_URL, timeout=30):
+        """Abre una conexión keep-alive con el host de `url` por `circuit`. Devuelve la respuesta o None si falló.
+
+        Cada conexión nueva por Tor cuesta construir el circuito, el handshake SOCKS y el
+        TLS; hacerlo mientras se pide el chart deja el pool listo para los detalles y da a
+        cada circuito su primera latencia. El cuerpo (p. ej. robots.txt) se descarta. El
+        ritmo lo pone quien llama (crawler.prewarm pasa antes por el limiter).
+        """
+        if circuit is not None:
+            self.proxy_pool.reserve(circuit)
+        try:
+            return self._request(url, timeout, circuit)
+        except Exception:
+            return None
+
+    def _pools(self):
+        managers = [self.adapter.poolmanager] + list(self.adapter.proxy_manager.values())
+        for manager in managers:
+            for key in list(manager.pools.keys()):
+                pool = manager.pools.get(key)
+                if pool is not None:
+                    yield pool
+
+    def pool_stats(self):
+        """Peticiones servidas con una conexión reutilizada (hits) o nueva (misses)"""
+        requests_count = 0
+        connections = 0
+        for pool in self._pools():
+            requests_count += pool.num_requests
+            connections += pool.num_connections
+        return {
+            "requests": requests_count,
+            "hits": max(requests_count - connections, 0),
+            "misses": connections,
+        }
+
+    def close(self):
+        self.session.close()
+        if self.archive is not None:
+            self.archive.close()
+
+
+_client = None
+
+
+def get_client():
+    """Devuelve el cliente compartido del proceso (se crea la primera vez)"""
+    global _client
+    if _client is None:
+        _client = ImdbClient(cache=ResponseCache())
+    return _client
@@ -0,0 +1,155 @@
+import gzip
+import os
+import time
+
+from config import IMDB_BASE_URL, DUMP_TITLE_TYPES
+from extractors import title_id
+from frontier import tt_number, tt_string
+from metrics import metrics
+
+# Ficheros de https://datasets.imdbws.com/ que se usan (el resto de columnas se ignora)
+DUMP_FILES = {
+    "basics": "title.basics.tsv.gz",
+    "ratings": "title.ratings.tsv.gz",
+    "principals": "title.principals.tsv.gz",
+    "names": "name.basics.tsv.gz",
+}
+NULL = b"\\N"
+CAST_CATEGORIES = (b"actor", b"actress")
+CAST_SIZE = 3  # los mismos 3 actores que se sacan del JSON-LD
+
+
+def _value(field):
+    return "" if field == NULL else field.decode("utf-8")
+
+
+def iter_rows(path, keys=None):
+    """Recorre un .tsv.gz fila a fila sin descomprimirlo entero.
+
+    Devuelve (columnas, filas) con las filas como listas de bytes. Con `keys` (un set de
+    bytes) solo se parten las líneas cuya primera columna está en el set; el resto se
+    descarta mirando únicamente el prefijo de la línea.
+    """
+    f = gzip.open(path, "rb")
+    columns = {name: index for index, name in enumerate(f.readline().rstrip(b"\n").decode("utf-8").split("\t"))}
+
+    def rows():
+        with f:
+            for line in f:
+                if keys is not None and line[:line.find(b"\t")] not in keys:
+                    continue
+                yield line.rstrip(b"\n").split(b"\t")
+
+    return columns, rows()
+
+
+def _dump_path(dumps_dir, name):
+    path = os.path.join(dumps_dir, DUMP_FILES[name])
+    if not os.path.exists(path):
+        print(f"⚠️ Falta {DUMP_FILES[name]} en {dumps_dir}: esos campos se pedirán a las páginas de detalle")
+        return None
+    return path
+
+
+def load_titles(dumps_dir, ids=None, title_types=DUMP_TITLE_TYPES, limit=None):
+    """Registros con la forma de los del chart a partir de los dumps TSV de IMDb.
+
+    Con `ids` (ids `tt`) solo se cargan esos títulos y se devuelven en ese orden; sin
+    `ids` se recorren todos los de `title_types` hasta `limit`. Cada fichero se lee una
+    sola vez, en streaming, y solo se guardan en memoria las filas de los títulos
+    elegidos (y de sus actores), así que la memoria depende de la selección y no del
+    tamaño del dump. Los registros traen además `actors` y `actor_ids` desde
+    title.principals + name.basics; el metascore y la descripción no están en los dumps.
+    """
+    start = time.perf_counter()
+    keys = {tt_string(tt_number(tt)).encode() for tt in ids if tt_number(tt) is not None} if ids is not None else None
+    types = {kind.encode() for kind in title_types}
+
+    titles = {}
+    path = _dump_path(dumps_dir, "basics")
+    if path is None:
+        return []
+    with metrics.timer("imdb_stage_seconds", stage="read_basics"):
+        columns, rows = iter_rows(path, keys)
+        for row in rows:
+            if keys is None and row[columns["titleType"]] not in types:
+                continue
+            genres = _value(row[columns["genres"]])
+            runtime = _value(row[columns["runtimeMinutes"]])
+            titles[row[0]] = {
+                "title": _value(row[columns["primaryTitle"]]),
+                "year": _value(row[columns["startYear"]]),
+                "duration": int(runtime) if runtime.isdigit() else "",
+                "rating": "",
+                "ratingCount": "",
+                "url": f"{IMDB_BASE_URL}/title/{row[0].decode()}/",
+                "genre": ", ".join(genres.split(",")) if genres else "",
+                "description": "",
+                "image": "",
+            }
+            if keys is None and limit and len(titles) >= limit:
+                rows.close()
+                break
+
+    # Ratings y nombres tienen una fila por id: en cuanto aparecen todos se deja de leer
+    path = _dump_path(dumps_dir, "ratings")
+    if path and titles:
+        with metrics.timer("imdb_stage_seconds", stage="read_ratings"):
+            columns, rows = iter_rows(path, titles.keys())
+            found = 0
+            for row in rows:
+                titles[row[0]]["rating"] = float(row[columns["averageRating"]])
+                titles[row[0]]["ratingCount"] = int(row[columns["numVotes"]])
+                found += 1
+                if found == len(titles):
+                    rows.close()
+                    break
+
+    cast = {}
+    path = _dump_path(dumps_dir, "principals")
+    if path and titles:
+        with metrics.timer("imdb_stage_seconds", stage="read_principals"):
+            columns, rows = iter_rows(path, titles.keys())
+            for row in rows:
+                if row[columns["category"]] not in CAST_CATEGORIES:
+                    continue
+                people = cast.setdefault(row[0], [])
+                if len(people) < CAST_SIZE:
+                    people.append((int(row[columns["ordering"]]), row[columns["nconst"]]))
+
+    names = {}
+    needed = {nm_id for people in cast.values() for _, nm_id in people}
+    path = _dump_path(dumps_dir, "names")
+    if path and needed:
+        with metrics.timer("imdb_stage_seconds", stage="read_names"):
+            columns, rows = iter_rows(path, needed)
+            for row in rows:
+                names[row[0]] = _value(row[columns["primaryName"]])
+                if len(names) == len(needed):
+                    rows.close()
+                    break
+
+    for tt_key, people in cast.items():
+        people.sort()
+        movie = titles[tt_key]
+        movie["actors"] = [names.get(nm_id, "") for _, nm_id in people if names.get(nm_id)]
+        movie["actor_ids"] = [nm_id.decode() for _, nm_id in people if names.get(nm_id)]
+
+    order = [tt_string(tt_number(tt)).encode() for tt in ids if tt_number(tt) is not None] if ids is not None else titles
+    movies = [titles[tt_key] for tt_key in order if tt_key in titles]
+    print(f"📚 Dumps: {len(movies)} títulos, {sum(1 for movie in movies if movie['rating'] != '')} con rating, "
+          f"{sum(1 for movie in movies if movie.get('actors'))} con reparto ({time.perf_counter() - start:.1f} s)")
+    return movies
+
+
+def enrich_from_dumps(movies, dumps_dir):
+    """Completa los registros del chart con lo que traen los dumps (solo los campos vacíos)"""
+    dumped = {title_id(movie["url"]): movie for movie in load_titles(dumps_dir, [title_id(movie["url"]) for movie in movies])}
+    for movie in movies:
+        extra = dumped.get(title_id(movie["url"]))
+        if extra is None:
+            continue
+        for key, value in extra.items():
+            if movie.get(key) in (None, ""):
+                movie[key] = value
+    return movies
@@ -0,0 +1,65 @@
+import json
+import os
+
+from config import JOURNAL_PATH, JOURNAL_FSYNC_EVERY
+
+
+class CrawlJournal:
+    """Diario append-only de películas ya procesadas (una línea NDJSON por id `tt`).
+
+    Cada registro se escribe en cuanto termina su película y se hace fsync cada
+    `fsync_every` registros, así una caída del contenedor cuesta como mucho ese lote.
+    Al reiniciar, `load()` devuelve lo ya hecho y el crawl solo pide lo que falta.
+    """
+
+    def __init__(self, path=JOURNAL_PATH, fsync_every=JOURNAL_FSYNC_EVERY):
+        self.path = path
+        self.fsync_every = fsync_every
+        self.done = {}
+        self._pending = 0
+        self._file = None
+
+    def load(self):
+        """Lee el diario existente; una última línea truncada por la caída se ignora"""
+        self.done = {}
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    self.done[entry["id"]] = entry["record"]
+        except FileNotFoundError:
+            pass
+        return self.done
+
+    def append(self, tt_id, record):
+        if self._file is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._file = open(self.path, "a", encoding="utf-8")
+        self._file.write(json.dumps({"id": tt_id, "record": record}, ensure_ascii=False) + "\n")
+        self._file.flush()
+        self._pending += 1
+        if self._pending >= self.fsync_every:
+            self.sync()
+
+    def sync(self):
+        if self._file is not None and self._pending:
+            os.fsync(self._file.fileno())
+            self._pending = 0
+
+    def close(self):
+        if self._file is not None:
+            self.sync()
+            self._file.close()
+            self._file = None
+
+    def clear(self):
+        """Borra el diario cuando la ejecución terminó y los resultados ya están exportados"""
+        self.close()
+        self.done = {}
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,176 @@
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from config import METRICS_BUCKETS
+
+# Descripción (# HELP) y tipo de cada métrica que publica el scraper
+METRICS_HELP = {
+    "imdb_stage_seconds": ("histogram", "Duración de cada etapa del scraper (espera de ritmo, TTFB, descarga, parseo, extracción, escritura)"),
+    "imdb_http_responses_total": ("counter", "Respuestas HTTP recibidas por código de estado"),
+    "imdb_http_errors_total": ("counter", "Peticiones que fallaron sin respuesta (timeout, conexión, proxy)"),
+    "imdb_throttled_total": ("counter", "Respuestas que piden bajar el ritmo (429/503 o Retry-After)"),
+    "imdb_bytes_total": ("counter", "Bytes de cuerpo recibidos, de la red o de la caché"),
+    "imdb_cache_total": ("counter", "Resultado de cada consulta a la caché de respuestas"),
+    "imdb_extract_total": ("counter", "Método con el que se extrajeron los datos de cada página"),
+    "imdb_movies_total": ("counter", "Películas procesadas según de dónde salieron sus detalles"),
+    "imdb_connections_total": ("counter", "Peticiones servidas con una conexión reutilizada del pool o nueva"),
+    "imdb_queue_total": ("counter", "Eventos de la cola compartida (encolado, lease, completado, fallido, caducado, perdido)"),
+    "imdb_person_cache_total": ("counter", "Consultas al memo de personas (memoria, disco, esperando a otra descarga, descargadas, caducadas, fallidas)"),
+    "imdb_hedge_total": ("counter", "Copias de peticiones lentas (lanzadas, ganadoras, perdedoras, descartadas por el tope)"),
+    "imdb_deadline_total": ("counter", "Descargas abandonadas por agotar su plazo (request) o el presupuesto del crawl (run)"),
+    "imdb_poster_total": ("counter", "Pósters por resultado (descargado, repetido por contenido, ya en disco, fallido)"),
+    "imdb_selector_total": ("counter", "Resultado de cada selector del fallback HTML por página (dio el valor, tapado por otro anterior, sin coincidencia)"),
+}
+
+
+def _labels(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in pairs) + "}"
+
+
+class MetricsRegistry:
+    """Contadores e histogramas en memoria con salida en formato texto de Prometheus.
+
+    Cada observación es un `bisect` sobre buckets fijos y unas sumas bajo un lock, así
+    que se puede dejar activo siempre. Se publica por HTTP (`serve`) o en un fichero
+    para el textfile collector de node_exporter (`write_textfile`).
+    """
+
+    def __init__(self, buckets=METRICS_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counters = {}
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name, value=1, **labels):
+        key = (name, _labels(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = (name, _labels(labels))
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                # [cuenta por bucket..., +Inf], suma, total
+                histogram = self.histograms[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            histogram[0][index] += 1
+            histogram[1] += value
+            histogram[2] += 1
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Mide el bloque `with` y lo anota en el histograma `name`"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def reset(self):
+        with self._lock:
+            self.counters = {}
+            self.histograms = {}
+
+    def drain(self):
+        """Devuelve lo acumulado y vacía el registro (para enviarlo desde un proceso hijo)"""
+        with self._lock:
+            snapshot = (self.counters, self.histograms)
+            self.counters = {}
+            self.histograms = {}
+        return snapshot
+
+    def merge(self, snapshot):
+        """Suma lo que devolvió `drain()` en otro proceso"""
+        counters, histograms = snapshot
+        with self._lock:
+            for key, value in counters.items():
+                self.counters[key] = self.counters.get(key, 0) + value
+            for key, (counts, total, count) in histograms.items():
+                histogram = self.histograms.get(key)
+                if histogram is None:
+                    histogram = self.histograms[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+                histogram[0] = [a + b for a, b in zip(histogram[0], counts)]
+                histogram[1] += total
+                histogram[2] += count
+
+    def render(self):
+        """Todas las métricas en el formato de exposición de texto de Prometheus"""
+        with self._lock:
+            counters = dict(self.counters)
+            histograms = {key: (list(counts), total, count) for key, (counts, total, count) in self.histograms.items()}
+
+        lines = []
+        names = sorted({name for name, _ in counters} | {name for name, _ in histograms})
+        for name in names:
+            kind, description = METRICS_HELP.get(name, ("untyped", name))
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} {kind}")
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f"{name}{_format_labels(labels)} {value}")
+            for (metric, labels), (counts, total, count) in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + ("+Inf",), counts):
+                    cumulative += bucket_count
+                    lines.append(f"{name}_bucket{_format_labels(labels, [('le', bound)])} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {total:.6f}")
+                lines.append(f"{name}_count{_format_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self):
+        """Etapa -> (veces, segundos totales) para el resumen por consola"""
+        with self._lock:
+            return {dict(labels).get("stage", ""): (count, total)
+                    for (name, labels), (_, total, count) in self.histograms.items() if name == "imdb_stage_seconds"}
+
+    def counts(self, name):
+        """[(etiquetas, valor)] de cada serie del contador `name`"""
+        with self._lock:
+            return [(dict(labels), value) for (metric, labels), value in self.counters.items() if metric == name]
+
+    def write_textfile(self, path):
+        """Escribe las métricas de forma atómica (node_exporter nunca lee un fichero a medias)"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.render())
+        os.replace(tmp_path, path)
+
+    def serve(self, port, host="0.0.0.0"):
+        """Publica /metrics en un hilo en segundo plano y devuelve el servidor"""
+        registry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        print(f"📈 Métricas en http://{host}:{server.server_address[1]}/metrics")
+        return server
+
+
+# Registro compartido por todo el proceso
+metrics = MetricsRegistry()
@@ -0,0 +1,59 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from config import PARSE_WORKERS
+from metrics import metrics
+
+
+def _init_worker():
+    # El pool usa spawn: el hijo importa metrics de cero, pero lo que cuente al importar no debe ir al padre
+    metrics.reset()
+
+
+def _run_parser(parser, content):
+    """Se ejecuta en el proceso hijo: parsea y devuelve también las métricas que generó"""
+    with metrics.timer("imdb_stage_seconds", stage=parser.__name__):
+        parsed = parser(content)
+    return parsed, metrics.drain()
+
+
+class ParsePool:
+    """Parseo y extracción (JSON-LD, fallback HTML) en un pool de procesos.
+
+    Descargar es esperar a la red y parsear es CPU bajo el GIL: con los dos en el mismo
+    proceso, cada página que se parsea frena a las que se descargan. Aquí el HTML viaja
+    a `workers` procesos y el bucle de asyncio solo espera el resultado, así el parseo
+    escala con los núcleos y la concurrencia de red se ajusta por separado.
+
+    Las métricas de cada hijo vuelven con el resultado y se suman al registro del padre.
+    Con `workers=0` se parsea en el propio proceso, como antes.
+    """
+
+    def __init__(self, client, workers=PARSE_WORKERS):
+        self.client = client
+        self.workers = max(workers, 0)
+        self.executor = None
+        if self.workers:
+            # spawn: los hijos no heredan los hilos del pool HTTP ni los sockets abiertos
+            self.executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                mp_context=multiprocessing.get_context("spawn"),
+                                                initializer=_init_worker)
+
+    async def parse(self, url, response, parser):
+        """Como ImdbClient.parse, pero sin bloquear el bucle de eventos con el parseo"""
+        parsed = self.client.reused_parse(url, response, parser)
+        if parsed is not None:
+            return parsed
+        if self.executor is None:
+            return self.client.parse(url, response, parser)
+
+        loop = asyncio.get_running_loop()
+        parsed, snapshot = await loop.run_in_executor(self.executor, _run_parser, parser, response.content)
+        metrics.merge(snapshot)
+        self.client.store_parsed(url, response, parser, parsed)
+        return parsed
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
@@ -0,0 +1,130 @@
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+
+from config import PERSON_CACHE_PATH, PERSON_CACHE_TTL, PERSON_CACHE_MAX_ENTRIES
+from metrics import metrics
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS persons (
+    nm_id TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    used_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_persons_used ON persons(used_at);
+"""
+
+# Cada cuántas altas se comprueba el tamaño máximo (expulsar en cada una sería un COUNT por persona)
+EVICT_EVERY = 500
+
+
+class PersonCache:
+    """Memo persistente de fichas de persona por id `nm`, compartido por todo el crawl.
+
+    Una ficha (nombre, año de nacimiento, títulos por los que se la conoce) se descarga
+    como mucho una vez por `ttl`: las siguientes películas del mismo actor la leen de la
+    memoria del proceso o de la base SQLite, que sobrevive entre ejecuciones y se puede
+    compartir entre workers. Si varias películas piden a la vez a la misma persona, solo
+    una la descarga y las demás esperan ese resultado. Pasado `max_entries` se expulsan
+    las menos usadas. Los fallos no se guardan: se reintentan en la siguiente película.
+    """
+
+    def __init__(self, path=PERSON_CACHE_PATH, ttl=PERSON_CACHE_TTL, max_entries=PERSON_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.stats = {"memory": 0, "disk": 0, "coalesced": 0, "fetched": 0, "expired": 0, "failed": 0}
+        self._memory = {}
+        self._inflight = {}
+        self._puts = 0
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def _count(self, result):
+        self.stats[result] += 1
+        metrics.inc("imdb_person_cache_total", result=result)
+
+    def get(self, nm_id):
+        """Ficha vigente de `nm_id` (memoria del proceso y luego disco) o None"""
+        now = time.time()
+        entry = self._memory.get(nm_id)
+        if entry is not None and now - entry[1] < self.ttl:
+            self._count("memory")
+            return entry[0]
+        with self._lock:
+            row = self.conn.execute("SELECT data, fetched_at FROM persons WHERE nm_id = ?", (nm_id,)).fetchone()
+            if row is None:
+                return None
+            if now - row[1] >= self.ttl:
+                self._count("expired")
+                return None
+            self.conn.execute("UPDATE persons SET used_at = ? WHERE nm_id = ?", (now, nm_id))
+        person = json.loads(row[0])
+        self._memory[nm_id] = (person, row[1])
+        self._count("disk")
+        return person
+
+    def put(self, nm_id, person):
+        now = time.time()
+        self._memory[nm_id] = (person, now)
+        with self._lock:
+            self.conn.execute("INSERT OR REPLACE INTO persons (nm_id, data, fetched_at, used_at) VALUES (?, ?, ?, ?)",
+                              (nm_id, json.dumps(person, ensure_ascii=False), now, now))
+            self._puts += 1
+            if self._puts % EVICT_EVERY == 0:
+                self._evict()
+
+    def _evict(self):
+        """Deja la base en `max_entries` fichas, quitando las menos usadas (y las caducadas de memoria)"""
+        (count,) = self.conn.execute("SELECT COUNT(*) FROM persons").fetchone()
+        if count > self.max_entries:
+            self.conn.execute("DELETE FROM persons WHERE nm_id IN (SELECT nm_id FROM persons ORDER BY used_at LIMIT ?)",
+                              (count - self.max_entries,))
+        now = time.time()
+        self._memory = {nm_id: entry for nm_id, entry in self._memory.items() if now - entry[1] < self.ttl}
+
+    async def get_or_fetch(self, nm_id, fetch):
+        """Ficha de `nm_id` desde el memo o, si no está vigente, `await fetch(nm_id)` (una sola vez a la vez)"""
+        person = self.get(nm_id)
+        if person is not None:
+            return person
+        pending = self._inflight.get(nm_id)
+        if pending is not None:
+            self._count("coalesced")
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[nm_id] = future
+        try:
+            person = await fetch(nm_id)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception:
+            person = None
+        finally:
+            del self._inflight[nm_id]
+        if person:
+            self._count("fetched")
+            self.put(nm_id, person)
+        else:
+            self._count("failed")
+        future.set_result(person)
+        return person
+
+    def hit_ratio(self):
+        """Consultas servidas sin descargar / consultas totales"""
+        served = self.stats["memory"] + self.stats["disk"] + self.stats["coalesced"]
+        total = served + self.stats["fetched"] + self.stats["failed"]
+        return served / total if total else 0.0
+
+    def close(self):
+        with self._lock:
+            self._evict()
+            self.conn.close()
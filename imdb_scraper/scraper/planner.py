@@ -0,0 +1,59 @@
+# Campo de salida -> (clave en el registro del chart, clave en los detalles de la página)
+FIELD_SOURCES = {
+    'Título': ('title', 'title'),
+    'Año': ('year', 'precise_year'),
+    'Calificación': ('rating', 'rating'),
+    'Duración (min)': ('duration', 'detailed_duration'),
+    'Metascore': (None, 'metascore'),
+    'Actores': ('actors', 'actors'),  # el chart no los trae; los dumps TSV sí
+    'url': ('url', None),
+    'genre': ('genre', None),
+    'description': ('description', None),
+}
+OUTPUT_FIELDS = list(FIELD_SOURCES)
+CHART_FIELDS = [field for field, (chart_key, _) in FIELD_SOURCES.items() if chart_key]
+
+
+def parse_fields(value):
+    """'Título,Calificación' -> ['Título', 'Calificación'] validando los nombres"""
+    fields = [field.strip() for field in value.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in FIELD_SOURCES]
+    if unknown:
+        raise ValueError(f"Campos desconocidos: {', '.join(unknown)} (válidos: {', '.join(OUTPUT_FIELDS)})")
+    return fields
+
+
+def missing_fields(movie, fields):
+    """Campos pedidos que el registro del chart no trae y sí puede aportar la página de detalle"""
+    missing = []
+    for field in fields:
+        chart_key, detail_key = FIELD_SOURCES[field]
+        if detail_key is None:
+            continue
+        if chart_key is None or movie.get(chart_key) in (None, ''):
+            missing.append(field)
+    return missing
+
+
+def plan_fetches(movies, fields=None, chart_only=False):
+    """Decide qué películas necesitan su página de detalle.
+
+    Devuelve una lista paralela a `movies` con los campos que faltan de cada una
+    (lista vacía = basta con el chart). En modo `chart_only` nunca se pide un detalle.
+    """
+    fields = fields or OUTPUT_FIELDS
+    if chart_only:
+        plan = [[] for _ in movies]
+    else:
+        plan = [missing_fields(movie, fields) for movie in movies]
+
+    to_fetch = sum(1 for missing in plan if missing)
+    print(f"🗺️ Plan: {to_fetch}/{len(movies)} páginas de detalle necesarias para {', '.join(fields)}")
+    if to_fetch:
+        counts = {}
+        for missing in plan:
+            for field in missing:
+                counts[field] = counts.get(field, 0) + 1
+        print("   Campos que faltan en el chart: " + ", ".join(f"{field} ({count})" for field, count in counts.items()))
+    return plan
+
@@ -0,0 +1,236 @@
+import asyncio
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlsplit
+
+from config import (POSTERS_DIR, POSTER_CONCURRENCY, POSTER_MAX_BYTES, POSTER_THUMB_SIZES, POSTER_THUMB_WORKERS)
+from extractors import title_id
+from metrics import metrics
+from rate_limit import parse_retry_after
+
+INDEX_NAME = "index.tsv"
+EXTENSIONS = {"image/jpeg": ".jpg", "image/png": ".png", "image/webp": ".webp", "image/gif": ".gif"}
+
+
+def image_extension(response, url):
+    """Extensión del fichero según el Content-Type (o, si no lo dice, la de la URL)"""
+    content_type = response.headers.get("Content-Type", "").split(";")[0].strip().lower()
+    if content_type in EXTENSIONS:
+        return EXTENSIONS[content_type]
+    extension = os.path.splitext(urlsplit(url).path)[1].lower()
+    return extension if extension in EXTENSIONS.values() else ".img"
+
+
+def make_thumbnail(source, target, size):
+    """Miniatura JPEG de como mucho `size` px de lado (se ejecuta en el pool de procesos)"""
+    from PIL import Image
+
+    tmp_path = f"{target}.{os.getpid()}.tmp"
+    with Image.open(source) as image:
+        image.thumbnail((size, size))
+        image.convert("RGB").save(tmp_path, "JPEG", quality=85, optimize=True)
+    os.replace(tmp_path, target)
+    return target
+
+
+class PosterStore:
+    """Pósters en disco direccionados por contenido (SHA-256) con un índice URL -> hash.
+
+    Cada imagen se guarda una sola vez en `<hash[:2]>/<hash><ext>` aunque la compartan
+    varias películas o URLs. `index.tsv` anota por descarga id tt, URL, hash, extensión y
+    bytes (una línea en modo append, como el índice del archivo de páginas): en la
+    siguiente ejecución las URLs ya indexadas cuyo fichero sigue ahí no se vuelven a pedir.
+    Las miniaturas van a `thumbs/<tamaño>/<hash>.jpg`.
+    """
+
+    def __init__(self, directory=POSTERS_DIR):
+        self.directory = directory
+        self.by_url = {}
+        self._lock = threading.Lock()
+        self._index = None
+        os.makedirs(directory, exist_ok=True)
+        self.load()
+
+    def load(self):
+        try:
+            with open(os.path.join(self.directory, INDEX_NAME), encoding="utf-8") as f:
+                for line in f:
+                    fields = line.rstrip("\n").split("\t")
+                    # Una última línea cortada por una caída se ignora
+                    if len(fields) != 5:
+                        continue
+                    tt_id, url, digest, extension, size = fields
+                    self.by_url[url] = (digest, extension)
+        except FileNotFoundError:
+            pass
+
+    def path(self, digest, extension):
+        return os.path.join(self.directory, digest[:2], digest + extension)
+
+    def thumb_path(self, digest, size):
+        return os.path.join(self.directory, "thumbs", str(size), digest + ".jpg")
+
+    def lookup(self, url):
+        """(hash, ruta) del póster de `url` si ya se descargó y sigue en disco, o None"""
+        entry = self.by_url.get(url)
+        if entry is None or not os.path.exists(self.path(*entry)):
+            return None
+        return entry[0], self.path(*entry)
+
+    def temp_file(self):
+        # En el mismo directorio: pasarlo a su sitio es un rename, sin copiar
+        return tempfile.NamedTemporaryFile(dir=self.directory, prefix=".partial-", delete=False)
+
+    def add(self, tt_id, url, tmp_path, digest, extension, size):
+        """Deja la descarga en su ruta por hash (o la descarta si ese contenido ya estaba) y la indexa.
+
+        Devuelve (ruta, True si el contenido es nuevo).
+        """
+        path = self.path(digest, extension)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        new = not os.path.exists(path)
+        if new:
+            os.replace(tmp_path, path)
+        else:
+            os.remove(tmp_path)
+        with self._lock:
+            if self._index is None:
+                self._index = open(os.path.join(self.directory, INDEX_NAME), "a", encoding="utf-8")
+            self._index.write(f"{tt_id}\t{url}\t{digest}\t{extension}\t{size}\n")
+            self._index.flush()
+            self.by_url[url] = (digest, extension)
+        return path, new
+
+    def close(self):
+        with self._lock:
+            if self._index is not None:
+                self._index.close()
+                self._index = None
+
+
+class ThumbnailPool:
+    """Genera las miniaturas en `workers` procesos (0 = en un hilo); sin Pillow no hace nada"""
+
+    def __init__(self, sizes=POSTER_THUMB_SIZES, workers=POSTER_THUMB_WORKERS):
+        self.sizes = list(sizes)
+        self.executor = None
+        # Miniatura en curso -> su futuro: dos títulos con el mismo póster no la generan dos veces
+        self.pending = {}
+        if self.sizes:
+            try:
+                import PIL  # noqa: F401
+            except ImportError:
+                print("⚠️ Miniaturas omitidas: instala Pillow para generarlas")
+                self.sizes = []
+        if self.sizes and workers:
+            # spawn: los hijos no heredan los hilos del pool HTTP ni los sockets abiertos
+            self.executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+    async def make(self, store, digest, path):
+        """Miniaturas que falten de un póster. Devuelve cuántas generó"""
+        loop = asyncio.get_running_loop()
+        made = 0
+        for size in self.sizes:
+            target = store.thumb_path(digest, size)
+            if target in self.pending:
+                await self.pending[target]
+                continue
+            if os.path.exists(target):
+                continue
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            self.pending[target] = loop.run_in_executor(self.executor, make_thumbnail, path, target, size)
+            try:
+                with metrics.timer("imdb_stage_seconds", stage="thumbnail"):
+                    await self.pending[target]
+            finally:
+                del self.pending[target]
+            made += 1
+        return made
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+
+
+async def download_poster(client, limiter, store, tt_id, url, timeout=30, max_bytes=POSTER_MAX_BYTES):
+    """Descarga un póster a disco por trozos respetando el ritmo de su host. Devuelve (hash, ruta, resultado)"""
+    loop = asyncio.get_running_loop()
+    circuit = client.proxy_pool.acquire() if client.proxy_pool is not None else None
+    try:
+        with metrics.timer("imdb_stage_seconds", stage="rate_limit_wait"):
+            await limiter.acquire(url, circuit)
+    except asyncio.CancelledError:
+        # Cancelado esperando turno: el circuito no llegó a usarse
+        if circuit is not None:
+            client.proxy_pool.cancel(circuit)
+        raise
+    tmp_file = store.temp_file()
+    start = time.perf_counter()
+    try:
+        with tmp_file:
+            response, digest, size = await loop.run_in_executor(
+                None, lambda: client.download(url, tmp_file, timeout, circuit, max_bytes)
+            )
+    except Exception:
+        os.remove(tmp_file.name)
+        limiter.feedback(url, circuit, error=True)
+        raise
+    limiter.feedback(url, circuit, response.status_code, time.perf_counter() - start,
+                     parse_retry_after(response.headers.get("Retry-After")))
+    if digest is None:
+        os.remove(tmp_file.name)
+        raise RuntimeError(f"HTTP {response.status_code}")
+    path, new = store.add(tt_id, url, tmp_file.name, digest, image_extension(response, url), size)
+    return digest, path, "downloaded" if new else "deduplicated"
+
+
+async def download_posters(client, limiter, movies, store=None, concurrency=POSTER_CONCURRENCY,
+                           thumb_sizes=POSTER_THUMB_SIZES, thumb_workers=POSTER_THUMB_WORKERS):
+    """Pósters (`image` del chart) de `movies` a disco, con como mucho `concurrency` descargas a la vez.
+
+    Cada imagen se escribe por trozos mientras se calcula su hash, sin tener nunca el
+    cuerpo entero en memoria, y se guarda en el PosterStore por contenido. Las URLs ya
+    descargadas en otra ejecución se saltan. Con `thumb_sizes` cada póster nuevo (o sin
+    sus miniaturas) pasa por el ThumbnailPool. Devuelve {id tt: ruta del póster}.
+    """
+    store = store or PosterStore()
+    thumbnails = ThumbnailPool(thumb_sizes, thumb_workers)
+    jobs = asyncio.Queue()
+    for movie in movies:
+        if movie.get('image'):
+            jobs.put_nowait((title_id(movie['url']), movie['image']))
+    stats = {"skipped": 0, "downloaded": 0, "deduplicated": 0, "failed": 0, "thumbnails": 0}
+    posters = {}
+
+    async def worker():
+        while not jobs.empty():
+            tt_id, url = jobs.get_nowait()
+            found = store.lookup(url)
+            try:
+                if found is not None:
+                    digest, path = found
+                    result = "skipped"
+                else:
+                    digest, path, result = await download_poster(client, limiter, store, tt_id, url)
+                made = await thumbnails.make(store, digest, path)
+                stats["thumbnails"] += made
+            except Exception as e:
+                print(f"❌ Error descargando el póster de {tt_id}: {e}")
+                result = "failed"
+            else:
+                posters[tt_id] = path
+            stats[result] += 1
+            metrics.inc("imdb_poster_total", result=result)
+
+    try:
+        await asyncio.gather(*(worker() for _ in range(max(concurrency, 1))))
+    finally:
+        thumbnails.close()
+        store.close()
+    print(f"🖼️ Pósters: {stats['downloaded']} descargados, {stats['deduplicated']} repetidos (mismo contenido), "
+          f"{stats['skipped']} ya en disco, {stats['failed']} fallidos, {stats['thumbnails']} miniaturas")
+    return posters
@@ -0,0 +1,213 @@
+import re
+import socket
+import threading
+import time
+
+from config import (TOR_SOCKS_ENDPOINTS, TOR_CONTROL_ADDRESS, TOR_CONTROL_PASSWORD, NEWNYM_MIN_INTERVAL,
+                    TOR_BOOTSTRAP_TIMEOUT)
+
+# Respuestas que indican que el circuito (su IP de salida) está bloqueado o limitado
+BLOCKED_STATUSES = (403, 429)
+EWMA_ALPHA = 0.3
+BOOTSTRAP_RE = re.compile(r'PROGRESS=(\d+) TAG=(\S+)')
+# Cada cuánto se vuelve a preguntar por el bootstrap mientras no termina
+BOOTSTRAP_POLL_SECONDS = 0.5
+# Si el ControlPort no acepta ni una conexión en este tiempo, la dirección está mal (Tor ya estaría escuchando)
+CONTROL_CONNECT_SECONDS = 30
+# Código de respuesta del ControlPort cuando la contraseña no es la suya
+AUTH_FAILED = 515
+
+
+class TorControlError(RuntimeError):
+    """El ControlPort respondió, pero con un error (`code` es el código de la respuesta, p. ej. 515)"""
+
+    def __init__(self, message, code=None):
+        super().__init__(message)
+        self.code = code
+
+
+def tor_control_command(address, password, command, timeout=10):
+    """Envía un comando al ControlPort de Tor (autenticando con contraseña) y devuelve la respuesta"""
+    host, port = address.rsplit(":", 1)
+    with socket.create_connection((host, int(port)), timeout=timeout) as sock:
+        password = password.replace("\\", "\\\\").replace('"', '\\"')
+        sock.sendall(f'AUTHENTICATE "{password}"\r\n{command}\r\nQUIT\r\n'.encode())
+        reply = b""
+        while True:
+            chunk = sock.recv(4096)
+            if not chunk:
+                break
+            reply += chunk
+    reply = reply.decode(errors="replace")
+    if not reply.startswith("250"):
+        code = int(reply[:3]) if reply[:3].isdigit() else None
+        raise TorControlError(f"Tor ControlPort rechazó el comando: {reply.strip()}", code)
+    return reply
+
+
+def tor_bootstrap(address=TOR_CONTROL_ADDRESS, password=TOR_CONTROL_PASSWORD):
+    """(porcentaje, etapa) del bootstrap de Tor según su ControlPort; 100 = listo para crear circuitos"""
+    reply = tor_control_command(address, password, "GETINFO status/bootstrap-phase", timeout=5)
+    match = BOOTSTRAP_RE.search(reply)
+    if not match:
+        raise TorControlError(f"Respuesta inesperada del ControlPort: {reply.strip()}")
+    return int(match.group(1)), match.group(2)
+
+
+def wait_for_bootstrap(address=TOR_CONTROL_ADDRESS, password=TOR_CONTROL_PASSWORD, timeout=TOR_BOOTSTRAP_TIMEOUT):
+    """Espera a que Tor termine el bootstrap (no basta con que el SocksPort acepte conexiones).
+
+    Antes del 100% las peticiones por SOCKS se quedan colgadas hasta su timeout. Solo se
+    reintenta mientras el bootstrap avanza o el ControlPort aún no acepta conexiones (como
+    mucho CONTROL_CONNECT_SECONDS). Devuelve True si Tor está listo y False si pasó
+    `timeout`, el ControlPort no responde o rechaza la contraseña (se sigue sin esperar,
+    como antes).
+    """
+    start = time.monotonic()
+    deadline = start + timeout
+    connected = False
+    last = None
+    while True:
+        try:
+            progress, tag = tor_bootstrap(address, password)
+            connected = True
+        except TorControlError as e:
+            # Contraseña equivocada u orden rechazada: esperar no lo arregla
+            if e.code == AUTH_FAILED:
+                print(f"❌ El ControlPort de Tor ({address}) rechazó la contraseña: revisa TOR_CONTROL_PASSWORD")
+            else:
+                print(f"❌ No se pudo consultar el bootstrap de Tor: {e}")
+            return False
+        except OSError as e:
+            if not connected and time.monotonic() - start >= CONTROL_CONNECT_SECONDS:
+                print(f"⚠️ El ControlPort de Tor ({address}) no responde: se continúa sin esperar al bootstrap")
+                return False
+            progress, tag = None, str(e)
+        if progress == 100:
+            if last is not None:
+                print("🧅 Tor listo (bootstrap 100%)")
+            return True
+        if (progress, tag) != last:
+            print(f"🧅 Esperando a Tor: bootstrap {progress if progress is not None else '?'}% ({tag})")
+            last = (progress, tag)
+        if time.monotonic() >= deadline:
+            print(f"⚠️ Tor no terminó el bootstrap en {timeout:.0f} s: se continúa igualmente")
+            return False
+        time.sleep(BOOTSTRAP_POLL_SECONDS)
+
+
+class Circuit:
+    """Un endpoint SOCKS (un SocksPort de Tor = circuitos aislados) con su puntuación"""
+
+    def __init__(self, proxy_url):
+        self.proxy_url = proxy_url
+        self.proxies = {"http": proxy_url, "https": proxy_url}
+        self.latency = None  # media móvil exponencial (segundos)
+        self.error_rate = 0.0  # media móvil exponencial de fallos (0..1)
+        self.in_flight = 0
+        self.requests = 0
+        self.errors = 0
+        self.rotations = 0
+        self.cooldown_until = 0.0
+
+    def score(self, default_latency):
+        """Menor es mejor: latencia esperada penalizada por carga y por tasa de error"""
+        latency = self.latency if self.latency is not None else default_latency
+        return latency * (1 + self.in_flight) * (1 + 4 * self.error_rate)
+
+    def record(self, latency, failed):
+        self.requests += 1
+        self.errors += int(failed)
+        if latency is not None and not failed:
+            self.latency = latency if self.latency is None else (1 - EWMA_ALPHA) * self.latency + EWMA_ALPHA * latency
+        self.error_rate = (1 - EWMA_ALPHA) * self.error_rate + EWMA_ALPHA * (1.0 if failed else 0.0)
+
+
+class ProxyPool:
+    """Reparte las peticiones entre varios endpoints SOCKS y rota los circuitos bloqueados.
+
+    Cada petición va al circuito con mejor puntuación (latencia × carga × errores). Cuando
+    un circuito devuelve 403/429 se pide NEWNYM por el ControlPort (como mucho una vez cada
+    NEWNYM_MIN_INTERVAL segundos, el mismo límite que aplica Tor) y el circuito queda en
+    reposo hasta entonces. Sin ControlPort (p. ej. un proxy SOCKS local de pruebas) solo
+    se aplica el reposo.
+    """
+
+    def __init__(self, endpoints=None, control_address=TOR_CONTROL_ADDRESS, control_password=TOR_CONTROL_PASSWORD,
+                 newnym_interval=NEWNYM_MIN_INTERVAL):
+        self.circuits = [Circuit(url) for url in (endpoints or TOR_SOCKS_ENDPOINTS)]
+        self.control_address = control_address
+        self.control_password = control_password
+        self.newnym_interval = newnym_interval
+        self.last_newnym = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self, exclude=None):
+        """Elige el circuito para la siguiente petición y lo marca como ocupado.
+
+        `exclude` (p. ej. el circuito de la petición original al lanzar una copia) solo se
+        elige si no queda otro.
+        """
+        with self._lock:
+            now = time.monotonic()
+            available = [c for c in self.circuits if c.cooldown_until <= now] or self.circuits
+            available = [c for c in available if c is not exclude] or available
+            known = [c.latency for c in self.circuits if c.latency is not None]
+            default_latency = sum(known) / len(known) if known else 1.0
+            circuit = min(available, key=lambda c: c.score(default_latency))
+            circuit.in_flight += 1
+            return circuit
+
+    def reserve(self, circuit):
+        """Marca como ocupado un circuito concreto (p. ej. para precalentar sus conexiones)"""
+        with self._lock:
+            circuit.in_flight += 1
+
+    def cancel(self, circuit):
+        """Devuelve un circuito elegido que al final no se usó (p. ej. respuesta en caché)"""
+        with self._lock:
+            circuit.in_flight -= 1
+
+    def release(self, circuit, latency=None, status=None, error=False):
+        """Registra el resultado de una petición hecha por `circuit`"""
+        blocked = status in BLOCKED_STATUSES
+        with self._lock:
+            circuit.in_flight -= 1
+            circuit.record(latency, error or blocked)
+            if not blocked:
+                return
+            circuit.cooldown_until = time.monotonic() + self.newnym_interval
+        print(f"🔄 {circuit.proxy_url} devolvió {status}: rotando circuito")
+        self.rotate(circuit)
+
+    def rotate(self, circuit):
+        """Pide a Tor circuitos nuevos (NEWNYM) respetando el intervalo mínimo"""
+        if not self.control_address:
+            return False
+        with self._lock:
+            now = time.monotonic()
+            if now - self.last_newnym < self.newnym_interval:
+                return False
+            self.last_newnym = now
+        try:
+            tor_control_command(self.control_address, self.control_password, "SIGNAL NEWNYM")
+        except Exception as e:
+            print(f"⚠️ No se pudo rotar el circuito vía ControlPort: {e}")
+            return False
+        with self._lock:
+            circuit.rotations += 1
+            circuit.latency = None  # circuito nuevo: la latencia anterior ya no sirve
+        return True
+
+    def stats(self):
+        return [
+            {
+                "proxy": c.proxy_url,
+                "requests": c.requests,
+                "errors": c.errors,
+                "latency_ms": round(c.latency * 1000) if c.latency is not None else None,
+                "error_rate": round(c.error_rate, 3),
+                "rotations": c.rotations,
+            }
+            for c in self.circuits
+        ]
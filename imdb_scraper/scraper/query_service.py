@@ -0,0 +1,335 @@
+import argparse
+import bisect
+import heapq
+import itertools
+import json
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from config import QUERY_PORT, QUERY_SOURCE, QUERY_RELOAD_SECONDS, QUERY_MAX_RESULTS
+from extractors import title_id
+from sinks import read_ndjson
+
+YEAR_RE = re.compile(r"\d{4}")
+NM_ID_RE = re.compile(r"^nm\d+$")
+DEFAULT_LIMIT = 50
+# Filtro de rango -> (columna, límite); `sort` acepta las columnas y `title` (con `-` delante = descendente)
+RANGE_PARAMS = {
+    "year_min": ("year", "min"), "year_max": ("year", "max"),
+    "rating_min": ("rating", "min"), "rating_max": ("rating", "max"),
+    "duration_min": ("duration", "min"), "duration_max": ("duration", "max"),
+}
+TERM_PARAMS = ("actor", "genre")
+SORT_KEYS = ("year", "rating", "duration", "title")
+
+
+class QueryError(ValueError):
+    """Consulta mal formada (parámetro desconocido o valor no numérico): HTTP 400"""
+
+
+def _number(value, cast=float):
+    try:
+        return cast(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _year(value):
+    match = YEAR_RE.search(str(value or ""))
+    return int(match.group(0)) if match else None
+
+
+def _genres(value):
+    values = value if isinstance(value, list) else str(value or "").split(",")
+    return {genre.strip().lower() for genre in values if genre and genre.strip()}
+
+
+def _people(record):
+    """Nombres (en minúsculas) de los actores e ids `nm` del reparto completo si está (--cast)"""
+    cast = record.get('cast') or []
+    names = list(record.get('Actores') or []) + [member.get('name') for member in cast]
+    ids = [member.get('nm_id') for member in cast]
+    return {name.strip().lower() for name in names if name} | {nm_id for nm_id in ids if nm_id}
+
+
+class SortedColumn:
+    """Valores ordenados con la posición de cada película: un rango son dos `bisect` y ordenar, recorrerla"""
+
+    def __init__(self, values):
+        pairs = sorted((value, index) for index, value in enumerate(values) if value is not None)
+        self.keys = [value for value, _ in pairs]
+        self.ids = [index for _, index in pairs]
+
+    def bounds(self, low=None, high=None):
+        start = 0 if low is None else bisect.bisect_left(self.keys, low)
+        end = len(self.keys) if high is None else bisect.bisect_right(self.keys, high)
+        return start, max(start, end)
+
+
+class MovieIndex:
+    """Los resultados de un crawl en memoria con índices para filtrar sin recorrerlos.
+
+    Año, calificación y duración van en columnas ordenadas (SortedColumn) y actores
+    (nombre, o id `nm` si el crawl trajo el reparto) y géneros en índices invertidos término -> {películas}. Una
+    consulta empieza por el filtro más selectivo (el rango o la lista más corta) y
+    comprueba los demás solo sobre esas candidatas. Es inmutable: para recargar se
+    construye otro y se sustituye de una vez.
+    """
+
+    def __init__(self, records, source=None):
+        self.records = records
+        self.source = source
+        self.loaded_at = time.time()
+        self.values = {
+            "year": [_year(record.get('Año')) for record in records],
+            "rating": [_number(record.get('Calificación')) for record in records],
+            "duration": [_number(record.get('Duración (min)'), int) for record in records],
+            "title": [str(record.get('Título') or "").lower() or None for record in records],
+        }
+        self.columns = {name: SortedColumn(values) for name, values in self.values.items()}
+        self.terms = {"actor": {}, "genre": {}}
+        self.by_id = {}
+        for index, record in enumerate(records):
+            for person in _people(record):
+                self.terms["actor"].setdefault(person, set()).add(index)
+            for genre in _genres(record.get('genre')):
+                self.terms["genre"].setdefault(genre, set()).add(index)
+            tt_id = title_id(record.get('url'))
+            if tt_id:
+                self.by_id[tt_id] = index
+
+    def get(self, tt_id):
+        index = self.by_id.get(tt_id)
+        return None if index is None else self.records[index]
+
+    def query(self, params):
+        """Filtra y ordena según `params` (de la query string). Devuelve (total, registros de la página)"""
+        ranges = {}
+        terms = []
+        for key, values in params.items():
+            if key in RANGE_PARAMS:
+                column, side = RANGE_PARAMS[key]
+                value = _number(values[-1])
+                if value is None:
+                    raise QueryError(f"{key} debe ser un número")
+                low, high = ranges.get(column, (None, None))
+                ranges[column] = (value, high) if side == "min" else (low, value)
+            elif key in TERM_PARAMS:
+                for value in values:
+                    term = value.strip() if NM_ID_RE.match(value.strip()) else value.strip().lower()
+                    terms.append(self.terms[key].get(term, set()))
+            elif key not in ("sort", "limit", "offset"):
+                raise QueryError(f"parámetro desconocido: {key}")
+
+        # (tamaño, candidatas, comprobación) de cada filtro; se parte del más pequeño
+        filters = []
+        for column, (low, high) in ranges.items():
+            start, end = self.columns[column].bounds(low, high)
+            values = self.values[column]
+            filters.append((end - start, lambda column=column, start=start, end=end: self.columns[column].ids[start:end],
+                            lambda index, values=values, low=low, high=high: values[index] is not None
+                            and (low is None or values[index] >= low) and (high is None or values[index] <= high)))
+        for postings in terms:
+            filters.append((len(postings), lambda postings=postings: postings, postings.__contains__))
+        if filters:
+            filters.sort(key=lambda item: item[0])
+            _, candidates, _ = filters[0]
+            checks = [check for _, _, check in filters[1:]]
+            matches = candidates()
+            if checks:
+                matches = [index for index in matches if all(check(index) for check in checks)]
+        else:
+            matches = range(len(self.records))
+
+        sort = (params.get("sort") or [""])[-1]
+        key = sort.lstrip("-")
+        if sort and key not in SORT_KEYS:
+            raise QueryError(f"sort debe ser uno de {', '.join(SORT_KEYS)}")
+        limit = _number((params.get("limit") or [DEFAULT_LIMIT])[-1], int)
+        offset = _number((params.get("offset") or [0])[-1], int)
+        if limit is None or offset is None or limit < 0 or offset < 0:
+            raise QueryError("limit y offset deben ser enteros positivos")
+
+        # Solo se ordena lo que llega hasta la página pedida: O(n log k) en lugar de O(n log n)
+        end = offset + min(limit, QUERY_MAX_RESULTS)
+        if not sort:
+            # Orden del fichero (el ranking de los charts)
+            page = heapq.nsmallest(end, matches)[offset:end]
+        else:
+            values = self.values[key]
+            if len(matches) * 16 > len(self.records):
+                # Casi todo el catálogo: se recorre la columna ya ordenada hasta llenar la página
+                wanted = matches if isinstance(matches, (range, set)) else set(matches)
+                ordered = reversed(self.columns[key].ids) if sort.startswith("-") else self.columns[key].ids
+                top = list(itertools.islice((index for index in ordered if index in wanted), end))
+            else:
+                known = [index for index in matches if values[index] is not None]
+                top = (heapq.nlargest if sort.startswith("-") else heapq.nsmallest)(end, known, key=values.__getitem__)
+            if len(top) < end:
+                # Las películas sin ese dato van siempre al final
+                top += sorted(index for index in matches if values[index] is None)[:end - len(top)]
+            page = top[offset:end]
+        return len(matches), [self.records[index] for index in page]
+
+
+def load_records(path):
+    """Registros de un crawl: el JSON (solo es válido cuando el crawl terminó) o el NDJSON"""
+    if path.endswith(".ndjson"):
+        return list(read_ndjson(path))
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+class QueryService:
+    """Sirve un MovieIndex por HTTP y lo recarga cuando cambian los resultados en disco.
+
+    Cada `reload_seconds` se mira el tamaño y la fecha del fichero; si cambiaron se
+    construye un índice nuevo en segundo plano y se sustituye de una vez, así las
+    consultas en curso terminan con el anterior. Un JSON a medias (el crawl aún lo está
+    escribiendo) no se carga: se sigue sirviendo el anterior hasta que esté completo.
+    """
+
+    def __init__(self, source=QUERY_SOURCE, reload_seconds=QUERY_RELOAD_SECONDS):
+        self.source = source
+        self.reload_seconds = reload_seconds
+        self.index = None
+        self.signature = None
+        # Última versión a medias que no se pudo cargar: no se vuelve a leer hasta que cambie
+        self.rejected = None
+        self.reloads = 0
+        self._stop = threading.Event()
+
+    def _signature(self):
+        try:
+            stat = os.stat(self.source)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def reload(self):
+        """Carga los resultados si cambiaron desde la última vez. Devuelve True si hay índice nuevo"""
+        signature = self._signature()
+        if signature is None or signature in (self.signature, self.rejected):
+            return False
+        start = time.perf_counter()
+        try:
+            records = load_records(self.source)
+        except (ValueError, OSError) as e:
+            # Mientras un crawl escribe el JSON cada vistazo lo ve a medias: se avisa una vez y sin índice
+            if self.index is None and self.rejected is None:
+                print(f"⚠️ '{self.source}' aún no se puede cargar ({e}); se reintenta cuando cambie")
+            self.rejected = signature
+            return False
+        self.index = MovieIndex(records, self.source)
+        self.signature = signature
+        self.reloads += 1
+        print(f"🔎 Índice con {len(records)} películas cargado desde '{self.source}' "
+              f"en {(time.perf_counter() - start) * 1000:.0f} ms")
+        return True
+
+    def watch(self):
+        while not self._stop.wait(self.reload_seconds):
+            try:
+                self.reload()
+            except Exception as e:
+                print(f"❌ Error recargando '{self.source}': {e}")
+
+    def stats(self):
+        index = self.index
+        return {
+            "source": self.source,
+            "movies": len(index.records) if index is not None else 0,
+            "loaded_at": index.loaded_at if index is not None else None,
+            "reloads": self.reloads,
+            "actors": len(index.terms["actor"]) if index is not None else 0,
+            "genres": len(index.terms["genre"]) if index is not None else 0,
+        }
+
+    def serve(self, port=QUERY_PORT, host="0.0.0.0"):
+        """Publica /movies, /movies/<tt>, /stats y /health en un hilo y devuelve el servidor"""
+        self.reload()
+        threading.Thread(target=self.watch, daemon=True).start()
+        service = self
+
+        class QueryHandler(BaseHTTPRequestHandler):
+            def _send(self, status, payload):
+                body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                url = urlsplit(self.path)
+                path = url.path.rstrip("/")
+                # Una sola lectura: una recarga a mitad de la petición no la afecta
+                index = service.index
+                if path == "/health":
+                    self._send(200 if index is not None else 503, {"ready": index is not None})
+                    return
+                if path == "/stats":
+                    self._send(200, service.stats())
+                    return
+                if index is None:
+                    self._send(503, {"error": f"'{service.source}' aún no está cargado"})
+                    return
+                start = time.perf_counter()
+                if path == "/movies":
+                    try:
+                        total, results = index.query(parse_qs(url.query))
+                    except QueryError as e:
+                        self._send(400, {"error": str(e)})
+                        return
+                    took_ms = (time.perf_counter() - start) * 1000
+                    self._send(200, {"total": total, "took_ms": round(took_ms, 3), "results": results})
+                    return
+                if path.startswith("/movies/"):
+                    record = index.get(path.rsplit("/", 1)[1])
+                    self._send(200 if record is not None else 404, record or {"error": "película no encontrada"})
+                    return
+                self._send(404, {"error": "ruta desconocida (usa /movies, /movies/<tt>, /stats o /health)"})
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), QueryHandler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        print(f"🔎 Consultas en http://{host}:{server.server_address[1]}/movies")
+        return server
+
+    def close(self):
+        self._stop.set()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="API HTTP/JSON de solo lectura sobre los resultados del scraper")
+    parser.add_argument("--source", default=QUERY_SOURCE, help="Resultados a servir (movies_detailed.json o .ndjson)")
+    parser.add_argument("--port", type=int, default=QUERY_PORT)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--reload-seconds", type=float, default=QUERY_RELOAD_SECONDS,
+                        help="Cada cuántos segundos se mira si un crawl nuevo cambió los resultados")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    service = QueryService(args.source, args.reload_seconds)
+    server = service.serve(args.port, args.host)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
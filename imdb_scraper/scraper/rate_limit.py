@@ -0,0 +1,149 @@
+import asyncio
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+from config import AIMD_MIN_RATE, AIMD_INCREASE, AIMD_DECREASE, AIMD_LATENCY_SPIKE
+
+# Respuestas con las que el servidor pide explícitamente bajar el ritmo
+THROTTLE_STATUSES = (429, 503)
+# Una subida de latencia menor que esto se considera ruido aunque supere el factor
+SPIKE_MIN_SECONDS = 0.25
+
+
+class TokenBucket:
+    """Token bucket asíncrono: `rate` peticiones por segundo con ráfagas de hasta `burst`"""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def pause(self, seconds):
+        """No entrega tokens durante `seconds` (p. ej. lo que pida un Retry-After)"""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    async def acquire(self):
+        """Espera hasta que haya un token disponible y lo consume"""
+        async with self._lock:
+            while time.monotonic() < self.paused_until:
+                await asyncio.sleep(self.paused_until - time.monotonic())
+            self._refill()
+            while self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= 1
+
+
+def parse_retry_after(value):
+    """Segundos de espera de una cabecera Retry-After (número o fecha HTTP)"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+class AimdController:
+    """Ajusta el ritmo de un token bucket con AIMD según cómo responde el servidor.
+
+    Cada respuesta rápida y correcta suma `increase / rate` (≈ `increase` peticiones/s más
+    por cada segundo de tráfico sano); un 429/503, un Retry-After, un error o una latencia
+    `latency_spike` veces por encima de la habitual multiplica el ritmo por `decrease`. Los
+    recortes se agrupan: varias respuestas malas en vuelo a la vez cuentan como una.
+    """
+
+    def __init__(self, bucket, max_rate, min_rate=AIMD_MIN_RATE, increase=AIMD_INCREASE, decrease=AIMD_DECREASE,
+                 latency_spike=AIMD_LATENCY_SPIKE):
+        self.bucket = bucket
+        self.max_rate = max(max_rate, bucket.rate)
+        self.min_rate = min_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_spike = latency_spike
+        self.baseline = None  # latencia habitual (media móvil exponencial)
+        self.last_cut = 0.0
+        self.cuts = 0
+
+    def _cut(self):
+        now = time.monotonic()
+        window = max(1 / self.bucket.rate, self.baseline or 0)
+        if now - self.last_cut < window:
+            return
+        self.bucket.rate = max(self.min_rate, self.bucket.rate * self.decrease)
+        self.last_cut = now
+        self.cuts += 1
+
+    def on_response(self, status, latency=None, retry_after=None):
+        if retry_after:
+            self.bucket.pause(retry_after)
+        if status in THROTTLE_STATUSES or retry_after:
+            self._cut()
+            return
+        if status is not None and status >= 500:
+            self._cut()
+            return
+
+        if latency is not None:
+            if (self.baseline is not None and latency > self.latency_spike * self.baseline
+                    and latency - self.baseline > SPIKE_MIN_SECONDS):
+                self.baseline = 0.9 * self.baseline + 0.1 * latency
+                self._cut()
+                return
+            self.baseline = latency if self.baseline is None else 0.9 * self.baseline + 0.1 * latency
+        self.bucket.rate = min(self.max_rate, self.bucket.rate + self.increase / max(self.bucket.rate, 1))
+
+    def on_error(self):
+        self._cut()
+
+
+class AdaptiveRateLimiter:
+    """Limita el ritmo por host y por circuito Tor, cada uno con su propio AIMD.
+
+    Una petición necesita un token del bucket de su host y, si sale por un circuito del
+    ProxyPool, también del bucket de ese circuito. Ambos reciben la respuesta como feedback.
+    """
+
+    def __init__(self, rate, burst=1, max_rate=None):
+        self.rate = rate
+        self.burst = burst
+        self.max_rate = max_rate if max_rate is not None else rate
+        self.controllers = {}
+
+    def _controllers(self, url, circuit=None):
+        keys = [("host", urlparse(url).netloc)]
+        if circuit is not None:
+            keys.append(("circuit", circuit.proxy_url))
+        controllers = []
+        for key in keys:
+            if key not in self.controllers:
+                self.controllers[key] = AimdController(TokenBucket(self.rate, self.burst), self.max_rate)
+            controllers.append(self.controllers[key])
+        return controllers
+
+    async def acquire(self, url, circuit=None):
+        for controller in self._controllers(url, circuit):
+            await controller.bucket.acquire()
+
+    def feedback(self, url, circuit=None, status=None, latency=None, retry_after=None, error=False):
+        for controller in self._controllers(url, circuit):
+            if error:
+                controller.on_error()
+            else:
+                controller.on_response(status, latency, retry_after)
+
+    def rates(self):
+        """Ritmo actual (peticiones/s) y recortes de cada host y circuito"""
+        return {f"{kind}:{name}": (round(c.bucket.rate, 2), c.cuts) for (kind, name), c in self.controllers.items()}
@@ -0,0 +1,134 @@
+import argparse
+import contextlib
+import io
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+from archive import PageArchive, read_record
+from cache import resource_type
+from config import ARCHIVE_DIR, OUTPUT_DIR, OUTPUT_FORMATS, IMDB_CHART_URLS
+from crawler import stub_movie
+from extractors import parse_top_movies, parse_movie_details, build_enhanced_movie, title_id
+from metrics import metrics
+from scraper import formats_arg, print_selector_report
+from sinks import SINK_FORMATS, open_sinks
+
+# Páginas por tarea del pool: suficientes para que el envío entre procesos no domine
+BATCH_SIZE = 64
+
+
+############################## Re-extraer paginas archivadas #########################################################
+def _init_worker():
+    # Con fork el hijo hereda las métricas del padre: se vacían para no sumarlas dos veces
+    metrics.reset()
+
+
+def extract_batch(directory, entries, verbose=False):
+    """Lee del archivo y extrae un lote de páginas de título: ([(id tt, detalles)], métricas del lote)"""
+    results = []
+    # parse_movie_details informa de cada página por consola: con miles de páginas solo estorba
+    with contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO()):
+        for tt_id, (segment, offset, length) in entries:
+            try:
+                _, _, _, body = read_record(directory, segment, offset, length)
+                results.append((tt_id, parse_movie_details(body)))
+            except Exception as e:
+                print(f"❌ Error re-extrayendo {tt_id}: {e}")
+                results.append((tt_id, {}))
+    # Las métricas (aciertos de selectores incluidos) vuelven al proceso principal
+    return results, metrics.drain()
+
+
+def chart_movies(directory, entries):
+    """Películas de los charts archivados, deduplicadas y en el orden de IMDB_CHART_URLS"""
+    charts = sorted((url for url in entries if resource_type(url) == "chart"),
+                    key=lambda url: (IMDB_CHART_URLS.index(url) if url in IMDB_CHART_URLS else len(IMDB_CHART_URLS),
+                                     entries[url][4]))
+    movies = []
+    seen = set()
+    for url in charts:
+        _, _, _, body = read_record(directory, *entries[url][:3])
+        for movie in parse_top_movies(body):
+            if title_id(movie['url']) not in seen:
+                seen.add(title_id(movie['url']))
+                movies.append(movie)
+    return movies
+
+
+def reextract(directory=ARCHIVE_DIR, output_dir=OUTPUT_DIR, formats=OUTPUT_FORMATS, workers=None, limit=None,
+              verbose=False):
+    """Regenera la salida a partir del archivo de páginas, sin red y usando todos los núcleos.
+
+    Los charts dan el orden y los datos básicos; cada página de título se vuelve a pasar
+    por parse_movie_details en un pool de procesos. Solo salen los títulos con su página
+    archivada (los del chart que nunca se rastrearon se omiten); los que no están en ningún
+    chart (descubiertos por enlaces) van al final. Devuelve cuántos registros escribió.
+    """
+    start = time.perf_counter()
+    entries = {url: entry for url, entry in PageArchive(directory).entries().items() if entry[3] == 200}
+    pages = {}
+    for url, entry in sorted(entries.items(), key=lambda item: item[1][4]):
+        if resource_type(url) == "title":
+            pages[title_id(url)] = entry
+    print(f"🗃️ Archivo: {len(entries)} páginas ({len(pages)} de título) en '{directory}'")
+
+    # El chart trae más títulos de los que rastreó el --limit original: solo los archivados
+    movies = [movie for movie in chart_movies(directory, entries) if title_id(movie['url']) in pages]
+    known = {title_id(movie['url']) for movie in movies}
+    movies += [stub_movie(tt_id) for tt_id in pages if tt_id not in known]
+    movies = movies[:limit] if limit else movies
+
+    # Lotes en orden de segmento y offset: cada proceso lee el archivo casi secuencialmente
+    wanted = sorted(((title_id(movie['url']), pages[title_id(movie['url'])][:3]) for movie in movies),
+                    key=lambda item: item[1])
+    batches = [wanted[i:i + BATCH_SIZE] for i in range(0, len(wanted), BATCH_SIZE)]
+    workers = workers if workers is not None else os.cpu_count() or 1
+    details = {}
+    if workers > 1 and len(batches) > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+            for results, snapshot in executor.map(extract_batch, repeat(directory), batches, repeat(verbose)):
+                details.update(results)
+                metrics.merge(snapshot)
+    else:
+        for batch in batches:
+            results, snapshot = extract_batch(directory, batch, verbose)
+            details.update(results)
+            metrics.merge(snapshot)
+    parsed_at = time.perf_counter()
+
+    sink = open_sinks(formats, output_dir)
+    try:
+        for movie in movies:
+            sink.write(build_enhanced_movie(movie, details.get(title_id(movie['url']), {})))
+    finally:
+        sink.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"♻️ {len(wanted)} páginas re-extraídas con {workers} procesos en {parsed_at - start:.2f} s "
+          f"({len(wanted) / max(parsed_at - start, 1e-9):.0f} páginas/s); {len(movies)} registros en {elapsed:.2f} s")
+    print_selector_report()
+    return len(movies)
+############################## Re-extraer paginas archivadas #########################################################
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Regenera la salida desde el archivo de páginas, sin red")
+    parser.add_argument("--archive", default=ARCHIVE_DIR, help="Directorio del archivo WARC (index.tsv + segmentos)")
+    parser.add_argument("--output-dir", default=OUTPUT_DIR, help="Dónde escribir JSON/CSV/NDJSON/SQLite")
+    parser.add_argument("--formats", type=formats_arg, default=OUTPUT_FORMATS,
+                        help=f"Formatos de salida separados por comas ({','.join(SINK_FORMATS)})")
+    parser.add_argument("--workers", type=int, default=None, help="Procesos de extracción (por defecto uno por núcleo)")
+    parser.add_argument("--limit", type=int, default=None, help="Registros como máximo (por defecto todos)")
+    parser.add_argument("--verbose", action="store_true", help="Mostrar el detalle de la extracción de cada página")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    return reextract(args.archive, args.output_dir, args.formats, args.workers, args.limit, args.verbose)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,154 +1,54 @@
-import requests
-from bs4 import BeautifulSoup
-import json
-import re
-import time
-import csv
+import argparse
+import asyncio
+import os
 from urllib.parse import urljoin
 
-IMDB_TOP_URL = "https://www.imdb.com/chart/top/"
-PROXIES = {
-     "http": "socks5h://tor:9050",
-     "https": "socks5h://tor:9050"
- }
-#PROXIES = None  # Desactivar proxy para pruebas
-HEADERS = {
-    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0.0.0 Safari/537.36"
-}
-
-def parse_duration(iso_duration):
-    """Convierte duración ISO 8601 (PT#H#M) a minutos"""
-    match = re.match(r"PT(?:(\d+)H)?(?:(\d+)M)?", iso_duration)
-    if not match:
-        return ""
-    hours = int(match.group(1)) if match.group(1) else 0
-    minutes = int(match.group(2)) if match.group(2) else 0
-    return hours * 60 + minutes
+from config import (IMDB_BASE_URL, IMDB_TOP_URL, OUTPUT_DIR, MAX_CONCURRENCY, RATE_LIMIT, RATE_BURST, RATE_MAX,
+                    METRICS_PORT, METRICS_TEXTFILE, OUTPUT_FORMATS, IMDB_CHART_URLS, FOLLOW_DEPTH, PARSE_WORKERS,
+                    IMDB_DUMPS_DIR, SCRAPER_ROLE, QUEUE_PATH, CAST_ENRICH,
+                    HEDGE_ENABLED, RUN_BUDGET, POSTERS_ENABLED, POSTER_THUMB_SIZES, PROXIES, TOR_CONTROL_ADDRESS,
+                    TOR_BOOTSTRAP_TIMEOUT)
+from extraction_rules import TITLE_RULES, CREDITS_RULES, PERSON_RULES, selector_hit_rates
+from extractors import parse_duration, parse_top_movies, parse_movie_details
+from crawler import build_client, run_crawl
+from distributed import run_coordinator, run_worker
+from html_backends import get_backend
+from http_client import get_client
+from journal import CrawlJournal
+from metrics import metrics
+from planner import OUTPUT_FIELDS, parse_fields
+from proxy_pool import wait_for_bootstrap
+from sinks import SINK_CLASSES, SINK_FORMATS, open_sinks, read_ndjson
+from work_queue import WorkQueue
 
 ############################## Funcion obtener peliculas #########################################################
 def get_top_movies():
     print("🔍 Obteniendo lista de películas...")
 
     try:
-        response = requests.get(IMDB_TOP_URL, headers=HEADERS, proxies=PROXIES, timeout=40)
+        response = get_client().get(IMDB_TOP_URL, timeout=20)
         print(f"✅ Código de estado: {response.status_code}")
     except Exception as e:
         print(f"❌ Error al acceder a IMDb: {e}")
         return []
 
-    soup = BeautifulSoup(response.text, 'html.parser')
-    movies = []
-
-    # Método 1: Intentar extraer desde JSON-LD
-    try:
-        script_tag = soup.find("script", type="application/ld+json")
-        if script_tag and script_tag.string:
-            data = json.loads(script_tag.string)
-            if "itemListElement" in data:
-                items = data.get("itemListElement", [])
-                for entry in items[:50]:
-                    item = entry.get("item", {})
-                    if item:
-                        movie = {
-                            "title": item.get("name"),
-                            "year": item.get("datePublished", ""),
-                            "duration": parse_duration(item.get("duration", "")),
-                            "rating": item.get("aggregateRating", {}).get("ratingValue", ""),
-                            "ratingCount": item.get("aggregateRating", {}).get("ratingCount", ""),
-                            "url": item.get("url"),
-                            "genre": item.get("genre"),
-                            "description": item.get("description"),
-                            "image": item.get("image"),
-                        }
-                        movies.append(movie)
-                print(f"✅ Encontradas {len(movies)} películas via JSON-LD")
-                if movies:
-                    return movies
-    except Exception as e:
-        print(f"⚠️ Error con JSON-LD: {e}")
-
-    # Método 2: Extraer desde la tabla HTML
-    try:
-        movie_links = soup.select("h3.ipc-title__text a[href*='/title/']")
-        if movie_links:
-            for link in movie_links[:50]:
-                href = link.get('href')
-                if href and '/title/' in href:
-                    if not href.startswith('http'):
-                        href = 'https://www.imdb.com' + href
-                    
-                    # Extraer título del texto del enlace
-                    title_text = link.get_text(strip=True)
-                    # Remover numeración si existe (ej: "1. The Shawshank Redemption")
-                    title = re.sub(r'^\d+\.\s*', '', title_text)
-                    
-                    movie = {
-                        "title": title,
-                        "year": "",
-                        "duration": "",
-                        "rating": "",
-                        "ratingCount": "",
-                        "url": href,
-                        "genre": "",
-                        "description": "",
-                        "image": "",
-                    }
-                    movies.append(movie)
-            print(f"✅ Encontradas {len(movies)} películas via HTML")
-            if movies:
-                return movies
-    except Exception as e:
-        print(f"⚠️ Error con HTML parsing: {e}")
-
-    # Método 3: Buscar enlaces en cualquier parte de la página
-    try:
-        all_links = soup.find_all("a", href=True)
-        for link in all_links:
-            href = link.get('href')
-            if href and '/title/tt' in href and '/chart/top' not in href:
-                if not href.startswith('http'):
-                    href = 'https://www.imdb.com' + href
-                
-                # Evitar duplicados
-                if not any(movie['url'] == href for movie in movies):
-                    title_text = link.get_text(strip=True)
-                    title = re.sub(r'^\d+\.\s*', '', title_text) if title_text else "Unknown"
-                    
-                    movie = {
-                        "title": title,
-                        "year": "",
-                        "duration": "",
-                        "rating": "",
-                        "ratingCount": "",
-                        "url": href,
-                        "genre": "",
-                        "description": "",
-                        "image": "",
-                    }
-                    movies.append(movie)
-                    if len(movies) >= 50:
-                        break
-        print(f"✅ Encontradas {len(movies)} películas via búsqueda general")
-        if movies:
-            return movies
-    except Exception as e:
-        print(f"⚠️ Error con búsqueda general: {e}")
-
-    print("❌ No se pudieron extraer links de películas")
-    return movies
+    return get_client().parse(IMDB_TOP_URL, response, parse_top_movies)
 ############################## Funcion obtener peliculas #########################################################
 
 ############################## Funcion obtener detalles de peliculas #########################################################
 def get_movie_details(movie_url):
-    """Extrae detalles adicionales de una película específica"""
+    """Extrae detalles adicionales de una película específica.
+
+    Es una petición suelta: el ritmo entre páginas lo lleva el crawler asíncrono
+    (rate_limit.AdaptiveRateLimiter), no una espera fija aquí.
+    """
     if not movie_url.startswith('http'):
-        movie_url = urljoin("https://www.imdb.com", movie_url)
+        movie_url = urljoin(IMDB_BASE_URL, movie_url)
     
     print(f"🎬 Obteniendo detalles de: {movie_url}")
     
     try:
-        time.sleep(1)  # Rate limiting
-        response = requests.get(movie_url, headers=HEADERS, proxies=PROXIES, timeout=15)
+        response = get_client().get(movie_url, timeout=15)
         
         if response.status_code != 200:
             print(f"❌ Error HTTP {response.status_code} para {movie_url}")
@@ -158,200 +58,88 @@ def get_movie_details(movie_url):
         print(f"❌ Error al acceder a {movie_url}: {e}")
         return {}
     
-    soup = BeautifulSoup(response.text, 'html.parser')
-    details = {}
-    
-    # Intentar extraer datos desde JSON-LD primero
-    try:
-        script_tag = soup.find("script", type="application/ld+json")
-        if script_tag and script_tag.string:
-            data = json.loads(script_tag.string)
-            
-            # Título
-            details['title'] = data.get("name", "")
-            
-            # Año
-            details['precise_year'] = data.get("datePublished", "")
-            
-            # Rating
-            details['rating'] = data.get("aggregateRating", {}).get("ratingValue", "")
-            
-            # Duración
-            duration_iso = data.get("duration", "")
-            if duration_iso:
-                match = re.match(r'PT(?:(\d+)H)?(?:(\d+)M)?', duration_iso)
-                if match:
-                    horas = int(match.group(1)) if match.group(1) else 0
-                    minutos = int(match.group(2)) if match.group(2) else 0
-                    details['detailed_duration'] = horas * 60 + minutos
-            
-            # Actores
-            actors = []
-            actor_data = data.get("actor", [])
-            if isinstance(actor_data, list):
-                for actor in actor_data[:3]:
-                    if isinstance(actor, dict) and 'name' in actor:
-                        actors.append(actor['name'])
-            details['actors'] = actors
-            
-            print(f"✅ Datos extraídos via JSON-LD: {details['title']}")
-            
-    except Exception as e:
-        print(f"⚠️ Error extrayendo JSON-LD: {e}")
-    
-    # Fallback: extraer datos desde HTML si JSON-LD no funcionó
-    if not details.get('title'):
-        try:
-            # Título
-            titulo_tag = soup.select_one("h1[data-testid='hero-title-block__title']")
-            if not titulo_tag:
-                titulo_tag = soup.select_one("h1.sc-afe43def-0")
-            details['title'] = titulo_tag.text.strip() if titulo_tag else ""
-            
-            # Año
-            año_tag = soup.select_one("span[data-testid='hero-title-block__metadata'] li")
-            if not año_tag:
-                año_tag = soup.select_one("ul.ipc-inline-list li")
-            details['precise_year'] = año_tag.text.strip() if año_tag else ""
-            
-            # Rating
-            rating_tag = soup.select_one("span[data-testid='hero-rating-bar__aggregate-rating__score'] span")
-            if not rating_tag:
-                rating_tag = soup.select_one("span.sc-7ab21ed2-1")
-            details['rating'] = rating_tag.text.strip() if rating_tag else ""
-            
-            # Duración
-            duracion_tag = soup.select_one("li[data-testid='title-techspec-runtime']")
-            if not duracion_tag:
-                duracion_tag = soup.find('time')
-            if duracion_tag:
-                duration_text = duracion_tag.text.strip()
-                match = re.search(r'(\d+)h\s*(\d+)m', duration_text)
-                if match:
-                    horas = int(match.group(1))
-                    minutos = int(match.group(2))
-                    details['detailed_duration'] = horas * 60 + minutos
-                else:
-                    match = re.search(r'(\d+)\s*min', duration_text)
-                    if match:
-                        details['detailed_duration'] = int(match.group(1))
-            
-            # Actores (primeros 3)
-            actors = []
-            actores_tags = soup.select("a[data-testid='title-cast-item__actor']")
-            if not actores_tags:
-                actores_tags = soup.select("div[data-testid='title-cast'] a[href*='/name/']")
-            for tag in actores_tags[:3]:
-                actor_name = tag.text.strip()
-                if actor_name:
-                    actors.append(actor_name)
-            details['actors'] = actors
-            
-            print(f"✅ Datos extraídos via HTML fallback: {details.get('title', 'Unknown')}")
-            
-        except Exception as e:
-            print(f"⚠️ Error extrayendo HTML: {e}")
-    
-    # Extraer metascore
-    metascore_elem = soup.find('span', class_='metacritic-score-box')
-    if not metascore_elem:
-        metascore_elem = soup.find('div', {'data-testid': 'metacritic-score-box'})
-    if not metascore_elem:
-        metascore_elem = soup.find('span', class_='score-meta')
-    
-    details['metascore'] = metascore_elem.get_text(strip=True) if metascore_elem else ""
-    
-    # Asegurar valores por defecto
-    details.setdefault('title', '')
-    details.setdefault('precise_year', '')
-    details.setdefault('rating', '')
-    details.setdefault('detailed_duration', '')
-    details.setdefault('actors', [])
-    details.setdefault('metascore', '')
-    
-    actors_count = len(details['actors'])
-    print(f"✅ Detalles finales: título={bool(details['title'])}, año={bool(details['precise_year'])}, rating={bool(details['rating'])}, duración={bool(details['detailed_duration'])}, actores={actors_count}, metascore={bool(details['metascore'])}")
-    return details
+    return get_client().parse(movie_url, response, parse_movie_details)
 ############################## Funcion obtener detalles de peliculas #########################################################
 
 ############################## FUNCION PRINCIPAL #########################################################
-if __name__ == "__main__":
-    movies = get_top_movies()
-    print(f"\n📦 Películas extraídas: {len(movies)}\n")
-    
-    # Procesar solo las primeras 50 películas para pruebas (puedes cambiar este número)
-    movies_to_process = movies[:50]
-    enhanced_movies = []
-    
-    for idx, movie in enumerate(movies_to_process, start=1):
-        print(f"\n--- Procesando película {idx}/{len(movies_to_process)} ---")
-        print(f"🎬 {movie['title']}")
-        
-        # Obtener detalles adicionales
-        details = get_movie_details(movie['url'])
-        
-        # Combinar datos básicos con detalles adicionales
-        enhanced_movie = {
-            'Título': details.get('title') or movie['title'],
-            'Año': details.get('precise_year') or movie['year'],
-            'Calificación': details.get('rating') or movie['rating'],
-            'Duración (min)': details.get('detailed_duration') or movie['duration'],
-            'Metascore': details.get('metascore', 'N/A'),
-            'Actores': details.get('actors', []),
-            'url': movie['url'],
-            'genre': movie['genre'],
-            'description': movie['description']
-        }
-        
-        enhanced_movies.append(enhanced_movie)
-        
-        # Mostrar resumen de la película procesada
-        actors_str = ', '.join(enhanced_movie['Actores']) if enhanced_movie['Actores'] else 'No disponible'
-        print(f"✅ {enhanced_movie['Título']} - Año: {enhanced_movie['Año']} - Duración: {enhanced_movie['Duración (min)']} min - Rating: {enhanced_movie['Calificación']} - Metascore: {enhanced_movie['Metascore']} - Actores: {actors_str}")
-    
-    print(f"\n🎉 Procesamiento completado. {len(enhanced_movies)} películas con detalles completos.")
-    
-    # Guardar resultados en archivo JSON (en directorio de salida)
-    json_path = '/app/output/movies_detailed.json'
+def fields_arg(value):
     try:
-        with open(json_path, 'w', encoding='utf-8') as f:
-            json.dump(enhanced_movies, f, ensure_ascii=False, indent=2)
-        print(f"💾 Resultados guardados en '{json_path}'")
-    except Exception as e:
-        print(f"❌ Error al guardar archivo JSON: {e}")
-    
-    # Guardar resultados en archivo CSV (en directorio de salida)
-    csv_path = '/app/output/movies_detailed.csv'
+        return parse_fields(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def formats_arg(value):
+    formats = [fmt.strip() for fmt in value.split(',') if fmt.strip()]
+    unknown = [fmt for fmt in formats if fmt not in SINK_FORMATS]
+    if unknown or not formats:
+        raise argparse.ArgumentTypeError(f"Formatos desconocidos: {', '.join(unknown)} (válidos: {', '.join(SINK_FORMATS)})")
+    return formats
+
+
+def charts_arg(value):
+    return [path if path.startswith('http') else urljoin(IMDB_BASE_URL, path) for path in value.split(',') if path.strip()]
+
+
+def sizes_arg(value):
     try:
-        with open(csv_path, 'w', newline='', encoding='utf-8') as csvfile:
-            if enhanced_movies:
-                fieldnames = ['Título', 'Año', 'Calificación', 'Duración (min)', 'Metascore', 'Actor 1', 'Actor 2', 'Actor 3']
-                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-                
-                writer.writeheader()
-                for movie in enhanced_movies:
-                    # Extraer solo el año de la fecha completa
-                    año_solo = movie['Año']
-                    if año_solo and '-' in str(año_solo):
-                        año_solo = str(año_solo).split('-')[0]
-                    
-                    # Preparar datos para CSV
-                    csv_row = {
-                        'Título': movie['Título'],
-                        'Año': año_solo,
-                        'Calificación': movie['Calificación'],
-                        'Duración (min)': movie['Duración (min)'],
-                        'Metascore': movie['Metascore'] if movie['Metascore'] else 'N/A',
-                        'Actor 1': movie['Actores'][0] if len(movie['Actores']) > 0 else '',
-                        'Actor 2': movie['Actores'][1] if len(movie['Actores']) > 1 else '',
-                        'Actor 3': movie['Actores'][2] if len(movie['Actores']) > 2 else ''
-                    }
-                    writer.writerow(csv_row)
-        print(f"💾 Resultados guardados en '{csv_path}'")
-    except Exception as e:
-        print(f"❌ Error al guardar archivo CSV: {e}")
-    
-    # Mostrar resumen final
+        return [int(size) for size in value.split(',') if size.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Tamaños no válidos: {value} (p. ej. 150,300)")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Scraper de las mejores películas de IMDb")
+    parser.add_argument("--limit", type=int, default=50, help="Número máximo de películas a procesar (el Top 250 completo: --limit 250)")
+    parser.add_argument("--concurrency", type=int, default=MAX_CONCURRENCY, help="Peticiones simultáneas como máximo")
+    parser.add_argument("--parse-workers", type=int, default=PARSE_WORKERS,
+                        help="Procesos que parsean el HTML en paralelo a las descargas (0 = en el proceso principal)")
+    parser.add_argument("--rate", type=float, default=RATE_LIMIT, help="Peticiones por segundo iniciales por host y circuito")
+    parser.add_argument("--max-rate", type=float, default=RATE_MAX, help="Techo del ritmo adaptativo (AIMD); igual a --rate para ritmo fijo")
+    parser.add_argument("--burst", type=int, default=RATE_BURST, help="Ráfaga máxima del token bucket por host")
+    parser.add_argument("--offline", action="store_true", help="Servir todo desde la caché en disco, sin tocar la red")
+    parser.add_argument("--no-cache", action="store_true", help="No usar la caché de respuestas en disco")
+    parser.add_argument("--stream", action="store_true", help="Cortar la descarga de cada página en cuanto trae los datos necesarios")
+    parser.add_argument("--fields", type=fields_arg, default=None,
+                        help=f"Campos de salida necesarios, separados por comas (por defecto todos: {','.join(OUTPUT_FIELDS)})")
+    parser.add_argument("--chart-only", action="store_true", help="Solo datos del chart, sin páginas de detalle (p. ej. refrescar ratings)")
+    parser.add_argument("--fresh", action="store_true", help="Ignorar el diario de una ejecución interrumpida y empezar de cero")
+    parser.add_argument("--charts", type=charts_arg, default=IMDB_CHART_URLS,
+                        help="Charts que alimentan el crawl, separados por comas (p. ej. /chart/top/,/chart/moviemeter/)")
+    parser.add_argument("--follow-depth", type=int, default=FOLLOW_DEPTH,
+                        help="Saltos de enlaces entre títulos a seguir desde cada página de detalle (0 = solo charts)")
+    parser.add_argument("--dumps", default=IMDB_DUMPS_DIR,
+                        help="Directorio con los dumps TSV de IMDb (title.basics, title.ratings, title.principals, name.basics)")
+    parser.add_argument("--dumps-all", action="store_true",
+                        help="Importar todos los títulos de los dumps (DUMP_TITLE_TYPES) en lugar de los de los charts")
+    parser.add_argument("--cast", action="store_true", default=CAST_ENRICH,
+                        help="Añadir el reparto completo (/fullcredits) con la ficha de cada persona (/name/nm...)")
+    parser.add_argument("--budget", type=float, default=RUN_BUDGET,
+                        help="Segundos como máximo para todo el crawl (0 = sin límite); lo que falte queda en el diario")
+    parser.add_argument("--no-hedge", dest="hedge", action="store_false", default=HEDGE_ENABLED,
+                        help="No duplicar por otro circuito las peticiones más lentas de lo habitual")
+    parser.add_argument("--posters", action="store_true", default=POSTERS_ENABLED,
+                        help="Descargar los pósters del chart a POSTERS_DIR (por hash de contenido, sin repetidos)")
+    parser.add_argument("--thumbnails", type=sizes_arg, default=POSTER_THUMB_SIZES,
+                        help="Lados en px de las miniaturas de cada póster separados por comas (p. ej. 150,300; requiere Pillow)")
+    parser.add_argument("--formats", type=formats_arg, default=OUTPUT_FORMATS,
+                        help=f"Formatos de salida separados por comas ({','.join(SINK_FORMATS)}; parquet requiere pyarrow)")
+    parser.add_argument("--role", choices=["standalone", "coordinator", "worker"], default=SCRAPER_ROLE,
+                        help="standalone: todo en este proceso; coordinator: encola y exporta; worker: procesa la cola compartida")
+    parser.add_argument("--metrics-port", type=int, default=METRICS_PORT, help="Publicar métricas Prometheus en este puerto (0 = no)")
+    return parser.parse_args(argv)
+
+
+def export_results(enhanced_movies, output_dir=OUTPUT_DIR, formats=OUTPUT_FORMATS):
+    """Exporta una lista de registros ya completa a los formatos pedidos. Devuelve True si todo se guardó"""
+    sink = open_sinks(formats, output_dir)
+    with metrics.timer("imdb_stage_seconds", stage="write_sink"):
+        for movie in enhanced_movies:
+            sink.write(movie)
+        return sink.close()
+
+
+def print_summary(enhanced_movies):
     print(f"\n📊 Resumen final:")
     for idx, movie in enumerate(enhanced_movies, start=1):
         actors_display = ', '.join(movie['Actores'][:3]) if movie['Actores'] else 'No disponible'
@@ -359,6 +147,126 @@ if __name__ == "__main__":
         print(f"{idx}. {movie['Título']} ({movie['Año']}) - {movie['Duración (min)']} min - IMDb: {movie['Calificación']} - Metascore: {metascore_display}")
         print(f"   Actores: {actors_display}")
         print()
+
+
+def print_stage_summary():
+    """Tiempo medio y total de cada etapa instrumentada"""
+    stages = metrics.summary()
+    if not stages:
+        return
+    print("⏱️ Etapas:")
+    for stage, (count, total) in sorted(stages.items(), key=lambda item: -item[1][1]):
+        print(f"   {stage}: {count} × {total / count * 1000:.1f} ms = {total:.2f} s")
+
+
+def print_selector_report(registries=(TITLE_RULES, CREDITS_RULES, PERSON_RULES)):
+    """Aciertos de cada selector del fallback HTML: los que nunca coinciden se pueden quitar"""
+    for rules in registries:
+        rates = selector_hit_rates(rules.page)
+        if not rates:
+            continue
+        print(f"🧩 Selectores de '{rules.page}' ({max(pages for _, _, pages in rates.values())} páginas):")
+        for field, text, _, _ in rules.selectors:
+            hits, matched, pages = rates.get((rules.page, field, text), (0, 0, 0))
+            if pages:
+                note = "  ⚠️ nunca coincide" if not matched else ""
+                print(f"   {field}: {text} → {hits / pages:.0%} da el valor, {matched / pages:.0%} coincide{note}")
+
+
+def write_metrics(path=METRICS_TEXTFILE):
+    """Deja las métricas en un fichero para el textfile collector de node_exporter"""
+    if not path:
+        return
+    try:
+        metrics.write_textfile(path)
+        print(f"📈 Métricas guardadas en '{path}'")
+    except Exception as e:
+        print(f"⚠️ No se pudieron guardar las métricas: {e}")
+
+
+def run_worker_role(args):
+    """Worker: vacía la cola compartida; la exportación la hace el coordinador"""
+    queue = WorkQueue(QUEUE_PATH)
+    try:
+        return asyncio.run(
+            run_worker(queue, concurrency=args.concurrency, rate=args.rate, burst=args.burst, max_rate=args.max_rate,
+                       use_cache=not args.no_cache, stream=args.stream, parse_workers=args.parse_workers, cast=args.cast,
+                       hedge=args.hedge, budget=args.budget)
+        )
+    finally:
+        queue.close()
+        print_stage_summary()
+        print_selector_report()
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    print(f"🧱 Parser HTML: {get_backend().name}")
+    if args.metrics_port:
+        metrics.serve(args.metrics_port)
+    # Que el SocksPort acepte conexiones no significa que Tor pueda crear circuitos todavía
+    if PROXIES and TOR_CONTROL_ADDRESS and TOR_BOOTSTRAP_TIMEOUT and not args.offline:
+        wait_for_bootstrap()
+    if args.role == "worker":
+        return run_worker_role(args)
+
+    # Si la ejecución anterior murió a medias, el diario permite continuar donde se quedó
+    journal = CrawlJournal()
+    if args.fresh:
+        journal.clear()
+
+    # Cada película se escribe en JSON/CSV/NDJSON en cuanto termina: la memoria no crece con el crawl
+    sink = open_sinks(args.formats, OUTPUT_DIR)
+    client = None
+    try:
+        if args.role == "coordinator":
+            # Los detalles los descargan los workers; la cola hace de diario
+            queue = WorkQueue(QUEUE_PATH)
+            try:
+                written = asyncio.run(
+                    run_coordinator(queue, sink, limit=args.limit, rate=args.rate, burst=args.burst, max_rate=args.max_rate,
+                                    use_cache=not args.no_cache, fields=args.fields, chart_only=args.chart_only,
+                                    charts=args.charts, follow_depth=args.follow_depth, dumps_dir=args.dumps,
+                                    dumps_all=args.dumps_all, fresh=args.fresh)
+                )
+            finally:
+                queue.close()
+        else:
+            # Cliente propio: su FetchPolicy dice al final si el presupuesto dejó títulos sin pedir
+            client = build_client(args.concurrency, not args.no_cache, args.offline, args.hedge, args.budget)
+            # Los detalles se descargan en paralelo; el ritmo lo marca el rate limiter por host
+            movies, written = asyncio.run(
+                run_crawl(limit=args.limit, concurrency=args.concurrency, rate=args.rate, burst=args.burst, max_rate=args.max_rate,
+                          use_cache=not args.no_cache, offline=args.offline, journal=journal,
+                          stream=args.stream, fields=args.fields, chart_only=args.chart_only, client=client, sink=sink,
+                          charts=args.charts, follow_depth=args.follow_depth, parse_workers=args.parse_workers,
+                          dumps_dir=args.dumps, dumps_all=args.dumps_all, cast=args.cast, hedge=args.hedge,
+                          budget=args.budget, posters=args.posters, thumb_sizes=args.thumbnails)
+            )
+    finally:
+        exported = sink.close()
+    
+    print(f"\n🎉 Procesamiento completado. {written} películas con detalles completos.")
+    
+    # Con todo exportado el diario ya no hace falta: la próxima ejecución empieza de cero.
+    # Si el presupuesto dejó títulos sin pedir se conserva para continuar (no basta con que
+    # el tiempo se haya pasado: exportar puede llevarlo más allá con el crawl ya completo)
+    if client is not None and client.policy is not None and client.policy.cut_short():
+        print(f"⌛ Presupuesto de {args.budget:.0f} s agotado: el diario se conserva, la próxima ejecución continúa")
+    elif exported:
+        journal.clear()
+    
+    # Mostrar resumen final (releyendo el NDJSON, sin tener todos los registros en memoria)
+    if 'ndjson' in args.formats:
+        print_summary(read_ndjson(os.path.join(OUTPUT_DIR, SINK_CLASSES['ndjson'][1])))
+    print_stage_summary()
+    print_selector_report()
+    write_metrics()
+    return written
+
+
+if __name__ == "__main__":
+    main()
 ############################## FUNCION PRINCIPAL #########################################################
 
 
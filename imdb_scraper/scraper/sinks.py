@@ -0,0 +1,278 @@
+import csv
+import json
+import os
+
+from config import SINK_BATCH_SIZE, SQLITE_PATH
+from storage import SqliteStore
+
+CSV_FIELDNAMES = ['Título', 'Año', 'Calificación', 'Duración (min)', 'Metascore', 'Actor 1', 'Actor 2', 'Actor 3']
+SINK_FORMATS = ('json', 'ndjson', 'csv', 'sqlite', 'parquet')
+# Claves que el registro lleva para uso interno (diario, cola, SQLite) y no salen en JSON/NDJSON
+INTERNAL_KEYS = ('actor_ids',)
+
+
+def public_record(movie):
+    """Registro combinado sin las claves internas"""
+    return {key: value for key, value in movie.items() if key not in INTERNAL_KEYS}
+
+
+def csv_row(movie):
+    """Registro combinado -> fila del CSV (año sin mes/día, metascore N/A, 3 actores)"""
+    # Extraer solo el año de la fecha completa
+    año_solo = movie['Año']
+    if año_solo and '-' in str(año_solo):
+        año_solo = str(año_solo).split('-')[0]
+
+    return {
+        'Título': movie['Título'],
+        'Año': año_solo,
+        'Calificación': movie['Calificación'],
+        'Duración (min)': movie['Duración (min)'],
+        'Metascore': movie['Metascore'] if movie['Metascore'] else 'N/A',
+        'Actor 1': movie['Actores'][0] if len(movie['Actores']) > 0 else '',
+        'Actor 2': movie['Actores'][1] if len(movie['Actores']) > 1 else '',
+        'Actor 3': movie['Actores'][2] if len(movie['Actores']) > 2 else ''
+    }
+
+
+class RecordSink:
+    """Destino de registros que escribe cada película en cuanto termina.
+
+    Los registros se acumulan en un lote de `batch_size` y se vuelcan al fichero de una
+    vez, así la memoria no crece con el tamaño del crawl. Un error de escritura se avisa
+    una sola vez y el sink deja de escribir; `close()` devuelve si todo se guardó.
+    """
+
+    label = "registros"
+
+    def __init__(self, path, batch_size=SINK_BATCH_SIZE):
+        self.path = path
+        self.batch_size = batch_size
+        self.batch = []
+        self.written = 0
+        self.failed = False
+        self.closed = False
+
+    def write(self, record):
+        if self.failed:
+            return
+        self.batch.append(record)
+        if len(self.batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self.failed or not self.batch:
+            return
+        try:
+            self._write_batch(self.batch)
+            self.written += len(self.batch)
+        except Exception as e:
+            print(f"❌ Error al guardar archivo {self.label}: {e}")
+            self.failed = True
+        self.batch = []
+
+    def close(self):
+        if self.closed:
+            return not self.failed
+        self.flush()
+        try:
+            self._finish()
+        except Exception as e:
+            print(f"❌ Error al guardar archivo {self.label}: {e}")
+            self.failed = True
+        self.closed = True
+        if not self.failed:
+            print(f"💾 Resultados guardados en '{self.path}' ({self.written} registros)")
+        return not self.failed
+
+    def _write_batch(self, batch):
+        raise NotImplementedError
+
+    def _finish(self):
+        pass
+
+
+class NdjsonSink(RecordSink):
+    """Una línea JSON por película: siempre legible aunque la ejecución se corte a mitad"""
+
+    label = "NDJSON"
+
+    def __init__(self, path, batch_size=SINK_BATCH_SIZE):
+        super().__init__(path, batch_size)
+        self.file = open(path, 'w', encoding='utf-8')
+
+    def _write_batch(self, batch):
+        self.file.write("".join(json.dumps(public_record(record), ensure_ascii=False) + "\n" for record in batch))
+        self.file.flush()
+
+    def _finish(self):
+        self.file.close()
+
+
+class JsonArraySink(RecordSink):
+    """El mismo `movies_detailed.json` de siempre (lista indentada), escrito por trozos"""
+
+    label = "JSON"
+
+    def __init__(self, path, batch_size=SINK_BATCH_SIZE):
+        super().__init__(path, batch_size)
+        self.file = open(path, 'w', encoding='utf-8')
+        self.file.write("[")
+
+    def _write_batch(self, batch):
+        chunks = []
+        for index, record in enumerate(batch, start=self.written):
+            body = json.dumps(public_record(record), ensure_ascii=False, indent=2).replace("\n", "\n  ")
+            chunks.append(("," if index else "") + "\n  " + body)
+        self.file.write("".join(chunks))
+        self.file.flush()
+
+    def _finish(self):
+        self.file.write("\n]" if self.written else "]")
+        self.file.close()
+
+
+class CsvSink(RecordSink):
+    label = "CSV"
+
+    def __init__(self, path, batch_size=SINK_BATCH_SIZE):
+        super().__init__(path, batch_size)
+        self.file = open(path, 'w', newline='', encoding='utf-8')
+        self.writer = csv.DictWriter(self.file, fieldnames=CSV_FIELDNAMES)
+        self.writer.writeheader()
+
+    def _write_batch(self, batch):
+        self.writer.writerows(csv_row(movie) for movie in batch)
+        self.file.flush()
+
+    def _finish(self):
+        self.file.close()
+
+
+class ParquetSink(RecordSink):
+    """Formato columnar para análisis: cada lote es un row group (requiere pyarrow)"""
+
+    label = "Parquet"
+
+    def __init__(self, path, batch_size=SINK_BATCH_SIZE):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        super().__init__(path, batch_size)
+        self.pa = pa
+        self.schema = pa.schema([
+            ('titulo', pa.string()),
+            ('año', pa.string()),
+            ('calificacion', pa.float64()),
+            ('duracion_min', pa.int64()),
+            ('metascore', pa.string()),
+            ('actores', pa.list_(pa.string())),
+            ('url', pa.string()),
+            ('genero', pa.string()),
+            ('descripcion', pa.string()),
+        ])
+        self.writer = pq.ParquetWriter(path, self.schema)
+
+    @staticmethod
+    def _number(value, kind):
+        try:
+            return kind(value)
+        except (TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def _text(value):
+        if value in (None, ''):
+            return None
+        if isinstance(value, list):
+            return ', '.join(str(item) for item in value)
+        return str(value)
+
+    def _write_batch(self, batch):
+        rows = [{
+            'titulo': self._text(movie.get('Título')),
+            'año': self._text(movie.get('Año')),
+            'calificacion': self._number(movie.get('Calificación'), float),
+            'duracion_min': self._number(movie.get('Duración (min)'), int),
+            'metascore': self._text(movie.get('Metascore')),
+            'actores': [str(actor) for actor in movie.get('Actores') or []],
+            'url': self._text(movie.get('url')),
+            'genero': self._text(movie.get('genre')),
+            'descripcion': self._text(movie.get('description')),
+        } for movie in batch]
+        self.writer.write_table(self.pa.Table.from_pylist(rows, schema=self.schema))
+
+    def _finish(self):
+        self.writer.close()
+
+
+class SqliteSink(RecordSink):
+    """Upsert de cada lote en la base SQLite (una transacción por lote)"""
+
+    label = "SQLite"
+
+    def __init__(self, path, batch_size=SINK_BATCH_SIZE):
+        super().__init__(path, batch_size)
+        self.store = SqliteStore(path)
+
+    def _write_batch(self, batch):
+        self.store.upsert_movies(batch)
+
+    def _finish(self):
+        counts = self.store.counts()
+        self.store.close()
+        print(f"🗃️ Base de datos: {counts['movies']} películas, {counts['people']} personas, {counts['movie_cast']} filas de reparto")
+
+
+class MultiSink:
+    """Reparte cada registro entre varios sinks (JSON + CSV + NDJSON...)"""
+
+    def __init__(self, sinks):
+        self.sinks = sinks
+
+    @property
+    def written(self):
+        return max((sink.written + len(sink.batch) for sink in self.sinks), default=0)
+
+    def write(self, record):
+        for sink in self.sinks:
+            sink.write(record)
+
+    def flush(self):
+        for sink in self.sinks:
+            sink.flush()
+
+    def close(self):
+        results = [sink.close() for sink in self.sinks]
+        return all(results)
+
+
+SINK_CLASSES = {
+    'json': (JsonArraySink, 'movies_detailed.json'),
+    'ndjson': (NdjsonSink, 'movies_detailed.ndjson'),
+    'csv': (CsvSink, 'movies_detailed.csv'),
+    'sqlite': (SqliteSink, os.path.basename(SQLITE_PATH)),
+    'parquet': (ParquetSink, 'movies_detailed.parquet'),
+}
+
+
+def open_sinks(formats, output_dir, batch_size=SINK_BATCH_SIZE):
+    """Abre un sink por formato pedido en el directorio de salida"""
+    os.makedirs(output_dir, exist_ok=True)
+    sinks = []
+    for name in formats:
+        sink_class, filename = SINK_CLASSES[name]
+        path = os.path.join(output_dir, filename)
+        try:
+            sinks.append(sink_class(path, batch_size))
+        except ImportError:
+            print(f"⚠️ Salida {name} omitida: instala pyarrow para usarla")
+    return MultiSink(sinks)
+
+
+def read_ndjson(path):
+    """Recorre un fichero NDJSON registro a registro sin cargarlo entero"""
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
@@ -0,0 +1,180 @@
+import re
+import sqlite3
+import time
+
+from config import SQLITE_PATH
+from extractors import title_id
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS movies (
+    tt_id TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    year INTEGER,
+    release_date TEXT,
+    rating REAL,
+    duration_min INTEGER,
+    metascore INTEGER,
+    url TEXT,
+    genre TEXT,
+    description TEXT,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS people (
+    nm_id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    birth_year INTEGER,
+    known_for TEXT,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS movie_cast (
+    tt_id TEXT NOT NULL REFERENCES movies(tt_id) ON DELETE CASCADE,
+    nm_id TEXT NOT NULL REFERENCES people(nm_id),
+    role TEXT NOT NULL DEFAULT 'actor',
+    position INTEGER NOT NULL,
+    PRIMARY KEY (tt_id, role, nm_id)
+);
+CREATE INDEX IF NOT EXISTS idx_movies_year ON movies(year);
+CREATE INDEX IF NOT EXISTS idx_movies_rating ON movies(rating);
+CREATE INDEX IF NOT EXISTS idx_movie_cast_person ON movie_cast(nm_id);
+CREATE INDEX IF NOT EXISTS idx_people_name ON people(name);
+"""
+
+# Fecha exacta, duración, metascore, género y descripción pueden faltar en un refresco solo del
+# chart (--chart-only) o si falló la página de detalle: un valor vacío no borra el que ya había
+UPSERT_MOVIE = """
+INSERT INTO movies (tt_id, title, year, release_date, rating, duration_min, metascore, url, genre, description, updated_at)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(tt_id) DO UPDATE SET
+    title = excluded.title,
+    year = excluded.year,
+    release_date = COALESCE(excluded.release_date, movies.release_date),
+    rating = excluded.rating,
+    duration_min = COALESCE(excluded.duration_min, movies.duration_min),
+    metascore = COALESCE(excluded.metascore, movies.metascore),
+    url = excluded.url,
+    genre = COALESCE(excluded.genre, movies.genre),
+    description = COALESCE(excluded.description, movies.description),
+    updated_at = excluded.updated_at
+"""
+
+# Los datos de ficha (nacimiento, conocido por) solo llegan con --cast: un crawl sin él no los borra
+UPSERT_PERSON = """
+INSERT INTO people (nm_id, name, birth_year, known_for, updated_at) VALUES (?, ?, ?, ?, ?)
+ON CONFLICT(nm_id) DO UPDATE SET
+    name = excluded.name,
+    birth_year = COALESCE(excluded.birth_year, people.birth_year),
+    known_for = COALESCE(excluded.known_for, people.known_for),
+    updated_at = excluded.updated_at
+"""
+
+# Columnas añadidas después de la primera versión del esquema: se crean en bases existentes
+MIGRATIONS = {"people": [("birth_year", "INTEGER"), ("known_for", "TEXT")]}
+
+YEAR_RE = re.compile(r"\d{4}")
+DATE_RE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+
+def _number(value, kind):
+    try:
+        return kind(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _text(value):
+    if value in (None, '', 'N/A'):
+        return None
+    if isinstance(value, list):
+        return ', '.join(str(item) for item in value)
+    return str(value)
+
+
+def movie_row(movie, now):
+    """Registro combinado (de build_enhanced_movie) -> fila de la tabla movies"""
+    year_text = str(movie.get('Año') or '')
+    year = YEAR_RE.search(year_text)
+    return (
+        title_id(movie.get('url')),
+        movie.get('Título') or '',
+        int(year.group(0)) if year else None,
+        year_text if DATE_RE.match(year_text) else None,
+        _number(movie.get('Calificación'), float),
+        _number(movie.get('Duración (min)'), int),
+        _number(movie.get('Metascore'), int),
+        movie.get('url'),
+        _text(movie.get('genre')),
+        _text(movie.get('description')),
+        now,
+    )
+
+
+class SqliteStore:
+    """Películas, personas y reparto en SQLite, con claves `tt`/`nm` de IMDb.
+
+    La base va en modo WAL (los lectores no bloquean al crawler) y cada lote se guarda
+    con `executemany` dentro de una sola transacción. Las filas se actualizan en el sitio
+    (upsert), así un crawl repetido refresca ratings y reparto sin duplicar nada.
+    """
+
+    def __init__(self, path=SQLITE_PATH):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self.conn.executescript(SCHEMA)
+        self._migrate()
+
+    def _migrate(self):
+        for table, columns in MIGRATIONS.items():
+            present = {row[1] for row in self.conn.execute(f"PRAGMA table_info({table})")}
+            for column, kind in columns:
+                if column not in present:
+                    self.conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {kind}")
+
+    def upsert_movies(self, movies):
+        """Inserta o actualiza un lote de registros combinados con su reparto. Devuelve cuántos guardó"""
+        now = time.time()
+        movie_rows = []
+        people_rows = {}
+        cast_rows = []
+        # Películas cuyo registro trae reparto: solo a esas se les sustituye en la base
+        recast = []
+        for movie in movies:
+            row = movie_row(movie, now)
+            tt_id = row[0]
+            if tt_id is None:
+                continue
+            movie_rows.append(row)
+            # Con --cast el reparto completo (con fichas) sustituye a los actores principales
+            # El fallback HTML deja `actor_ids` a [None, ...]: sin ningún id no hay con qué sustituir
+            if movie.get('cast') or any(movie.get('actor_ids') or ()):
+                recast.append((tt_id,))
+            if movie.get('cast'):
+                for member in movie['cast']:
+                    known_for = ', '.join(title['tt_id'] for title in member.get('known_for') or []) or None
+                    people_rows[member['nm_id']] = (member['nm_id'], member['name'], member.get('birth_year'),
+                                                    known_for, now)
+                    cast_rows.append((tt_id, member['nm_id'], 'actor', member['position']))
+                continue
+            # Registros antiguos (diario o caché previos) pueden no traer los ids `nm`
+            for position, (name, nm_id) in enumerate(zip(movie.get('Actores') or [], movie.get('actor_ids') or [])):
+                if nm_id:
+                    people_rows.setdefault(nm_id, (nm_id, name, None, None, now))
+                    cast_rows.append((tt_id, nm_id, 'actor', position))
+
+        with self.conn:
+            self.conn.executemany(UPSERT_MOVIE, movie_rows)
+            self.conn.executemany(UPSERT_PERSON, list(people_rows.values()))
+            # El reparto de cada película se sustituye entero: refleja altas, bajas y cambios de orden
+            self.conn.executemany("DELETE FROM movie_cast WHERE tt_id = ? AND role = 'actor'", recast)
+            self.conn.executemany("INSERT OR REPLACE INTO movie_cast (tt_id, nm_id, role, position) VALUES (?, ?, ?, ?)",
+                                  cast_rows)
+        return len(movie_rows)
+
+    def counts(self):
+        return {table: self.conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                for table in ("movies", "people", "movie_cast")}
+
+    def close(self):
+        self.conn.close()
@@ -1,10 +1,18 @@
 #!/bin/sh
+# Uso: wait-for-tor.sh HOST PUERTO -- COMANDO...
 
-echo "Esperando a que el proxy Tor esté disponible en $1:$2..."
+host="$1"
+port="$2"
+shift 2
+if [ "$1" = "--" ]; then
+  shift
+fi
 
-while ! nc -z "$1" "$2"; do
-  sleep 1
+echo "Esperando a que el proxy Tor esté disponible en $host:$port..."
+
+while ! nc -z "$host" "$port"; do
+  sleep 0.2
 done
 
-echo "Tor está disponible. Ejecutando scraper..."
+echo "Tor acepta conexiones. Ejecutando scraper (espera al bootstrap por el ControlPort)..."
 exec "$@"
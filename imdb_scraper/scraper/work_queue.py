@@ -0,0 +1,206 @@
+import json
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from config import QUEUE_PATH, QUEUE_MAX_ATTEMPTS
+from extractors import build_enhanced_movie
+from metrics import metrics
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS work_items (
+    tt_id TEXT PRIMARY KEY,
+    seq INTEGER NOT NULL,
+    depth INTEGER NOT NULL DEFAULT 0,
+    movie TEXT NOT NULL,
+    needs_detail INTEGER NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    worker TEXT,
+    lease_until REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_work_items_ready ON work_items(status, depth, seq);
+CREATE TABLE IF NOT EXISTS queue_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+class WorkQueue:
+    """Cola de trabajo compartida entre un coordinador y N workers, en un fichero SQLite.
+
+    El coordinador encola ids `tt` (con su registro del chart) y la sella. Cada worker
+    toma elementos con un lease de `lease_seconds`: si el worker muere, el lease caduca
+    y el elemento vuelve a la cola para otro. Un resultado solo se acepta del worker que
+    tiene el lease vigente. Tras `max_attempts` intentos el elemento queda como fallido
+    con los datos del chart.
+
+    Todas las operaciones que cambian estados van en transacciones `BEGIN IMMEDIATE`, así
+    dos workers nunca se llevan el mismo elemento. Basta un volumen compartido entre los
+    contenedores (no hace falta un broker); la base va en modo WAL.
+
+    Las esperas por el lock de SQLite pueden durar hasta 30 s: desde código asíncrono los
+    métodos se llaman en su propio hilo (distributed.run_queue), nunca en el bucle de eventos.
+    La conexión se comparte entre esos hilos bajo `_lock`.
+    """
+
+    def __init__(self, path=QUEUE_PATH, max_attempts=QUEUE_MAX_ATTEMPTS):
+        self.path = path
+        self.max_attempts = max_attempts
+        self._lock = threading.RLock()
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _transaction(self):
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self.conn
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+
+    def get_meta(self, key, default=None):
+        with self._lock:
+            row = self.conn.execute("SELECT value FROM queue_meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set_meta(self, key, value):
+        with self._lock:
+            self.conn.execute("INSERT OR REPLACE INTO queue_meta (key, value) VALUES (?, ?)", (key, json.dumps(value)))
+
+    def reset(self, limit=None, follow_depth=0):
+        """Vacía la cola para un crawl nuevo, con su tope de títulos y profundidad de enlaces"""
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM work_items")
+            conn.execute("DELETE FROM queue_meta")
+            self.set_meta("limit", limit)
+            self.set_meta("follow_depth", follow_depth)
+            self.set_meta("sealed", False)
+
+    def seal(self):
+        """El coordinador ya encoló todo: cuando la cola se vacíe, los workers terminan"""
+        self.set_meta("sealed", True)
+
+    def enqueue(self, items):
+        """Encola (tt_id, depth, movie, needs_detail) sin duplicar ids ni pasar del tope. Devuelve cuántos entraron"""
+        now = time.time()
+        with self._transaction() as conn:
+            limit = self.get_meta("limit")
+            total, last_seq = conn.execute("SELECT COUNT(*), COALESCE(MAX(seq), 0) FROM work_items").fetchone()
+            added = 0
+            for tt_id, depth, movie, needs_detail in items:
+                if limit is not None and total >= limit:
+                    break
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO work_items (tt_id, seq, depth, movie, needs_detail, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    (tt_id, last_seq + added + 1, depth, json.dumps(movie, ensure_ascii=False), int(needs_detail), now))
+                added += cursor.rowcount
+                total += cursor.rowcount
+        metrics.inc("imdb_queue_total", added, event="enqueued")
+        return added
+
+    def _expire(self, conn, now):
+        """Devuelve a la cola (o da por fallidos) los leases caducados"""
+        expired = conn.execute(
+            "UPDATE work_items SET status = 'queued', worker = NULL, lease_until = NULL, updated_at = ? "
+            "WHERE status = 'leased' AND lease_until < ? AND attempts < ?", (now, now, self.max_attempts)).rowcount
+        exhausted = conn.execute(
+            "SELECT tt_id, movie FROM work_items WHERE status = 'leased' AND lease_until < ?", (now,)).fetchall()
+        for tt_id, movie in exhausted:
+            # Mismo registro que deja fail(): los datos del chart ya combinados, no el dict crudo
+            self._give_up(conn, tt_id, build_enhanced_movie(json.loads(movie), {}), "lease caducado", now)
+        if expired:
+            metrics.inc("imdb_queue_total", expired, event="expired")
+            print(f"⏰ {expired} leases caducados vuelven a la cola")
+        return expired
+
+    def requeue_expired(self):
+        with self._transaction() as conn:
+            return self._expire(conn, time.time())
+
+    def lease(self, worker, n=1, lease_seconds=120):
+        """Toma hasta `n` elementos en orden (nivel, llegada). Devuelve [(tt_id, depth, movie, needs_detail)]"""
+        now = time.time()
+        with self._transaction() as conn:
+            self._expire(conn, now)
+            rows = conn.execute(
+                "SELECT tt_id, depth, movie, needs_detail FROM work_items WHERE status = 'queued' "
+                "ORDER BY depth, seq LIMIT ?", (n,)).fetchall()
+            conn.executemany(
+                "UPDATE work_items SET status = 'leased', worker = ?, lease_until = ?, attempts = attempts + 1, "
+                "updated_at = ? WHERE tt_id = ?", [(worker, now + lease_seconds, now, row[0]) for row in rows])
+        metrics.inc("imdb_queue_total", len(rows), event="leased")
+        return [(tt_id, depth, json.loads(movie), bool(needs_detail)) for tt_id, depth, movie, needs_detail in rows]
+
+    def complete(self, tt_id, worker, record):
+        """Guarda el resultado si el lease sigue siendo de este worker. Devuelve False si lo perdió"""
+        with self._transaction() as conn:
+            updated = conn.execute(
+                "UPDATE work_items SET status = 'done', result = ?, worker = NULL, lease_until = NULL, error = NULL, "
+                "updated_at = ? WHERE tt_id = ? AND worker = ? AND status = 'leased'",
+                (json.dumps(record, ensure_ascii=False), time.time(), tt_id, worker)).rowcount
+        metrics.inc("imdb_queue_total", event="completed" if updated else "lost")
+        return bool(updated)
+
+    def fail(self, tt_id, worker, error, fallback):
+        """Devuelve el elemento a la cola o, agotados los intentos, lo cierra con `fallback` (datos del chart)"""
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute("SELECT attempts FROM work_items WHERE tt_id = ? AND worker = ? AND status = 'leased'",
+                               (tt_id, worker)).fetchone()
+            if row is None:
+                return
+            if row[0] >= self.max_attempts:
+                self._give_up(conn, tt_id, fallback, error, now)
+            else:
+                conn.execute("UPDATE work_items SET status = 'queued', worker = NULL, lease_until = NULL, error = ?, "
+                             "updated_at = ? WHERE tt_id = ?", (error, now, tt_id))
+
+    def release(self, tt_id, worker):
+        """Devuelve el elemento a la cola sin gastar un intento (el worker no llegó a pedirlo)"""
+        with self._transaction() as conn:
+            conn.execute("UPDATE work_items SET status = 'queued', worker = NULL, lease_until = NULL, "
+                         "attempts = attempts - 1, updated_at = ? WHERE tt_id = ? AND worker = ? AND status = 'leased'",
+                         (time.time(), tt_id, worker))
+        metrics.inc("imdb_queue_total", event="released")
+
+    def _give_up(self, conn, tt_id, fallback, error, now):
+        conn.execute("UPDATE work_items SET status = 'failed', result = ?, worker = NULL, lease_until = NULL, error = ?, "
+                     "updated_at = ? WHERE tt_id = ?", (json.dumps(fallback, ensure_ascii=False), error, now, tt_id))
+        metrics.inc("imdb_queue_total", event="failed")
+
+    def stats(self):
+        counts = {"queued": 0, "leased": 0, "done": 0, "failed": 0}
+        with self._lock:
+            rows = self.conn.execute("SELECT status, COUNT(*) FROM work_items GROUP BY status").fetchall()
+        for status, count in rows:
+            counts[status] = count
+        return counts
+
+    def finished(self):
+        """Sellada y sin nada pendiente ni en curso"""
+        stats = self.stats()
+        return self.get_meta("sealed", False) and not stats["queued"] and not stats["leased"]
+
+    def results(self):
+        """Registros terminados (y fallidos, con los datos del chart) en orden de la cola"""
+        cursor = self.conn.execute(
+            "SELECT result FROM work_items WHERE status IN ('done', 'failed') AND result IS NOT NULL ORDER BY depth, seq")
+        for (result,) in cursor:
+            record = json.loads(result)
+            # Colas de versiones anteriores guardaban el dict del chart tal cual al caducar el último lease
+            yield record if 'Título' in record else build_enhanced_movie(record, {})
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
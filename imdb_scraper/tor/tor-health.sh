@@ -0,0 +1,5 @@
+#!/bin/sh
+# Healthcheck del contenedor: sano cuando Tor terminó el bootstrap (PROGRESS=100), no cuando el
+# SocksPort empieza a aceptar conexiones (eso ocurre mucho antes de poder crear circuitos)
+printf 'AUTHENTICATE "%s"\r\nGETINFO status/bootstrap-phase\r\nQUIT\r\n' "$TOR_CONTROL_PASSWORD" \
+  | nc -w 5 127.0.0.1 9051 | grep -q "PROGRESS=100"
@@ -1,11 +1,20 @@
 import requests
-from bs4 import BeautifulSoup
 import json
 import re
 import time
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 import random
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "imdb_scraper", "scraper"))
+
+from extractors import fill_details_from_html  # noqa: E402
+from html_backends import get_backend  # noqa: E402
+
+# Parser HTML: el más rápido instalado (selectolax, lxml) o html.parser (ver HTML_BACKEND)
+backend = get_backend()
 
 USER_AGENTS = [
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
@@ -43,9 +52,9 @@ def get_session():
     session.headers.update(get_random_headers())
     return session
 
-def extraer_links_top_250():
+def extraer_links_top_250(session=None):
     url = "https://www.imdb.com/chart/top/"
-    session = get_session()
+    session = session or get_session()
     
     # Pequeña pausa inicial
     time.sleep(1)
@@ -61,7 +70,7 @@ def extraer_links_top_250():
             print("⚠️ Respuesta muy corta, posible bloqueo")
             return []
             
-        soup = BeautifulSoup(resp.text, "html.parser")
+        document = backend.parse(resp.text)
     except Exception as e:
         print(f"❌ Error en la petición: {e}")
         return []
@@ -70,9 +79,9 @@ def extraer_links_top_250():
 
     # Método 1: Intentar extraer desde JSON-LD
     try:
-        json_ld = soup.find("script", type="application/ld+json")
-        if json_ld and json_ld.string:
-            data = json.loads(json_ld.string)
+        json_ld = backend.select(document, "script[type='application/ld+json']")
+        if json_ld and backend.text(json_ld[0]):
+            data = json.loads(backend.text(json_ld[0]))
             if "itemListElement" in data:
                 links = [item["item"]["url"] for item in data["itemListElement"][:50]]
                 print(f"✅ Encontrados {len(links)} links via JSON-LD")
@@ -84,11 +93,11 @@ def extraer_links_top_250():
     # Método 2: Extraer desde la tabla HTML
     try:
         # Buscar enlaces en la tabla de películas
-        movie_links = soup.select("h3.ipc-title__text a[href*='/title/']")
+        movie_links = backend.select(document, "h3.ipc-title__text a[href*='/title/']")
         if movie_links:
             links = []
             for link in movie_links[:50]:
-                href = link.get('href')
+                href = backend.attr(link, 'href')
                 if href and '/title/' in href:
                     if not href.startswith('http'):
                         href = 'https://www.imdb.com' + href
@@ -100,10 +109,10 @@ def extraer_links_top_250():
 
     # Método 3: Buscar enlaces en cualquier parte de la página
     try:
-        all_links = soup.find_all("a", href=True)
+        all_links = backend.select(document, "a[href]")
         movie_links = []
         for link in all_links:
-            href = link.get('href')
+            href = backend.attr(link, 'href')
             if href and '/title/tt' in href and '/chart/top' not in href:
                 if not href.startswith('http'):
                     href = 'https://www.imdb.com' + href
@@ -120,12 +129,13 @@ def extraer_links_top_250():
     return []
 
 
-def extraer_datos_pelicula(url):
-    session = get_session()
+def extraer_datos_pelicula(url, session=None):
+    # Reutilizar la sesión recibida evita un handshake nuevo por película
+    session = session or get_session()
     try:
         resp = session.get(url, timeout=10)
         resp.raise_for_status()
-        soup = BeautifulSoup(resp.text, "html.parser")
+        document = backend.parse(resp.text)
     except Exception as e:
         print(f"❌ Error accediendo a {url}: {e}")
         return {
@@ -139,9 +149,9 @@ def extraer_datos_pelicula(url):
 
     # Intentar extraer datos desde JSON-LD
     try:
-        json_ld = soup.find("script", type="application/ld+json")
-        if json_ld and json_ld.string:
-            data = json.loads(json_ld.string)
+        json_ld = backend.select(document, "script[type='application/ld+json']")
+        if json_ld and backend.text(json_ld[0]):
+            data = json.loads(backend.text(json_ld[0]))
 
             titulo = data.get("name")
             año = data.get("datePublished")
@@ -170,42 +180,17 @@ def extraer_datos_pelicula(url):
     except Exception as e:
         print(f"⚠️ Error extrayendo JSON-LD de {url}: {e}")
 
-    # Fallback: extraer datos desde HTML
+    # Fallback: las mismas reglas (TITLE_RULES) que usa el scraper, en una sola pasada sobre el HTML
     try:
-        # Título
-        titulo_tag = soup.select_one("h1[data-testid='hero-title-block__title']")
-        titulo = titulo_tag.text.strip() if titulo_tag else "N/A"
-
-        # Año
-        año_tag = soup.select_one("span[data-testid='hero-title-block__metadata'] li")
-        año = año_tag.text.strip() if año_tag else "N/A"
-
-        # Rating
-        rating_tag = soup.select_one("span[data-testid='hero-rating-bar__aggregate-rating__score'] span")
-        rating = rating_tag.text.strip() if rating_tag else "N/A"
-
-        # Duración
-        duracion_tag = soup.select_one("li[data-testid='title-techspec-runtime']")
-        duracion_text = duracion_tag.text.strip() if duracion_tag else ""
-        duracion_minutos = 0
-        if duracion_text:
-            match = re.search(r'(\d+)h\s*(\d+)m', duracion_text)
-            if match:
-                horas = int(match.group(1))
-                minutos = int(match.group(2))
-                duracion_minutos = horas * 60 + minutos
-
-        # Actores (primeros 3)
-        actores_tags = soup.select("a[data-testid='title-cast-item__actor']")[:3]
-        actores = [tag.text.strip() for tag in actores_tags]
-
+        details = {}
+        fill_details_from_html(resp.content, details)
         return {
-            "Título": titulo,
-            "Año": año,
-            "Calificación": rating,
-            "Duración (min)": duracion_minutos,
-            "Metascore": "N/A",
-            "Actores": actores
+            "Título": details["title"] or "N/A",
+            "Año": details["precise_year"] or "N/A",
+            "Calificación": details["rating"] or "N/A",
+            "Duración (min)": details.get("detailed_duration", 0),
+            "Metascore": details["metascore"] or "N/A",
+            "Actores": details["actors"]
         }
     except Exception as e:
         print(f"⚠️ Error extrayendo HTML de {url}: {e}")
@@ -221,7 +206,9 @@ def extraer_datos_pelicula(url):
 
 # 🔁 Scrapeo en lote
 def scrapear_top_50():
-    links = extraer_links_top_250()
+    # Una sola sesión (y su pool keep-alive) para el chart y todos los detalles
+    session = get_session()
+    links = extraer_links_top_250(session)
 
     if not links:
         print("❌ No se pudieron obtener links de películas")
@@ -234,7 +221,7 @@ def scrapear_top_50():
     for idx, link in enumerate(links, 1):
         print(f"{idx:02d}. {link}")
         try:
-            datos = extraer_datos_pelicula(link)
+            datos = extraer_datos_pelicula(link, session)
             resultados.append(datos)
             print(f"   ✅ {datos['Título']}")
             print("Tenemos una peli")